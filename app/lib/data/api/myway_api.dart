@@ -24,12 +24,14 @@ class MyWayApi {
   Future<FeedResponseDto> fetchFeed({
     required String uid,
     int page = 0,
+    String? cursor,
     FeedType feedType = FeedType.hot,
   }) {
     return _requestWithFallback((dio) async {
       final response = await dio.post('/feed', data: {
         'uid': uid,
         'page': page,
+        if (cursor != null) 'cursor': cursor,
         'feedType': feedType.name,
       });
       return FeedResponseDto.fromJson(response.data as Map<String, dynamic>);
@@ -8,6 +8,7 @@ class FeedResponseDto {
     required this.items,
     required this.hasMore,
     required this.nextPage,
+    this.nextCursor,
   });
 
   factory FeedResponseDto.fromJson(Map<String, dynamic> json) {
@@ -17,12 +18,14 @@ class FeedResponseDto {
           .toList(),
       hasMore: json['hasMore'] as bool? ?? false,
       nextPage: json['nextPage'] as int? ?? 0,
+      nextCursor: json['nextCursor'] as String?,
     );
   }
 
   final List<FeedItemDto> items;
   final bool hasMore;
   final int nextPage;
+  final String? nextCursor;
 }
 
 enum FeedSlot { ready, pending, fallback }
@@ -97,6 +100,34 @@ class SafetyInfoDto {
       blocked.hashCode ^ const MapEquality<String, double>().hash(scores);
 }
 
+class MediaDerivativeDto {
+  const MediaDerivativeDto({
+    required this.storagePath,
+    this.publicUrl,
+    this.width,
+  });
+
+  factory MediaDerivativeDto.fromJson(Map<String, dynamic> json) {
+    return MediaDerivativeDto(
+      storagePath: json['storagePath'] as String? ?? '',
+      publicUrl: json['publicUrl'] as String?,
+      width: json['width'] as int?,
+    );
+  }
+
+  final String storagePath;
+  final String? publicUrl;
+  final int? width;
+
+  String get url => publicUrl ?? storagePath;
+
+  Map<String, dynamic> toJson() => {
+        'storagePath': storagePath,
+        'publicUrl': publicUrl,
+        'width': width,
+      };
+}
+
 class PostDto {
   const PostDto({
     required this.id,
@@ -114,6 +145,9 @@ class PostDto {
     this.synthId = true,
     required this.authorUid,
     this.isPrivate = false,
+    this.thumbnails = const <MediaDerivativeDto>[],
+    this.poster,
+    this.preview,
   });
 
   factory PostDto.fromJson(Map<String, dynamic> json) {
@@ -136,6 +170,19 @@ class PostDto {
       synthId: json['synthId'] as bool? ?? true,
       authorUid: json['authorUid'] as String? ?? 'system',
       isPrivate: json['isPrivate'] as bool? ?? false,
+      thumbnails: (json['thumbnails'] as List?)
+              ?.map((e) =>
+                  MediaDerivativeDto.fromJson(Map<String, dynamic>.from(e as Map)))
+              .toList() ??
+          const <MediaDerivativeDto>[],
+      poster: json['poster'] == null
+          ? null
+          : MediaDerivativeDto.fromJson(
+              Map<String, dynamic>.from(json['poster'] as Map)),
+      preview: json['preview'] == null
+          ? null
+          : MediaDerivativeDto.fromJson(
+              Map<String, dynamic>.from(json['preview'] as Map)),
     );
   }
 
@@ -154,6 +201,17 @@ class PostDto {
   final bool synthId;
   final String authorUid;
   final bool isPrivate;
+  final List<MediaDerivativeDto> thumbnails;
+  final MediaDerivativeDto? poster;
+  final MediaDerivativeDto? preview;
+
+  /// Smallest thumbnail at least [width] px wide, else the full media.
+  String imageUrlFor(double width) {
+    for (final thumbnail in thumbnails) {
+      if ((thumbnail.width ?? 0) >= width) return thumbnail.url;
+    }
+    return publicUrl ?? storagePath;
+  }
 
   Map<String, dynamic> toJson() => {
         'id': id,
@@ -171,6 +229,9 @@ class PostDto {
         'synthId': synthId,
         'authorUid': authorUid,
         'isPrivate': isPrivate,
+        'thumbnails': thumbnails.map((t) => t.toJson()).toList(),
+        'poster': poster?.toJson(),
+        'preview': preview?.toJson(),
       };
 }
 
@@ -59,11 +59,13 @@ class ProfileImagesResponse {
   final ProfileImages? profileImages;
   final bool success;
   final String? message;
+  final String? jobId;
 
   ProfileImagesResponse({
     this.profileImages,
     required this.success,
     this.message,
+    this.jobId,
   });
 
   factory ProfileImagesResponse.fromJson(Map<String, dynamic> json) {
@@ -73,6 +75,7 @@ class ProfileImagesResponse {
           : null,
       success: json['success'] ?? false,
       message: json['message'],
+      jobId: json['jobId'],
     );
   }
 }
@@ -114,16 +117,44 @@ class ProfileService {
     }
   }
 
-  /// Generate base image from 3 capture photos using Imagen 4
+  /// Generate base image from 3 capture photos using Imagen 4.
+  ///
+  /// The backend queues the generation as a job; this waits for it to finish
+  /// and returns the updated profile images.
   Future<ProfileImagesResponse> generateBaseImage({
     required String uid,
+    Duration pollInterval = const Duration(seconds: 2),
+    Duration timeout = const Duration(minutes: 3),
   }) async {
     try {
       final response = await _dio.post(
         '/profile/generate-base',
         data: {'uid': uid},
       );
-      return ProfileImagesResponse.fromJson(response.data);
+      final queued = ProfileImagesResponse.fromJson(response.data);
+      final jobId = queued.jobId;
+      if (jobId == null) {
+        return queued;
+      }
+
+      final deadline = DateTime.now().add(timeout);
+      while (true) {
+        final status = await _dio.get(
+          '/gen/status',
+          queryParameters: {'jobId': jobId},
+        );
+        final state = (status.data as Map<String, dynamic>)['status'];
+        if (state == 'ready') {
+          return getProfileImages(uid: uid);
+        }
+        if (state == 'failed') {
+          throw Exception('base image job failed');
+        }
+        if (DateTime.now().isAfter(deadline)) {
+          throw Exception('timed out waiting for base image');
+        }
+        await Future.delayed(pollInterval);
+      }
     } catch (e) {
       throw Exception('Failed to generate base image: $e');
     }
@@ -17,8 +17,9 @@ class FeedRepository {
   final MyWayApi _api;
 
   Future<FeedResponseDto> fetchFeed(String uid,
-      {FeedType feedType = FeedType.hot, int page = 0}) {
-    return _api.fetchFeed(uid: uid, feedType: feedType, page: page);
+      {FeedType feedType = FeedType.hot, int page = 0, String? cursor}) {
+    return _api.fetchFeed(
+        uid: uid, feedType: feedType, page: page, cursor: cursor);
   }
 
   Future<String> enqueueImage(String uid, String prompt, String aspectRatio,
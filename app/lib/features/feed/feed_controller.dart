@@ -82,21 +82,25 @@ class FeedPaginationState {
     required this.hasMore,
     required this.nextPage,
     required this.isLoadingMore,
+    this.nextCursor,
   });
 
   final bool hasMore;
   final int nextPage;
   final bool isLoadingMore;
+  final String? nextCursor;
 
   FeedPaginationState copyWith({
     bool? hasMore,
     int? nextPage,
     bool? isLoadingMore,
+    String? nextCursor,
   }) {
     return FeedPaginationState(
       hasMore: hasMore ?? this.hasMore,
       nextPage: nextPage ?? this.nextPage,
       isLoadingMore: isLoadingMore ?? this.isLoadingMore,
+      nextCursor: nextCursor ?? this.nextCursor,
     );
   }
 }
@@ -124,6 +128,7 @@ class FeedController extends FamilyAsyncNotifier<List<FeedItemDto>, FeedType> {
           FeedPaginationState(
         hasMore: response.hasMore,
         nextPage: response.nextPage,
+        nextCursor: response.nextCursor,
         isLoadingMore: false,
       );
       _schedulePolling(response.items);
@@ -158,6 +163,7 @@ class FeedController extends FamilyAsyncNotifier<List<FeedItemDto>, FeedType> {
           FeedPaginationState(
         hasMore: response.hasMore,
         nextPage: response.nextPage,
+        nextCursor: response.nextCursor,
         isLoadingMore: false,
       );
       state = AsyncData(response.items);
@@ -196,6 +202,7 @@ class FeedController extends FamilyAsyncNotifier<List<FeedItemDto>, FeedType> {
         uid,
         feedType: feedType,
         page: paginationState.nextPage,
+        cursor: paginationState.nextCursor,
       );
 
       AppLogger.info(
@@ -210,6 +217,7 @@ class FeedController extends FamilyAsyncNotifier<List<FeedItemDto>, FeedType> {
           FeedPaginationState(
         hasMore: response.hasMore,
         nextPage: response.nextPage,
+        nextCursor: response.nextCursor,
         isLoadingMore: false,
       );
 
@@ -326,6 +334,7 @@ class FeedController extends FamilyAsyncNotifier<List<FeedItemDto>, FeedType> {
           FeedPaginationState(
         hasMore: response.hasMore,
         nextPage: response.nextPage,
+        nextCursor: response.nextCursor,
         isLoadingMore: false,
       );
       state = AsyncData(response.items);
@@ -313,10 +313,23 @@ Widget _buildMedia(PostDto post, VideoPlayerController? controller) {
         ),
       );
     }
+    // Show the poster frame while the video loads
+    if (post.poster != null) {
+      return CachedNetworkImage(
+        imageUrl: post.poster!.url,
+        fit: BoxFit.cover,
+        placeholder: (context, url) =>
+            const Center(child: CircularProgressIndicator()),
+        errorWidget: (context, url, error) =>
+            const Center(child: CircularProgressIndicator()),
+      );
+    }
     return const Center(child: CircularProgressIndicator());
   }
 
-  final imageUrl = post.publicUrl ?? post.storagePath;
+  // Feed cards span the screen width: pick the smallest thumbnail that covers it
+  final view = WidgetsBinding.instance.platformDispatcher.views.first;
+  final imageUrl = post.imageUrlFor(view.physicalSize.width);
   if (imageUrl.isEmpty) {
     return Container(
       color: Colors.grey[800],
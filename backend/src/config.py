@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 from dataclasses import dataclass
 from functools import lru_cache
-from typing import Sequence
+from typing import Sequence, Tuple
 
 from dotenv import load_dotenv
 
@@ -11,6 +11,16 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def _model_limits(raw: str) -> Tuple[Tuple[str, int], ...]:
+    """Parse ``model=limit,model=limit`` into ``(model, limit)`` pairs."""
+    limits = []
+    for entry in raw.split(","):
+        model, _, limit = entry.partition("=")
+        if model.strip() and limit.strip():
+            limits.append((model.strip(), int(limit)))
+    return tuple(limits)
+
+
 @dataclass(frozen=True)
 class Settings:
     app_name: str = "My Way API"
@@ -19,6 +29,15 @@ class Settings:
     enable_mocks: bool = os.getenv("ENABLE_MOCKS", "true").lower() == "true"
     generate_timeout_ms: int = int(os.getenv("GENERATE_TIMEOUT_MS", "800"))
     feed_size: int = int(os.getenv("FEED_SIZE", "50"))
+    feed_cache_ttl_seconds: float = float(os.getenv("FEED_CACHE_TTL_SECONDS", "5"))
+    feed_cache_max_pages: int = int(os.getenv("FEED_CACHE_MAX_PAGES", "8"))
+    video_poll_initial_delay_seconds: float = float(os.getenv("VIDEO_POLL_INITIAL_DELAY_SECONDS", "20"))
+    video_poll_max_interval_seconds: float = float(os.getenv("VIDEO_POLL_MAX_INTERVAL_SECONDS", "20"))
+    video_poll_concurrency: int = int(os.getenv("VIDEO_POLL_CONCURRENCY", "8"))
+    video_poll_max_rate: float = float(os.getenv("VIDEO_POLL_MAX_RATE", "4"))
+    video_operation_timeout_seconds: float = float(os.getenv("VIDEO_OPERATION_TIMEOUT_SECONDS", "600"))
+    job_events_timeout_seconds: float = float(os.getenv("JOB_EVENTS_TIMEOUT_SECONDS", "300"))
+    job_events_heartbeat_seconds: float = float(os.getenv("JOB_EVENTS_HEARTBEAT_SECONDS", "15"))
 
     feed_share_interest: float = float(os.getenv("FEED_SHARE_INTEREST", "0.60"))
     feed_share_explore: float = float(os.getenv("FEED_SHARE_EXPLORE", "0.25"))
@@ -41,10 +60,49 @@ class Settings:
 
     storage_bucket: str | None = os.getenv("FIREBASE_STORAGE_BUCKET")
     cloud_storage_media_prefix: str = os.getenv("CLOUD_STORAGE_MEDIA_PREFIX", "media")
+    profile_capture_max_bytes: int = int(os.getenv("PROFILE_CAPTURE_MAX_BYTES", str(20 * 1024 * 1024)))
+    # Uploaded images are normalized to this before storage (see services/image_processing.py)
+    image_max_side: int = int(os.getenv("IMAGE_MAX_SIDE", "1536"))
+    image_output_format: str = os.getenv("IMAGE_OUTPUT_FORMAT", "JPEG").upper()
+    image_quality: int = int(os.getenv("IMAGE_QUALITY", "85"))
+    image_workers: int = int(os.getenv("IMAGE_WORKERS", "2"))
+    # Feed derivatives (see services/derivatives.py): WebP thumbnail widths for
+    # images; poster frame and low-bitrate preview for videos via ffmpeg
+    thumbnail_widths: Tuple[int, ...] = tuple(
+        int(w) for w in os.getenv("THUMBNAIL_WIDTHS", "160,320,640").split(",") if w.strip()
+    )
+    thumbnail_quality: int = int(os.getenv("THUMBNAIL_QUALITY", "75"))
+    ffmpeg_path: str = os.getenv("FFMPEG_PATH", "ffmpeg")
+    ffmpeg_timeout_seconds: float = float(os.getenv("FFMPEG_TIMEOUT_SECONDS", "60"))
+    video_preview_height: int = int(os.getenv("VIDEO_PREVIEW_HEIGHT", "360"))
+    video_preview_bitrate_kbps: int = int(os.getenv("VIDEO_PREVIEW_BITRATE_KBPS", "400"))
+    # Base-image jobs (/profile/generate-base) run on this many threads
+    base_image_workers: int = int(os.getenv("BASE_IMAGE_WORKERS", "2"))
     pubsub_topic_generate: str | None = os.getenv("PUBSUB_TOPIC_GENERATE")
     pubsub_subscription_generate: str | None = os.getenv("PUBSUB_SUBSCRIPTION_GENERATE")
+    pubsub_batch_max_latency_ms: float = float(os.getenv("PUBSUB_BATCH_MAX_LATENCY_MS", "10"))
+    pubsub_publish_attempts: int = int(os.getenv("PUBSUB_PUBLISH_ATTEMPTS", "3"))
+    worker_image_concurrency: int = int(os.getenv("WORKER_IMAGE_CONCURRENCY", "8"))
+    worker_video_concurrency: int = int(os.getenv("WORKER_VIDEO_CONCURRENCY", "2"))
     cloud_run_service: str | None = os.getenv("CLOUD_RUN_SERVICE")
 
+    vertex_http_timeout_seconds: float = float(os.getenv("VERTEX_HTTP_TIMEOUT_SECONDS", "30"))
+    vertex_http_retries: int = int(os.getenv("VERTEX_HTTP_RETRIES", "3"))
+    vertex_http_pool_size: int = int(os.getenv("VERTEX_HTTP_POOL_SIZE", "16"))
+    generation_cache_size: int = int(os.getenv("GENERATION_CACHE_SIZE", "512"))
+    generation_reuse_ttl_seconds: float = float(os.getenv("GENERATION_REUSE_TTL_SECONDS", "120"))
+    vertex_warmup_models: Sequence[str] = tuple(
+        m.strip() for m in os.getenv("VERTEX_WARMUP_MODELS", "imagen-4.0-fast-generate-001").split(",")
+        if m.strip()
+    )
+    # Generations in flight per model across the process (see services/scheduler.py)
+    model_concurrency: Tuple[Tuple[str, int], ...] = _model_limits(os.getenv(
+        "MODEL_CONCURRENCY",
+        "imagen-4.0-fast-generate-001=8,veo-3.1-fast-generate-preview=4,veo-3.1-generate-preview=2",
+    ))
+    model_concurrency_default: int = int(os.getenv("MODEL_CONCURRENCY_DEFAULT", "4"))
+    scheduler_max_wait_seconds: float = float(os.getenv("SCHEDULER_MAX_WAIT_SECONDS", "30"))
+
 
 _settings: Settings | None = None
 
@@ -1,13 +1,18 @@
 
+import asyncio
 import logging
 import time
-from typing import List
+from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from .config import get_settings
 from .models.schemas import (
+    BulkJobStatusRequest,
+    BulkJobStatusResponse,
     FeedItem,
     FeedRequest,
     FeedResponse,
@@ -20,7 +25,14 @@ from .models.schemas import (
     GenerateTask,
 )
 from .services import feed as feed_service
-from .services import generation, moderation, store
+from .services import generation, image_processing, moderation, store, vertex
+from .services.generation_cache import GENERATION_CACHE
+from .services.job_state import public_status
+from .services.job_events import JOB_EVENTS
+from .services.jobs import JOB_PROMOTER, job_event_stream, promotable
+from .services.pubsub_client import publish_generate_request, publisher_stats
+from .services.scheduler import SCHEDULER, SchedulerBusy
+from .services.video_poller import VIDEO_POLLER
 from .services.worker import process_generate_task
 
 logger = logging.getLogger(__name__)
@@ -53,18 +65,55 @@ def seed_mock_content() -> None:
         db.add_fallback(saved)
 
 
+@app.on_event("startup")
+async def warm_up_vertex_models() -> None:
+    if settings.enable_mocks or not settings.vertex_warmup_models:
+        return
+    # Load model handles before traffic so the first image request doesn't pay for it
+    await run_in_threadpool(vertex.warm_up, settings.vertex_warmup_models)
+
+
+@app.on_event("startup")
+async def start_video_poller() -> None:
+    if settings.enable_mocks:
+        return
+    await VIDEO_POLLER.recover()
+    VIDEO_POLLER.start()
+
+
+@app.on_event("shutdown")
+async def stop_video_poller() -> None:
+    await VIDEO_POLLER.stop()
+
+
+@app.on_event("shutdown")
+def stop_image_workers() -> None:
+    image_processing.shutdown_pool()
+
+
 @app.get("/health")
 def health() -> dict:
     return {
         "ok": True, 
         "mocks": settings.enable_mocks,
         "feed_size": settings.feed_size,
+        "feed_cache": feed_service.PUBLIC_FEED_CACHE.stats(),
+        "video_poller": VIDEO_POLLER.stats(),
+        "vertex_latency_ms": vertex.rest_client_stats(),
+        "generation_cache": GENERATION_CACHE.stats(),
+        "job_promotions": JOB_PROMOTER.stats(),
+        "job_events": JOB_EVENTS.stats(),
+        "pubsub_publisher": publisher_stats(),
+        "scheduler": SCHEDULER.stats(),
     }
 
 
 @app.post("/feed", response_model=FeedResponse)
-def feed(req: FeedRequest) -> FeedResponse:
-    return feed_service.build_feed(req)
+async def feed(req: FeedRequest) -> FeedResponse:
+    try:
+        return await feed_service.build_feed_async(req)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @app.post("/gen/image")
@@ -113,17 +162,21 @@ def _enqueue_generation(req: GenRequest, media_type: str) -> dict:
     
     logger.info(f"Total reference images: {len(reference_image_uris)}")
     
-    job_id, post_payload, delay_ms = generation.enqueue_generation(
-        req.uid,
-        req.prompt,
-        media_type,
-        aspect=req.aspect,
-        seed=req.seed,
-        duration=req.duration,
-        audio=req.audio,
-        is_private=req.isPrivate,
-        reference_image_uris=reference_image_uris if reference_image_uris else None,
-    )
+    try:
+        job_id, post_payload, delay_ms = generation.enqueue_generation(
+            req.uid,
+            req.prompt,
+            media_type,
+            aspect=req.aspect,
+            seed=req.seed,
+            duration=req.duration,
+            audio=req.audio,
+            is_private=req.isPrivate,
+            reference_image_uris=reference_image_uris if reference_image_uris else None,
+            priority="interactive",
+        )
+    except SchedulerBusy as exc:
+        raise HTTPException(status_code=429, detail=str(exc)) from exc
     
     db = store.get_store()
     
@@ -138,36 +191,93 @@ def _enqueue_generation(req: GenRequest, media_type: str) -> dict:
     else:
         # Save as pending job for async processing
         logger.info(f"Saving as pending job: {job_id}, delay_ms={delay_ms}")
-        db.save_job(
-            job_id,
-            {
-                "jobId": job_id,
-                "userId": req.uid,
-                "status": "pending",
-                "post": post_payload,
-                "ready_at": time.time() + (delay_ms / 1000.0),
-                "reasons": ["composer"],
-            },
-        )
+        request = post_payload.pop("generateRequest", None)
+        job = _pending_job(req.uid, job_id, post_payload, delay_ms, "composer")
+        db.save_job(job_id, job)
+        _track_operation(job)
+        _publish_queued([request])
         return {"jobId": job_id, "etaMs": delay_ms}
 
 
+def _pending_job(uid: str, job_id: str, post_payload: dict, delay_ms: int, reason: str) -> dict:
+    job = {
+        "jobId": job_id,
+        "userId": uid,
+        "status": "pending",
+        "post": post_payload,
+        "ready_at": time.time() + (delay_ms / 1000.0),
+        "reasons": [reason],
+    }
+    if post_payload.pop("queued", False):
+        # Generated by the Pub/Sub worker, which marks the job ready itself
+        job["queued"] = True
+    operation = post_payload.pop("operation", None)
+    if operation:
+        # Submitted Veo operation: the video poller promotes it once done
+        job.update(operation=operation, submitted_at=time.time())
+    return job
+
+
+def _publish_queued(requests: List[Optional[dict]]) -> None:
+    # Only after the pending jobs are saved: a worker that finishes (or a publish
+    # that fails) first would otherwise have its status overwritten with pending
+    for request in requests:
+        if request:
+            # Returns once buffered; a publish that ultimately fails marks the job failed
+            publish_generate_request(request)
+
+
+def _track_operation(job: dict) -> None:
+    operation = job.get("operation")
+    if operation:
+        VIDEO_POLLER.track(job["jobId"], operation["name"], operation["model"], job["submitted_at"])
+
+
 @app.get("/gen/status", response_model=JobStatus)
-def gen_status(jobId: str) -> JobStatus:
-    db = store.get_store()
-    job = db.get_job(jobId)
+async def gen_status(jobId: str) -> JobStatus:
+    db = store.get_async_store()
+    job = await db.get_job(jobId)
     if not job:
         raise HTTPException(status_code=404, detail="job not found")
-    if job["status"] == "pending" and time.time() >= job.get("ready_at", 0):
-        post_payload = job["post"]
-        post_payload["status"] = "ready"
-        saved_post = db.save_post(post_payload)
-        db.attach_to_feed(job.get("userId", "system"), saved_post, score=1.0, reason=job.get("reasons", ["generated"]))
-        job["status"] = "ready"
-        job["postId"] = saved_post.id
-        job["updated_at"] = time.time()
-        db.save_job(jobId, job)
-    return JobStatus(status=job["status"], postId=job.get("postId"))
+    # Jobs backed by a Vertex operation are promoted by the video poller instead
+    if promotable(job):
+        # Exactly one promotion per job; concurrent polls wait for it
+        job = await JOB_PROMOTER.promote(db, jobId) or job
+    return JobStatus(status=public_status(job["status"]), postId=job.get("postId"))
+
+
+@app.post("/gen/status", response_model=BulkJobStatusResponse)
+async def gen_status_bulk(req: BulkJobStatusRequest) -> BulkJobStatusResponse:
+    """Status of many jobs from one batched read; due jobs are promoted together."""
+    db = store.get_async_store()
+    job_ids = list(dict.fromkeys(req.jobIds))
+    jobs = await JOB_PROMOTER.promote_due(db, await db.get_jobs(job_ids))
+    return BulkJobStatusResponse(
+        jobs={
+            job_id: JobStatus(status=public_status(job["status"]), postId=job.get("postId"))
+            for job_id, job in jobs.items()
+        },
+        missing=[job_id for job_id in job_ids if job_id not in jobs],
+    )
+
+
+@app.get("/gen/events")
+async def gen_events(jobIds: List[str] = Query(...)) -> StreamingResponse:
+    """Server-Sent Events for one or more jobs; replaces polling ``/gen/status``."""
+    job_ids = list(dict.fromkeys(jobIds))
+    if len(job_ids) > 50:
+        raise HTTPException(status_code=400, detail="at most 50 jobIds per stream")
+    stream = job_event_stream(
+        store.get_async_store(),
+        job_ids,
+        timeout_seconds=settings.job_events_timeout_seconds,
+        heartbeat_seconds=settings.job_events_heartbeat_seconds,
+    )
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/moderate", response_model=ModerationResponse)
@@ -176,34 +286,51 @@ def moderate(req: ModerationRequest) -> ModerationResponse:
 
 
 @app.post("/more-like-this")
-def more_like_this(req: MoreLikeThisRequest) -> dict:
-    db = store.get_store()
-    base_post = db.get_post(req.postId)
+async def more_like_this(req: MoreLikeThisRequest) -> dict:
+    db = store.get_async_store()
+    base_post = await db.get_post(req.postId)
     if not base_post:
         raise HTTPException(status_code=404, detail="post not found")
-    job_ids: List[str] = []
-    for _ in range(req.count):
-        prompt = f"Variation on {base_post.prompt}"
-        job_id, post_payload, delay_ms = generation.enqueue_generation(
+    prompt = f"Variation on {base_post.prompt}"
+    # Generation still talks to Vertex/Pub/Sub synchronously: run the variations
+    # side by side in the threadpool so latency stays flat as ``count`` grows
+    outcomes = await asyncio.gather(*(
+        run_in_threadpool(
+            generation.enqueue_generation,
             req.uid,
             prompt,
             base_post.type,
             aspect=base_post.aspect,
             seed=None,
+            priority="variation",
         )
-        db.save_job(
-            job_id,
-            {
-                "jobId": job_id,
-                "userId": req.uid,
-                "status": "pending",
-                "post": post_payload,
-                "ready_at": time.time() + (delay_ms / 1000.0),
-                "reasons": ["variation"],
-            },
-        )
-        job_ids.append(job_id)
-    return {"jobs": job_ids}
+        for _ in range(req.count)
+    ), return_exceptions=True)
+    results = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+    failures = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+    if not results:
+        for failure in failures:
+            if not isinstance(failure, SchedulerBusy):
+                raise failure
+        raise HTTPException(status_code=429, detail=str(failures[0]))
+    # Successful variations are already submitted (and may hold a Veo slot until
+    # the poller finishes them): always save and track them, then report failures
+    queued = [post_payload.pop("generateRequest", None) for _, post_payload, _ in results]
+    jobs = {
+        job_id: _pending_job(req.uid, job_id, post_payload, delay_ms, "variation")
+        for job_id, post_payload, delay_ms in results
+    }
+    await db.save_jobs(jobs)
+    for job in jobs.values():
+        _track_operation(job)
+    _publish_queued(queued)
+    for failure in failures:
+        if not isinstance(failure, SchedulerBusy):
+            logger.error("Variation of post %s failed: %s", req.postId, failure, exc_info=failure)
+    response: dict = {"jobs": list(jobs)}
+    if failures:
+        response["errors"] = [str(failure) for failure in failures]
+    return response
 
 
 @app.post("/tasks/consume")
@@ -225,7 +352,17 @@ from .models.schemas import (
     ApproveBaseImageRequest,
     ProfileImagesResponse,
 )
-from .services.profile import get_profile_service
+from .services.profile import (
+    CaptureImageTooLarge,
+    InvalidCaptureImage,
+    get_profile_service,
+    shutdown_base_image_jobs,
+)
+
+
+@app.on_event("shutdown")
+def stop_base_image_jobs() -> None:
+    shutdown_base_image_jobs()
 
 
 @app.post("/profile/capture-images", response_model=ProfileImagesResponse)
@@ -239,17 +376,10 @@ async def upload_capture_images(
     try:
         profile_service = get_profile_service()
         
-        # Read image data
-        front_data = await front.read()
-        left_data = await left.read()
-        right_data = await right.read()
-        
-        # Upload to storage
-        capture_images = await profile_service.upload_capture_images(
-            uid=uid,
-            front_data=front_data,
-            left_data=left_data,
-            right_data=right_data,
+        # Stream each file to storage in chunks instead of reading it whole
+        capture_images = await profile_service.upload_capture_streams(
+            uid,
+            {'front': front.file, 'left': left.file, 'right': right.file},
         )
         
         # Get updated profile data
@@ -260,6 +390,10 @@ async def upload_capture_images(
             success=True,
             message="Capture images uploaded successfully",
         )
+    except CaptureImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidCaptureImage as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to upload capture images: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -267,21 +401,20 @@ async def upload_capture_images(
 
 @app.post("/profile/generate-base", response_model=ProfileImagesResponse)
 async def generate_base_image(req: GenerateBaseImageRequest) -> ProfileImagesResponse:
-    """Generate base image from 3 capture photos using Imagen 4"""
+    """Queue base image generation from the 3 capture photos; follow ``jobId`` via /gen/status"""
     try:
         profile_service = get_profile_service()
-        
-        # Generate base image
-        base_image_path = await profile_service.generate_base_image(req.uid)
-        
-        # Get updated profile data
+        job_id = await profile_service.enqueue_base_image(req.uid)
         profile_images = await profile_service.get_profile_images(req.uid)
         
         return ProfileImagesResponse(
             profileImages=profile_images,
             success=True,
-            message="Base image generated successfully. Please review and approve.",
+            message="Base image generation started.",
+            jobId=job_id,
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to generate base image: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -437,3 +570,35 @@ def fix_add_isprivate():
         "already_had_field": already_had_field,
         "total": len(all_posts)
     }
+
+
+@app.post("/fix/add-random-key")
+def fix_add_random_key():
+    """Backfill randomKey on posts written before the seeded random feed"""
+    from .services.pagination import random_key
+    from .services.store_firestore import FirestoreStore
+    
+    db = store.get_store()
+    if not isinstance(db, FirestoreStore):
+        return {"error": "Not using FirestoreStore"}
+    
+    posts_ref = db.client.collection("posts")
+    all_posts = list(posts_ref.stream())
+    
+    fixed_count = 0
+    already_had_field = 0
+    
+    for post_doc in all_posts:
+        data = post_doc.to_dict() or {}
+        
+        if "randomKey" not in data:
+            post_doc.reference.update({"randomKey": random_key(post_doc.id)})
+            fixed_count += 1
+        else:
+            already_had_field += 1
+    
+    return {
+        "fixed": fixed_count,
+        "already_had_field": already_had_field,
+        "total": len(all_posts)
+    }
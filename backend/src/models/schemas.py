@@ -10,11 +10,14 @@ class FeedRequest(BaseModel):
     uid: str
     page: int = 0
     feedType: Optional[str] = "hot"  # hot, interests, private, random
+    cursor: Optional[str] = None  # Opaque token from FeedResponse.nextCursor (preferred over page)
+    seed: Optional[int] = None  # Random feed session seed; the same seed yields the same order
 
 class FeedResponse(BaseModel):
     items: List["FeedItem"]
     hasMore: bool
     nextPage: int
+    nextCursor: Optional[str] = None
 
 class FeedItem(BaseModel):
     slot: Literal['READY','PENDING','FALLBACK']
@@ -41,6 +44,15 @@ class JobStatus(BaseModel):
     postId: Optional[str] = None
 
 
+class BulkJobStatusRequest(BaseModel):
+    jobIds: List[str] = Field(min_length=1, max_length=50)
+
+
+class BulkJobStatusResponse(BaseModel):
+    jobs: Dict[str, JobStatus]
+    missing: List[str] = []
+
+
 class PubSubMessage(BaseModel):
     data: str
     messageId: Optional[str] = None
@@ -66,6 +78,7 @@ class GenerateTask(BaseModel):
     mediaType: Literal['image', 'video']
     aspect: str = "9:16"
     seed: Optional[int] = None
+    priority: Literal['interactive', 'variation', 'background'] = 'interactive'
 
 
 class SafetyInfo(BaseModel):
@@ -73,6 +86,13 @@ class SafetyInfo(BaseModel):
     scores: Dict[str, float] = {}
 
 
+class MediaDerivative(BaseModel):
+    """A smaller rendition of a post's media for grids and previews."""
+    storagePath: str
+    publicUrl: Optional[str] = None
+    width: Optional[int] = None
+
+
 class Post(BaseModel):
     id: str
     type: Literal['image', 'video']
@@ -89,6 +109,9 @@ class Post(BaseModel):
     synthId: bool = True
     authorUid: str
     isPrivate: bool = False  # Privacy setting
+    thumbnails: List[MediaDerivative] = Field(default_factory=list)  # WebP, ascending width (images)
+    poster: Optional[MediaDerivative] = None  # JPEG frame (videos)
+    preview: Optional[MediaDerivative] = None  # low-bitrate MP4 (videos)
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
 
@@ -159,3 +182,4 @@ class ProfileImagesResponse(BaseModel):
     profileImages: Optional[ProfileImages] = None
     success: bool
     message: Optional[str] = None
+    jobId: Optional[str] = None  # set by /profile/generate-base; poll /gen/status
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageOps
+
+from ..config import get_settings
+from . import storage
+
+logger = logging.getLogger(__name__)
+
+# Runs one ffmpeg command line; tests substitute a fake that writes the outputs.
+Runner = Callable[[List[str]], None]
+
+
+def _run(args: List[str]) -> None:
+    subprocess.run(
+        args,
+        check=True,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        timeout=get_settings().ffmpeg_timeout_seconds,
+    )
+
+
+def webp_thumbnails(data: bytes, widths: Sequence[int], quality: int = 75) -> List[Tuple[int, int, bytes]]:
+    """``(width, height, webp)`` for each requested width, smallest first.
+
+    Widths at or above the source width collapse into one full-width
+    rendition: thumbnails never upscale.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+        targets = sorted({min(width, image.width) for width in widths}, reverse=True)
+        renditions = []
+        # Largest first, each resampled from the previous one: the full-size
+        # decode is scaled once instead of once per width
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            if (width, height) != image.size:
+                image = image.resize((width, height), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, format="WEBP", quality=quality, method=4)
+            renditions.append((width, height, buffer.getvalue()))
+    return renditions[::-1]
+
+
+def video_stills(video_path: str, workdir: str, *, ffmpeg: str, preview_height: int, bitrate_kbps: int,
+                 runner: Runner = _run) -> Tuple[str, str]:
+    """Write ``poster.jpg`` and ``preview.mp4`` for ``video_path`` into ``workdir``."""
+    poster = os.path.join(workdir, "poster.jpg")
+    preview = os.path.join(workdir, "preview.mp4")
+    quiet = [ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-y"]
+    # The thumbnail filter picks a representative frame, not a black/fading first frame
+    runner(quiet + ["-i", video_path, "-vf", "thumbnail", "-frames:v", "1", "-q:v", "3", poster])
+    bitrate = f"{bitrate_kbps}k"
+    runner(quiet + [
+        "-i", video_path,
+        "-vf", f"scale=-2:{preview_height}",
+        "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "main", "-pix_fmt", "yuv420p",
+        "-b:v", bitrate, "-maxrate", bitrate, "-bufsize", f"{2 * bitrate_kbps}k",
+        "-an", "-movflags", "+faststart",
+        preview,
+    ])
+    return poster, preview
+
+
+def _derivative(upload: storage.UploadResult, width: Optional[int] = None) -> Dict[str, Any]:
+    return {"storagePath": upload.storage_path, "publicUrl": upload.public_url, "width": width}
+
+
+def _image_derivatives(post_id: str, data: bytes) -> Dict[str, Any]:
+    settings = get_settings()
+    thumbnails = []
+    for width, _height, webp in webp_thumbnails(data, settings.thumbnail_widths, settings.thumbnail_quality):
+        name = storage.media_object_name(post_id, "image", f"_w{width}.webp")
+        thumbnails.append(_derivative(storage.upload_object(name, webp, "image/webp"), width))
+    return {"thumbnails": thumbnails}
+
+
+def _video_derivatives(post_id: str, data: bytes, runner: Optional[Runner]) -> Dict[str, Any]:
+    settings = get_settings()
+    ffmpeg = shutil.which(settings.ffmpeg_path)
+    if runner is None:
+        if ffmpeg is None:
+            logger.warning("ffmpeg not found at %r; skipping video derivatives for %s", settings.ffmpeg_path, post_id)
+            return {}
+        runner = _run
+    with tempfile.TemporaryDirectory(prefix="derivatives_") as workdir:
+        source = os.path.join(workdir, "source.mp4")
+        with open(source, "wb") as handle:
+            handle.write(data)
+        poster, preview = video_stills(
+            source,
+            workdir,
+            ffmpeg=ffmpeg or settings.ffmpeg_path,
+            preview_height=settings.video_preview_height,
+            bitrate_kbps=settings.video_preview_bitrate_kbps,
+            runner=runner,
+        )
+        with Image.open(poster) as frame:
+            poster_width = frame.width
+        with open(poster, "rb") as handle:
+            poster_upload = storage.upload_object(
+                storage.media_object_name(post_id, "video", "_poster.jpg"), handle.read(), "image/jpeg"
+            )
+        with open(preview, "rb") as handle:
+            preview_upload = storage.upload_object(
+                storage.media_object_name(post_id, "video", "_preview.mp4"), handle.read(), "video/mp4"
+            )
+    return {"poster": _derivative(poster_upload, poster_width), "preview": _derivative(preview_upload)}
+
+
+def derive_media(*, post_id: str, media_type: str, data: bytes, runner: Optional[Runner] = None) -> Dict[str, Any]:
+    """Build and upload the feed derivatives for freshly uploaded media.
+
+    Returns ``Post`` field updates (``thumbnails`` for images, ``poster`` and
+    ``preview`` for videos) as plain dicts, ready for a post payload. Missing
+    derivatives only cost bandwidth, so any failure is logged and yields ``{}``
+    rather than failing the generation.
+    """
+    try:
+        if media_type == "image":
+            return _image_derivatives(post_id, data)
+        return _video_derivatives(post_id, data, runner)
+    except Exception as exc:
+        logger.warning("Could not build derivatives for %s %s: %s", media_type, post_id, exc)
+        return {}
+
+
+def derive_stored_media(*, post_id: str, media_type: str, storage_path: str,
+                        runner: Optional[Runner] = None) -> Dict[str, Any]:
+    """:func:`derive_media` for media written to storage by someone else (Veo output)."""
+    try:
+        data = storage.download_bytes(storage_path)
+    except Exception as exc:
+        logger.warning("Could not read %s for derivatives: %s", storage_path, exc)
+        return {}
+    return derive_media(post_id=post_id, media_type=media_type, data=data, runner=runner)
+
+
+__all__ = ["Runner", "derive_media", "derive_stored_media", "video_stills", "webp_thumbnails"]
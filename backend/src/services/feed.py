@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import random
+import threading
 import time
-from typing import List
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
 
 from ..config import get_settings
 from ..models.schemas import FeedItem, FeedRequest, FeedResponse, ModerationRequest, Post
@@ -11,91 +14,224 @@ from . import generation, moderation, reco, store
 
 logger = logging.getLogger(__name__)
 
+FeedPage = Tuple[List[FeedItem], bool, Optional[str]]
 
-def build_feed(req: FeedRequest) -> FeedResponse:
-    settings = get_settings()
-    db = store.get_store()
-
-    logger.warning(f"🔄 FEED REQUEST RECEIVED: user={req.uid}, feed_type={req.feedType}, page={req.page}, timestamp={time.time()}")
-    
-    items, has_more = db.get_feed_ready(req.uid, settings.feed_size, feed_type=req.feedType, page=req.page)
-    
-    # CRITICAL: Only show user's explicit creations - no auto-generation
-    # Auto-generation would waste Vertex AI quota and run up costs
-    # Users must explicitly use the composer to create content
-    logger.warning(f"FEED DEBUG: Returning {len(items)} posts for user {req.uid} (feed_type={req.feedType}, page={req.page}), has_more={has_more}")
-    
+PUBLIC_FEED_TYPES = ("hot", "interests")
+
+
+class _LoadAbandoned(Exception):
+    """The request loading a public feed page was cancelled before it finished."""
+
+
+class PublicFeedCache:
+    """Size-bounded TTL cache for public feed pages shared by all users.
+
+    Entries are dropped as soon as the bound store saves a new ready public
+    post; concurrent misses for the same page wait on a single store read.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, FeedPage]]" = OrderedDict()
+        self._inflight: Dict[Hashable, "asyncio.Future[FeedPage]"] = {}
+        self._lock = threading.Lock()
+        self._store: Any = None
+
+    def bind(self, db: Any) -> None:
+        """Attach to the active store, resetting when the store is swapped out."""
+        if db is self._store:
+            return
+        with self._lock:
+            if db is self._store:
+                return
+            self._entries.clear()
+            self._store = db
+        db.on_public_post(lambda _post: self.clear())
+
+    async def get_or_load_async(self, key: Hashable, loader: Callable[[], Awaitable[FeedPage]]) -> FeedPage:
+        """Return the cached page for ``key``, or load it once for all concurrent misses.
+
+        If the request doing the load is cancelled, the first waiter takes over.
+        """
+        page = self._get(key)
+        if page is not None:
+            return page
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except _LoadAbandoned:
+                return await self.get_or_load_async(key, loader)
+        future: "asyncio.Future[FeedPage]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        with self._lock:
+            self.misses += 1
+        try:
+            page = await loader()
+        except asyncio.CancelledError:
+            # Cancelling the future would cancel every waiter too: hand over instead
+            future.set_exception(_LoadAbandoned())
+            future.exception()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark retrieved so waiter-less failures don't log "never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self._put(key, page)
+        future.set_result(page)
+        return page
+
+    def _put(self, key: Hashable, page: FeedPage) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, page)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get(self, key: Hashable) -> Optional[FeedPage]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, page = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+_settings = get_settings()
+PUBLIC_FEED_CACHE = PublicFeedCache(
+    ttl_seconds=_settings.feed_cache_ttl_seconds,
+    max_entries=_settings.feed_cache_max_pages,
+)
+
+
+def _public_cache_key(db, req: FeedRequest) -> Hashable:
+    # hot and interests run the same global query, so they share cache entries
+    owner = None if getattr(db, "shared_public_feed", False) else req.uid
+    return (owner, req.cursor, None if req.cursor else req.page)
+
+
+def _feed_response(req: FeedRequest, page: FeedPage) -> FeedResponse:
+    items, has_more, next_cursor = page
     return FeedResponse(
         items=items,
         hasMore=has_more,
-        nextPage=req.page + 1 if has_more else req.page
+        nextPage=req.page + 1 if has_more else req.page,
+        nextCursor=next_cursor,
     )
-    
-    # AUTO-GENERATION DISABLED - Code below is commented out to prevent costs
-    # Uncomment if you want to re-enable automatic feed filling
-    #
-    # missing = settings.feed_size - len(items)
-    # if missing <= 0:
-    #     return items
-    #
-    # plan = _build_slot_plan(missing, settings)
-    # for reason in plan:
-    #     media_type = "video" if random.random() < 0.2 else "image"
-    #     budget_key = "videos" if media_type == "video" else "images"
-    #
-    #     if not db.consume_budget(req.uid, budget_key):
-    #         fallback = db.pick_fallback()
-    #         if fallback:
-    #             items.append(FeedItem(slot="FALLBACK", post=fallback, reason=["budget"]))
-    #         else:
-    #             items.append(FeedItem(slot="FALLBACK", reason=["budget"]))
-    #         continue
-    #
-    #     topic = _choose_topic_for_reason(req.uid, reason)
-    #     prompt = reco.build_prompt(topic)
-    #     moderation_result = moderation.moderate(ModerationRequest(prompt=prompt))
-    #     if not moderation_result.allowed:
-    #         fallback = db.pick_fallback()
-    #         reason_list = ["moderation", *moderation_result.reasons] if fallback else ["moderation"]
-    #         items.append(FeedItem(slot="FALLBACK", post=fallback, reason=reason_list))
-    #         continue
-    #
-    #     job_id, post_payload, delay_ms = generation.enqueue_generation(
-    #         req.uid,
-    #         prompt,
-    #         media_type,
-    #         aspect="9:16",
-    #         seed=None,
-    #     )
-    #     
-    #     logger.info(f"Generation result: job_id={job_id}, delay_ms={delay_ms}, status={post_payload.get('status')}")
-    #     
-    #     if delay_ms == 0 and post_payload.get("status") == "ready":
-    #         logger.info(f"Saving ready post immediately: {post_payload.get('id')}")
-    #         saved_post = db.save_post(post_payload)
-    #         db.attach_to_feed(req.uid, saved_post, score=1.0, reason=[reason])
-    #         post_obj = Post(**post_payload)
-    #         items.append(FeedItem(slot="READY", post=post_obj, reason=[reason]))
-    #         logger.info(f"Added READY item to feed and attached to user {req.uid}")
-    #     else:
-    #         logger.info(f"Saving as pending job: {job_id}")
-    #         ready_at = time.time() + (delay_ms / 1000.0)
-    #         db.save_job(job_id, {
-    #             "jobId": job_id,
-    #             "userId": req.uid,
-    #             "status": "pending",
-    #             "post": post_payload,
-    #             "ready_at": ready_at,
-    #             "reasons": [reason],
-    #         })
-    #         items.append(FeedItem(slot="PENDING", jobId=job_id, reason=[reason]))
-    #
-    # if len(items) < settings.feed_size:
-    #     fallback = db.pick_fallback()
-    #     if fallback:
-    #         items.append(FeedItem(slot="FALLBACK", post=fallback, reason=["fallback"]))
-    #
-    # return items[: settings.feed_size]
+
+
+async def build_feed_async(req: FeedRequest) -> FeedResponse:
+    """Build a ``/feed`` response, reading through the async store.
+
+    Public feed types are served from :data:`PUBLIC_FEED_CACHE`.
+    """
+    settings = get_settings()
+    db = store.get_async_store()
+
+    async def load() -> FeedPage:
+        return await db.get_feed_ready(
+            req.uid, settings.feed_size, feed_type=req.feedType, page=req.page,
+            cursor=req.cursor, seed=req.seed,
+        )
+
+    if req.feedType in PUBLIC_FEED_TYPES and settings.feed_cache_ttl_seconds > 0:
+        # Bind to the sync store: both clients share its public-post listeners
+        PUBLIC_FEED_CACHE.bind(store.get_store())
+        page = await PUBLIC_FEED_CACHE.get_or_load_async(_public_cache_key(db, req), load)
+    else:
+        page = await load()
+    logger.debug("Async feed for %s (feed_type=%s): returned=%d", req.uid, req.feedType, len(page[0]))
+    return _feed_response(req, page)
+
+
+# CRITICAL: Only show user's explicit creations - no auto-generation
+# Auto-generation would waste Vertex AI quota and run up costs
+# Users must explicitly use the composer to create content
+#
+# AUTO-GENERATION DISABLED - Code below is commented out to prevent costs
+# Uncomment if you want to re-enable automatic feed filling
+#
+# missing = settings.feed_size - len(items)
+# if missing <= 0:
+#     return items
+#
+# plan = _build_slot_plan(missing, settings)
+# for reason in plan:
+#     media_type = "video" if random.random() < 0.2 else "image"
+#     budget_key = "videos" if media_type == "video" else "images"
+#
+#     if not db.consume_budget(req.uid, budget_key):
+#         fallback = db.pick_fallback()
+#         if fallback:
+#             items.append(FeedItem(slot="FALLBACK", post=fallback, reason=["budget"]))
+#         else:
+#             items.append(FeedItem(slot="FALLBACK", reason=["budget"]))
+#         continue
+#
+#     topic = _choose_topic_for_reason(req.uid, reason)
+#     prompt = reco.build_prompt(topic)
+#     moderation_result = moderation.moderate(ModerationRequest(prompt=prompt))
+#     if not moderation_result.allowed:
+#         fallback = db.pick_fallback()
+#         reason_list = ["moderation", *moderation_result.reasons] if fallback else ["moderation"]
+#         items.append(FeedItem(slot="FALLBACK", post=fallback, reason=reason_list))
+#         continue
+#
+#     job_id, post_payload, delay_ms = generation.enqueue_generation(
+#         req.uid,
+#         prompt,
+#         media_type,
+#         aspect="9:16",
+#         seed=None,
+#     )
+#     
+#     logger.info(f"Generation result: job_id={job_id}, delay_ms={delay_ms}, status={post_payload.get('status')}")
+#     
+#     if delay_ms == 0 and post_payload.get("status") == "ready":
+#         logger.info(f"Saving ready post immediately: {post_payload.get('id')}")
+#         saved_post = db.save_post(post_payload)
+#         db.attach_to_feed(req.uid, saved_post, score=1.0, reason=[reason])
+#         post_obj = Post(**post_payload)
+#         items.append(FeedItem(slot="READY", post=post_obj, reason=[reason]))
+#         logger.info(f"Added READY item to feed and attached to user {req.uid}")
+#     else:
+#         logger.info(f"Saving as pending job: {job_id}")
+#         ready_at = time.time() + (delay_ms / 1000.0)
+#         db.save_job(job_id, {
+#             "jobId": job_id,
+#             "userId": req.uid,
+#             "status": "pending",
+#             "post": post_payload,
+#             "ready_at": ready_at,
+#             "reasons": [reason],
+#         })
+#         items.append(FeedItem(slot="PENDING", jobId=job_id, reason=[reason]))
+#
+# if len(items) < settings.feed_size:
+#     fallback = db.pick_fallback()
+#     if fallback:
+#         items.append(FeedItem(slot="FALLBACK", post=fallback, reason=["fallback"]))
+#
+# return items[: settings.feed_size]
 
 
 def _build_slot_plan(missing: int, settings) -> List[str]:
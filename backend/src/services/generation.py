@@ -5,8 +5,9 @@ import uuid
 from typing import Any, Dict, Tuple
 
 from ..config import get_settings
+from .generation_cache import GENERATION_CACHE, cache_key, post_for_request
 from .mocks import slow_pending_then_ready
-from .pubsub_client import publish_generate_request
+from .scheduler import SCHEDULER, SchedulerBusy
 from .prompt_utils import enhance_prompt_for_social, generate_title_from_prompt
 
 try:  # pragma: no cover - optional import
@@ -17,6 +18,9 @@ except Exception:  # pragma: no cover - optional import
 
 logger = logging.getLogger(__name__)
 
+# Typical Veo turnaround; surfaced to clients as etaMs for submitted videos.
+VIDEO_ETA_MS = 60_000
+
 
 def enqueue_generation(
     uid: str,
@@ -28,7 +32,12 @@ def enqueue_generation(
     audio: bool = True,
     is_private: bool = False,
     reference_image_uris: list[str] | None = None,
+    priority: str = "interactive",
 ) -> tuple[str, dict[str, Any], int]:
+    """Start a generation; ``priority`` is its scheduler class (see scheduler.PRIORITY_CLASSES).
+
+    Raises :class:`SchedulerBusy` when no model slot frees up in time.
+    """
     settings = get_settings()
     
     # Generate display-friendly title from the prompt
@@ -53,9 +62,8 @@ def enqueue_generation(
             "mediaType": media_type,
             "aspect": aspect,
             "seed": seed,
+            "priority": priority,
         }
-        publish_generate_request(payload)
-
         post = {
             "id": job_id,
             "type": media_type,
@@ -71,14 +79,31 @@ def enqueue_generation(
             "synthId": True,
             "authorUid": uid,
             "isPrivate": is_private,
+            # Placeholder only: the worker writes the post, it must not be promoted
+            "queued": True,
+            # Published by the caller once the pending job is saved: the worker's
+            # (or dead-letter handler's) terminal write must land after it
+            "generateRequest": payload,
         }
         logger.info("Queued generation job %s for user %s", job_id, uid)
         return job_id, post, max(settings.generate_timeout_ms, 30_000)
 
     if media_type == "image":
-        return _vertex_image(uid, enhanced_prompt, prompt, title, aspect, seed, is_private, reference_image_uris)
+        # Identical concurrent requests share one Imagen call; the same user's
+        # repeat within the reuse window (double-tap, retry) gets the finished post
+        key = cache_key(enhanced_prompt, media_type, aspect, seed, reference_image_uris)
+        def generate() -> Tuple[str, Dict, int]:
+            from .vertex import IMAGEN_FAST_MODEL
+
+            # Only the request that actually calls Imagen takes a model slot
+            with SCHEDULER.slot(uid=uid, model=IMAGEN_FAST_MODEL, priority=priority,
+                                timeout=settings.scheduler_max_wait_seconds):
+                return _vertex_image(uid, enhanced_prompt, prompt, title, aspect, seed, is_private, reference_image_uris)
+
+        post = GENERATION_CACHE.get_or_generate(key, generate, uid=uid)
+        return post_for_request(post, uid=uid, prompt=prompt, title=title, is_private=is_private)
     if media_type == "video":
-        return _vertex_video(uid, enhanced_prompt, prompt, title, aspect, seed, duration, audio, is_private, reference_image_uris)
+        return _vertex_video(uid, enhanced_prompt, prompt, title, aspect, seed, duration, audio, is_private, reference_image_uris, priority)
     raise ValueError(f"Unsupported media type {media_type}")
 
 
@@ -87,11 +112,9 @@ def _vertex_image(uid: str, enhanced_prompt: str, original_prompt: str, title: s
     if aiplatform is None:
         raise RuntimeError("google-cloud-aiplatform not configured; set ENABLE_MOCKS=true for local development")
     
+    from .derivatives import derive_media
     from .storage import upload_media_bytes
-    from vertexai.preview.vision_models import ImageGenerationModel
-    
-    # Initialize Vertex AI
-    aiplatform.init(project=settings.vertex_project, location=settings.vertex_region)
+    from .vertex import IMAGEN_FAST_MODEL, get_image_model
     
     # Generate image using Imagen 4 Fast (latest image model)
     logger.info(f"Generating {'private' if is_private else 'public'} image with Imagen 4 Fast")
@@ -106,7 +129,8 @@ def _vertex_image(uid: str, enhanced_prompt: str, original_prompt: str, title: s
         enhanced_prompt = f"Feature the person from the reference image: {enhanced_prompt}"
         logger.info(f"Modified prompt with reference images: {enhanced_prompt}")
     
-    model = ImageGenerationModel.from_pretrained("imagen-4.0-fast-generate-001")
+    # Process-wide handle: SDK init and model lookup happen once, not per request
+    model = get_image_model(IMAGEN_FAST_MODEL)
     
     # Convert aspect ratio to size
     aspect_sizes = {
@@ -157,7 +181,7 @@ def _vertex_image(uid: str, enhanced_prompt: str, original_prompt: str, title: s
         "publicUrl": result.public_url,
         "duration": None,
         "aspect": aspect,
-        "model": "imagen-4.0-fast-generate-001",
+        "model": IMAGEN_FAST_MODEL,
         "prompt": original_prompt,  # Store original user prompt
         "title": title,  # Store display-friendly title
         "seed": seed,
@@ -165,15 +189,17 @@ def _vertex_image(uid: str, enhanced_prompt: str, original_prompt: str, title: s
         "synthId": True,
         "authorUid": uid,
         "isPrivate": is_private,
+        **derive_media(post_id=job_id, media_type="image", data=image_bytes),
     }
     return job_id, post, 0  # 0 timeout since it's already ready
 
 
-def _vertex_video(uid: str, enhanced_prompt: str, original_prompt: str, title: str, aspect: str, seed: int | None, duration: int = 6, audio: bool = True, is_private: bool = False, reference_image_uris: list[str] | None = None) -> Tuple[str, Dict, int]:  # pragma: no cover - requires Vertex
+def _vertex_video(uid: str, enhanced_prompt: str, original_prompt: str, title: str, aspect: str, seed: int | None, duration: int = 6, audio: bool = True, is_private: bool = False, reference_image_uris: list[str] | None = None, priority: str = "interactive") -> Tuple[str, Dict, int]:  # pragma: no cover - requires Vertex
     """
     Submit video generation request using Vertex AI Veo 3 Fast.
-    NOTE: Video generation operations cannot be polled via the standard REST API.
-    For now, this returns a pending status immediately. A background worker is needed to check completion.
+    Returns a pending post as soon as predictLongRunning accepts the request; the
+    post carries an ``operation`` entry ({name, model}) that the video poller
+    resolves with fetchPredictOperation (see video_poller.py).
     """
     settings = get_settings()
     if aiplatform is None:
@@ -181,9 +207,6 @@ def _vertex_video(uid: str, enhanced_prompt: str, original_prompt: str, title: s
     
     post_id = str(uuid.uuid4())
     
-    # Initialize Vertex AI
-    aiplatform.init(project=settings.vertex_project, location=settings.vertex_region)
-    
     # Prepare the request payload
     storage_path = f"gs://{settings.storage_bucket}/{settings.cloud_storage_media_prefix}/videos/{post_id}.mp4"
     
@@ -201,25 +224,9 @@ def _vertex_video(uid: str, enhanced_prompt: str, original_prompt: str, title: s
     if reference_image_uris:
         logger.warning(f"Using {len(reference_image_uris)} reference image(s) (asset type) for personalization from GCS")
     
-    import time
-    import requests
-    from google.auth import default
-    from google.auth.transport.requests import Request as AuthRequest
+    from .vertex import get_rest_client
     
     try:
-        # Get credentials
-        credentials, project = default()
-        auth_req = AuthRequest()
-        
-        # Refresh to get token
-        if hasattr(credentials, 'refresh'):
-            credentials.refresh(auth_req)  # type: ignore
-        
-        # Get token
-        token = credentials.token if hasattr(credentials, 'token') else None  # type: ignore
-        if not token:
-            raise RuntimeError("Could not obtain authentication token")
-        
         # Build request payload
         instance: Dict[str, Any] = {
             "prompt": enhanced_prompt  # Use enhanced prompt for generation
@@ -279,135 +286,30 @@ def _vertex_video(uid: str, enhanced_prompt: str, original_prompt: str, title: s
             payload["parameters"]["seed"] = seed
         
         # Call the predictLongRunning API (use model_id determined above)
-        endpoint_url = (
-            f"https://{settings.vertex_region}-aiplatform.googleapis.com/v1/"
-            f"projects/{settings.vertex_project}/locations/{settings.vertex_region}/"
-            f"publishers/google/models/{model_id}:predictLongRunning"
-        )
-        
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
-        
-        logger.warning("Calling predictLongRunning at: %s", endpoint_url)
+        logger.warning("Calling predictLongRunning for model: %s", model_id)
         # Log payload without base64 image data to avoid terminal overflow
         payload_summary = {
             "instances": [{"prompt": instance.get("prompt"), "hasReferenceImages": "referenceImages" in instance}],
             "parameters": payload["parameters"]
         }
         logger.warning("Request payload: %s", payload_summary)
-        response = requests.post(endpoint_url, json=payload, headers=headers)
-        
-        if response.status_code != 200:
-            logger.error("API error response: %s", response.text)
-            logger.error("Request had referenceImages: %s", "referenceImages" in instance)
-        
-        response.raise_for_status()
-        
-        operation_data = response.json()
-        operation_name = operation_data.get("name")
-        
-        if not operation_name:
-            raise RuntimeError("No operation name returned from video generation API")
+        # Wait for a Veo slot; it stays taken until the video poller settles the operation
+        grant = SCHEDULER.acquire(uid=uid, model=model_id, priority=priority,
+                                  timeout=settings.scheduler_max_wait_seconds)
+        try:
+            # Shared keep-alive client: pooled connection, cached token, timeouts and retries
+            operation_data = get_rest_client().predict_long_running(model_id, payload)
+            operation_name = operation_data.get("name")
+            if not operation_name:
+                raise RuntimeError("No operation name returned from video generation API")
+        except Exception:
+            SCHEDULER.release(grant)
+            raise
+        SCHEDULER.hold(post_id, grant)
         
         logger.warning("Operation started: %s", operation_name)
         
-        # Poll the operation until complete
-        max_wait_seconds = 90
-        poll_interval = 3
-        elapsed = 0
-        
-        # Use fetchPredictOperation to poll (NOT a GET to the operation path!)
-        # Must use the same model_id as the initial request
-        fetch_operation_url = (
-            f"https://{settings.vertex_region}-aiplatform.googleapis.com/v1/"
-            f"projects/{settings.vertex_project}/locations/{settings.vertex_region}/"
-            f"publishers/google/models/{model_id}:fetchPredictOperation"
-        )
-        
-        logger.warning("Polling with fetchPredictOperation at: %s", fetch_operation_url)
-        
-        # Wait a bit before first poll
-        time.sleep(5)
-        elapsed = 5
-        
-        while elapsed < max_wait_seconds:
-            # Refresh credentials if needed
-            if hasattr(credentials, 'valid') and hasattr(credentials, 'refresh'):
-                if not credentials.valid:  # type: ignore
-                    credentials.refresh(auth_req)  # type: ignore
-                    token = credentials.token if hasattr(credentials, 'token') else token  # type: ignore
-                    headers["Authorization"] = f"Bearer {token}"
-            
-            # Check operation status using fetchPredictOperation (POST with operationName in body)
-            poll_payload = {"operationName": operation_name}
-            check_response = requests.post(fetch_operation_url, json=poll_payload, headers=headers)
-            
-            if check_response.status_code != 200:
-                logger.warning("Poll status %d: %s", check_response.status_code, check_response.text[:500])
-                time.sleep(poll_interval)
-                elapsed += poll_interval
-                continue
-            
-            operation_status = check_response.json()
-            
-            if operation_status.get("done"):
-                logger.warning("Video generation completed in %d seconds", elapsed)
-                
-                # Check for errors
-                if "error" in operation_status:
-                    error_msg = operation_status["error"].get("message", "Unknown error")
-                    raise RuntimeError(f"Video generation failed: {error_msg}")
-                
-                # Extract video from response
-                response_data = operation_status.get("response", {})
-                videos = response_data.get("videos", [])
-                
-                if not videos or len(videos) == 0:
-                    raise RuntimeError("No videos in response")
-                
-                # Get the first video
-                video = videos[0]
-                video_gcs_uri = video.get("gcsUri")
-                
-                if not video_gcs_uri:
-                    raise RuntimeError("No gcsUri in video response")
-                
-                logger.warning("Video generated at: %s", video_gcs_uri)
-                
-                # Convert GCS URI to public URL
-                # gs://bucket/path -> https://storage.googleapis.com/bucket/path
-                public_url = video_gcs_uri.replace("gs://", "https://storage.googleapis.com/")
-                storage_path_relative = video_gcs_uri.replace(f"gs://{settings.storage_bucket}/", "")
-                
-                post = {
-                    "id": post_id,
-                    "type": "video",
-                    "status": "ready",
-                    "storagePath": storage_path_relative,
-                    "publicUrl": public_url,
-                    "duration": 6,
-                    "aspect": aspect,
-                    "model": model_id,  # Use the model that was actually used
-                    "prompt": original_prompt,  # Store original user prompt
-                    "title": title,  # Store display-friendly title
-                    "seed": seed,
-                    "safety": {"blocked": False, "scores": {}},
-                    "synthId": True,
-                    "authorUid": uid,
-                    "isPrivate": is_private,
-                }
-                
-                logger.warning("Video generation successful: %s -> %s", post_id, public_url)
-                return post_id, post, 0
-            
-            logger.debug("Polling... elapsed: %d seconds", elapsed)
-            time.sleep(poll_interval)
-            elapsed += poll_interval
-        
-        # Timeout
-        logger.warning("Video generation timed out after %d seconds", elapsed)
+        # Return right away; the video poller advances the operation and promotes the post
         post = {
             "id": post_id,
             "type": "video",
@@ -423,9 +325,12 @@ def _vertex_video(uid: str, enhanced_prompt: str, original_prompt: str, title: s
             "synthId": True,
             "authorUid": uid,
             "isPrivate": is_private,
+            "operation": {"name": operation_name, "model": model_id},
         }
-        return post_id, post, 0
+        return post_id, post, VIDEO_ETA_MS
         
+    except SchedulerBusy:
+        raise
     except Exception as e:
         logger.error("Video generation failed: %s", str(e), exc_info=True)
         # Use fallback model name if model_id wasn't set yet
@@ -447,3 +352,29 @@ def _vertex_video(uid: str, enhanced_prompt: str, original_prompt: str, title: s
             "isPrivate": is_private,
         }
         return post_id, post, 0
+
+
+def video_post_from_operation(post: Dict[str, Any], operation_status: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a finished video operation into the ready post payload; raises ``RuntimeError`` on failure."""
+    settings = get_settings()
+    if "error" in operation_status:
+        error_msg = operation_status["error"].get("message", "Unknown error")
+        raise RuntimeError(f"Video generation failed: {error_msg}")
+
+    # Extract video from response
+    videos = operation_status.get("response", {}).get("videos", [])
+    if not videos:
+        raise RuntimeError("No videos in response")
+    video_gcs_uri = videos[0].get("gcsUri")
+    if not video_gcs_uri:
+        raise RuntimeError("No gcsUri in video response")
+
+    # gs://bucket/path -> https://storage.googleapis.com/bucket/path
+    ready = {key: value for key, value in post.items() if key != "operation"}
+    ready.update(
+        status="ready",
+        storagePath=video_gcs_uri.replace(f"gs://{settings.storage_bucket}/", ""),
+        publicUrl=video_gcs_uri.replace("gs://", "https://storage.googleapis.com/"),
+        duration=ready.get("duration") or 6,
+    )
+    return ready
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from ..config import get_settings
+from . import store
+
+logger = logging.getLogger(__name__)
+
+GenerationResult = Tuple[str, Dict[str, Any], int]
+
+# Fields copied from the cached post when another request reuses its media.
+_MEDIA_FIELDS = (
+    "type", "storagePath", "publicUrl", "duration", "aspect", "model", "seed", "safety", "synthId",
+    "thumbnails", "poster", "preview",
+)
+
+
+def cache_key(prompt: str, media_type: str, aspect: str, seed: Optional[int],
+              reference_uris: Optional[Sequence[str]] = None) -> str:
+    """Content address of a generation request; case and whitespace in the prompt don't matter."""
+    normalized = re.sub(r"\s+", " ", prompt).strip().lower()
+    material = json.dumps(
+        [normalized, media_type, aspect, seed, list(reference_uris or [])],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """Content-addressed cache of finished generations: in-process LRU over the store.
+
+    Concurrent identical requests share one generation (single-flight). A
+    finished result is reused only for the user it was generated for and only
+    for ``reuse_ttl_seconds``: that absorbs double-taps and client retries
+    (possibly landing on another instance, hence the store), while a prompt
+    resubmitted later is asking for a new image - Imagen output is not
+    reproducible, even with a seed.
+    """
+
+    def __init__(self, max_entries: int = 512, reuse_ttl_seconds: float = 120.0,
+                 clock: Callable[[], float] = time.time) -> None:
+        self.max_entries = max_entries
+        self.reuse_ttl_seconds = reuse_ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        # key -> (post, stored at); entries past the reuse window are dropped on read
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._inflight: Dict[str, "Future[Dict[str, Any]]"] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """The finished post for ``key`` if it is still inside the reuse window."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                post, stored_at = entry
+                if self._fresh(stored_at):
+                    self._entries.move_to_end(key)
+                    return post
+                del self._entries[key]
+                return None
+        stored = store.get_store().get_generation(key)
+        if stored is None or not self._fresh(stored.get("storedAt", 0)):
+            return None
+        self._remember(key, stored["post"], stored["storedAt"])
+        return stored["post"]
+
+    def _fresh(self, stored_at: float) -> bool:
+        return self.clock() - stored_at <= self.reuse_ttl_seconds
+
+    def _remember(self, key: str, post: Dict[str, Any], stored_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (post, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_generate(self, key: str, generate: Callable[[], GenerationResult], *,
+                        uid: Optional[str] = None) -> Dict[str, Any]:
+        """Return the ready post payload for ``key``, generating it at most once.
+
+        With ``uid``, a result generated for that user within the reuse window
+        is returned instead of generating again.
+        """
+        if uid is not None:
+            post = self.lookup(key)
+            if post is not None and post.get("authorUid") == uid:
+                with self._lock:
+                    self.hits += 1
+                return post
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                future: "Future[Dict[str, Any]]" = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if pending is not None:
+            return pending.result()
+        try:
+            _, post, _ = generate()
+            if post.get("status") == "ready":
+                stored_at = self.clock()
+                self._remember(key, post, stored_at)
+                store.get_store().save_generation(key, {"post": post, "storedAt": stored_at, "createdAt": datetime.utcnow()})
+            future.set_result(post)
+            return post
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "size": len(self._entries)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def post_for_request(post: Dict[str, Any], *, uid: str, prompt: str, title: str,
+                     is_private: bool) -> GenerationResult:
+    """Adapt a cached post to the request that asked for it.
+
+    The same user with the same privacy gets the very same post back (re-attaching
+    it is idempotent); anyone else gets a new post that points at the same media.
+    """
+    if post.get("status") != "ready":
+        return post["id"], post, 0
+    if post.get("authorUid") == uid and bool(post.get("isPrivate")) == is_private:
+        return post["id"], dict(post), 0
+    job_id = str(uuid.uuid4())
+    reused = {field: post.get(field) for field in _MEDIA_FIELDS if field in post}
+    reused.update(
+        id=job_id,
+        status="ready",
+        prompt=prompt,
+        title=title,
+        authorUid=uid,
+        isPrivate=is_private,
+    )
+    return job_id, reused, 0
+
+
+GENERATION_CACHE = GenerationCache(
+    max_entries=get_settings().generation_cache_size,
+    reuse_ttl_seconds=get_settings().generation_reuse_ttl_seconds,
+)
+
+
+__all__ = ["GENERATION_CACHE", "GenerationCache", "cache_key", "post_for_request"]
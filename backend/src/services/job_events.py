@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("ready", "failed")
+
+
+class JobSubscription:
+    """Queue of job events for one listener, bound to the listener's event loop."""
+
+    def __init__(self, job_ids: Iterable[str]) -> None:
+        self.job_ids = frozenset(job_ids)
+        self.loop = asyncio.get_running_loop()
+        self.queue: "asyncio.Queue[Dict]" = asyncio.Queue()
+
+    def _deliver(self, event: Dict) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+        except RuntimeError:  # pragma: no cover - listener's loop already closed
+            pass
+
+
+class JobEventHub:
+    """In-process pub/sub for job state changes.
+
+    Producers (job promotion, the video poller, the Pub/Sub worker) call
+    :meth:`publish` from any thread; ``/gen/events`` streams hold a
+    :class:`JobSubscription` and receive the events on their own loop.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: Dict[str, Set[JobSubscription]] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, job_ids: Iterable[str]) -> JobSubscription:
+        subscription = JobSubscription(job_ids)
+        with self._lock:
+            for job_id in subscription.job_ids:
+                self._subscribers.setdefault(job_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: JobSubscription) -> None:
+        with self._lock:
+            for job_id in subscription.job_ids:
+                listeners = self._subscribers.get(job_id)
+                if listeners is None:
+                    continue
+                listeners.discard(subscription)
+                if not listeners:
+                    del self._subscribers[job_id]
+
+    def publish(self, job_id: str, status: str, post_id: Optional[str] = None,
+                error: Optional[str] = None) -> None:
+        event: Dict = {"jobId": job_id, "status": status, "postId": post_id}
+        if error:
+            event["error"] = error
+        with self._lock:
+            self.published += 1
+            listeners = list(self._subscribers.get(job_id, ()))
+        for subscription in listeners:
+            subscription._deliver(event)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "subscribers": len({sub for subs in self._subscribers.values() for sub in subs}),
+                "published": self.published,
+            }
+
+
+JOB_EVENTS = JobEventHub()
+
+
+__all__ = ["JOB_EVENTS", "JobEventHub", "JobSubscription", "TERMINAL_STATUSES"]
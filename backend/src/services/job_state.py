@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import time
+from typing import Dict
+
+# Internal status while one request/instance promotes a pending job; clients see "pending".
+PROMOTING = "promoting"
+
+
+def job_claimable(job: Dict, lease_seconds: float) -> bool:
+    """A job can be promoted when pending, or when a previous promoter's lease lapsed."""
+    if job.get("status") == "pending":
+        return True
+    return job.get("status") == PROMOTING and time.time() - job.get("promotingAt", 0) > lease_seconds
+
+
+def public_status(status: str) -> str:
+    return "pending" if status == PROMOTING else status
+
+
+__all__ = ["PROMOTING", "job_claimable", "public_status"]
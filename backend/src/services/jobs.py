@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .job_events import JOB_EVENTS, TERMINAL_STATUSES
+from .job_state import PROMOTING, public_status
+
+logger = logging.getLogger(__name__)
+
+
+def promotable(job: Dict) -> bool:
+    """Pending composer/variation jobs whose ETA passed; operation-backed jobs belong to the video poller.
+
+    Jobs queued on Pub/Sub (``queued``) carry only a placeholder post and jobs
+    without a post (base images) have nothing to promote: whoever runs them
+    finishes them.
+    """
+    return (
+        job.get("status") in ("pending", PROMOTING)
+        and "post" in job
+        and not job.get("queued")
+        and not job.get("operation")
+        and time.time() >= job.get("ready_at", 0)
+    )
+
+
+class JobPromoter:
+    """Promotes a pending job to a ready post exactly once.
+
+    Concurrent status polls in this process await the same promotion
+    (single-flight); across instances the store's ``claim_job`` compare-and-set
+    lets only one of them write the post, the feed entry and the job.
+    """
+
+    def __init__(self, lease_seconds: float = 30.0) -> None:
+        self.lease_seconds = lease_seconds
+        self.promotions = 0
+        self.coalesced = 0
+        self._inflight: Dict[str, "asyncio.Future[Optional[Dict]]"] = {}
+
+    async def promote(self, db: Any, job_id: str) -> Optional[Dict]:
+        pending = self._inflight.get(job_id)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+        future: "asyncio.Future[Optional[Dict]]" = asyncio.get_running_loop().create_future()
+        self._inflight[job_id] = future
+        try:
+            job = await self._promote(db, job_id)
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # waiters re-raise; don't warn when there are none
+            raise
+        finally:
+            self._inflight.pop(job_id, None)
+        future.set_result(job)
+        return job
+
+    async def _promote(self, db: Any, job_id: str) -> Optional[Dict]:
+        job = await db.claim_job(job_id, self.lease_seconds)
+        if job is None:
+            # Already promoted, or another instance holds the claim
+            return await db.get_job(job_id)
+        try:
+            post_payload = job["post"]
+            post_payload["status"] = "ready"
+            saved_post = await db.save_post(post_payload)
+            await db.attach_to_feed(job.get("userId", "system"), saved_post, score=1.0, reason=job.get("reasons", ["generated"]))
+        except Exception:
+            # Hand the job back so the next poll can retry
+            job["status"] = "pending"
+            await db.save_job(job_id, job)
+            raise
+        job["status"] = "ready"
+        job["postId"] = saved_post.id
+        job["updated_at"] = time.time()
+        await db.save_job(job_id, job)
+        self.promotions += 1
+        JOB_EVENTS.publish(job_id, "ready", saved_post.id)
+        return job
+
+    async def promote_due(self, db: Any, jobs: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Promote every promotable job in ``jobs`` concurrently; returns the updated map."""
+        due = [job_id for job_id, job in jobs.items() if promotable(job)]
+        if not due:
+            return jobs
+        promoted = await asyncio.gather(*(self.promote(db, job_id) for job_id in due))
+        updated = dict(jobs)
+        for job_id, job in zip(due, promoted):
+            if job is not None:
+                updated[job_id] = job
+        return updated
+
+    def stats(self) -> Dict[str, int]:
+        return {"promotions": self.promotions, "coalesced": self.coalesced, "inFlight": len(self._inflight)}
+
+
+JOB_PROMOTER = JobPromoter()
+
+
+def _sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def job_event_stream(db: Any, job_ids: List[str], *, timeout_seconds: float = 300.0,
+                           heartbeat_seconds: float = 15.0) -> AsyncIterator[str]:
+    """Server-Sent Events for ``job_ids``: current state first, then every change.
+
+    Lazily promoted jobs have no background producer, so the stream promotes
+    them itself once their ETA passes. Jobs finished in another process (the
+    pull worker, another instance's poller) never reach this process's hub, so
+    the waiting jobs are also re-read from the store every heartbeat. Ends
+    when every job is ready/failed (or unknown) or after ``timeout_seconds``;
+    clients reconnect to keep listening.
+    """
+    subscription = JOB_EVENTS.subscribe(job_ids)
+    try:
+        waiting: Dict[str, Dict] = {}
+        known = await db.get_jobs(job_ids)
+        for job_id in job_ids:
+            job = known.get(job_id)
+            if job is None:
+                yield _sse("job", {"jobId": job_id, "status": "missing", "postId": None})
+                continue
+            status = public_status(job["status"])
+            yield _sse("job", {"jobId": job_id, "status": status, "postId": job.get("postId")})
+            if status not in TERMINAL_STATUSES:
+                waiting[job_id] = job
+
+        deadline = time.monotonic() + timeout_seconds
+        next_refresh = time.monotonic() + heartbeat_seconds
+        while waiting and time.monotonic() < deadline:
+            waiting = await JOB_PROMOTER.promote_due(db, waiting)
+            # Sleep until the next event, store refresh, or lazily-promoted job ETA
+            wake_in = min(next_refresh, deadline) - time.monotonic()
+            for job in waiting.values():
+                if _awaits_promotion(job):
+                    wake_in = min(wake_in, max(0.0, job.get("ready_at", 0) - time.time()))
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=max(wake_in, 0.01))
+            except asyncio.TimeoutError:
+                event = None
+            if event is not None and event["jobId"] in waiting:
+                event["status"] = public_status(event["status"])
+                yield _sse("job", event)
+                if event["status"] in TERMINAL_STATUSES:
+                    waiting.pop(event["jobId"], None)
+            if event is None or time.monotonic() >= next_refresh:
+                next_refresh = time.monotonic() + heartbeat_seconds
+                changed = 0
+                for job_id, job in (await db.get_jobs(list(waiting))).items():
+                    status = public_status(job["status"])
+                    if status != public_status(waiting[job_id]["status"]):
+                        changed += 1
+                        yield _sse("job", {"jobId": job_id, "status": status, "postId": job.get("postId"),
+                                           "error": job.get("error")})
+                    if status in TERMINAL_STATUSES:
+                        waiting.pop(job_id)
+                    else:
+                        waiting[job_id] = job
+                if event is None and not changed:
+                    yield ": keep-alive\n\n"
+        yield _sse("end", {"pending": sorted(waiting)})
+    finally:
+        JOB_EVENTS.unsubscribe(subscription)
+
+
+def _awaits_promotion(job: Dict) -> bool:
+    """Pending and promoted by this stream once ``ready_at`` passes (not yet due)."""
+    return job.get("status") == "pending" and "post" in job and not job.get("queued") and not job.get("operation")
+
+__all__ = ["JOB_PROMOTER", "JobPromoter", "job_event_stream", "promotable"]
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import Dict, Sequence, Tuple
+
+# Upper bounds (milliseconds) of the default latency buckets; the last bucket is open-ended.
+DEFAULT_BUCKETS_MS: Tuple[float, ...] = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class LatencyHistogram:
+    """Thread-safe, fixed-bucket latency histogram (Prometheus-style cumulative snapshot)."""
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS) -> None:
+        self.buckets_ms = tuple(sorted(buckets_ms))
+        self._counts = [0] * (len(self.buckets_ms) + 1)
+        self._count = 0
+        self._sum_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value_ms: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self.buckets_ms, value_ms)] += 1
+            self._count += 1
+            self._sum_ms += value_ms
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            cumulative: Dict[str, int] = {}
+            running = 0
+            for bound, count in zip(self.buckets_ms, self._counts):
+                running += count
+                cumulative[f"le_{bound:g}"] = running
+            cumulative["le_inf"] = self._count
+            return {
+                "count": self._count,
+                "sumMs": round(self._sum_ms, 3),
+                "buckets": cumulative,
+            }
+
+
+class HistogramSet:
+    """Named histograms created on first use, e.g. one per remote method."""
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS) -> None:
+        self.buckets_ms = tuple(buckets_ms)
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value_ms: float) -> None:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram(self.buckets_ms))
+        histogram.observe(value_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {name: histogram.snapshot() for name, histogram in sorted(histograms.items())}
+
+
+__all__ = ["DEFAULT_BUCKETS_MS", "HistogramSet", "LatencyHistogram"]
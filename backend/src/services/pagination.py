@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import random
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+
+def _encode(payload: Dict[str, Any]) -> str:
+    raw = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode(token: str) -> Dict[str, Any]:
+    padded = token + "=" * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+
+
+def encode_cursor(created_at: datetime, doc_id: str) -> str:
+    """Build an opaque page token from the last item's sort key."""
+    return _encode({"t": created_at.isoformat(), "id": doc_id})
+
+
+def decode_cursor(token: str) -> Tuple[datetime, str]:
+    """Inverse of :func:`encode_cursor`; raises ``ValueError`` on malformed tokens."""
+    try:
+        data = _decode(token)
+        return datetime.fromisoformat(data["t"]), str(data["id"])
+    except Exception as exc:
+        raise ValueError("Invalid feed cursor") from exc
+
+
+# --- Random feed ---------------------------------------------------------------
+# Every post gets a stable pseudo-random key in [0, 1) derived from its id. A
+# session seed picks a pivot on that ring; the feed walks keys >= pivot, then
+# wraps around to keys < pivot, so a session never sees the same post twice.
+
+def random_key(post_id: str) -> float:
+    digest = hashlib.sha1(post_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:7], "big") / float(1 << 56)
+
+
+def random_pivot(seed: int) -> float:
+    return random.Random(seed).random()
+
+
+def new_random_seed() -> int:
+    return random.randrange(1 << 31)
+
+
+def encode_random_cursor(seed: int, wrapped: bool, key: float, doc_id: str) -> str:
+    return _encode({"s": seed, "w": int(wrapped), "k": key, "id": doc_id})
+
+
+def decode_random_cursor(token: str) -> Tuple[int, bool, float, str]:
+    """Return ``(seed, wrapped, last_key, last_id)``; raises ``ValueError`` on malformed tokens."""
+    try:
+        data = _decode(token)
+        return int(data["s"]), bool(data["w"]), float(data["k"]), str(data["id"])
+    except Exception as exc:
+        raise ValueError("Invalid feed cursor") from exc
+
+
+__all__ = [
+    "encode_cursor",
+    "decode_cursor",
+    "random_key",
+    "random_pivot",
+    "new_random_seed",
+    "encode_random_cursor",
+    "decode_random_cursor",
+]
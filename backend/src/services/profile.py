@@ -3,24 +3,60 @@ Profile image management service for MyWay.
 Handles 3-angle capture, base image generation via Imagen 4, and storage.
 """
 
+import asyncio
+import io
 import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
+from typing import BinaryIO, Dict, Optional, Tuple
 
 from google.cloud import storage as gcs
-from google.cloud import aiplatform
-import vertexai
-from vertexai.preview.vision_models import ImageGenerationModel, Image
-from PIL import Image as PILImage, ImageOps
-import io
+from starlette.concurrency import run_in_threadpool
+from vertexai.preview.vision_models import Image
 
 from ..config import get_settings
 from ..models.schemas import ProfileImages, ProfileCaptureImages
-from .store import get_store
+from .image_processing import NormalizedImage, normalize_async, normalize_in_pool
+from .job_events import JOB_EVENTS
+from .scheduler import SCHEDULER
+from .store import get_async_store, get_store
+from .vertex import get_image_model
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+BASE_IMAGE_MODEL = "imagegeneration@006"
+
+# Capture uploads are spooled to disk in chunks of this size, so memory per
+# photo stays bounded whatever the camera resolution.
+CAPTURE_CHUNK_SIZE = 1024 * 1024
+
+_IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", "png"),
+)
+
+
+class InvalidCaptureImage(ValueError):
+    """An uploaded capture photo is not a JPEG/PNG image."""
+
+
+class CaptureImageTooLarge(InvalidCaptureImage):
+    """An uploaded capture photo exceeds ``profile_capture_max_bytes``."""
+
+
+def sniff_image_type(head: bytes) -> tuple[str, str]:
+    """Content type and extension from the file's magic bytes."""
+    for signature, content_type, extension in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type, extension
+    raise InvalidCaptureImage("capture images must be JPEG or PNG")
+
 
 class ProfileService:
     """Service for managing user profile images"""
@@ -28,16 +64,73 @@ class ProfileService:
     def __init__(self):
         self.storage_client = gcs.Client(project=settings.vertex_project)
         self.bucket = self.storage_client.bucket(settings.storage_bucket)
-        
-        # Initialize Vertex AI
-        vertexai.init(
-            project=settings.vertex_project,
-            location=settings.vertex_region,
-        )
     
-    def _get_storage_path(self, uid: str, image_type: str) -> str:
+    def _get_storage_path(self, uid: str, image_type: str, extension: str = "jpg") -> str:
         """Generate storage path for profile images"""
-        return f"profiles/{uid}/{image_type}.jpg"
+        return f"profiles/{uid}/{image_type}.{extension}"
+    
+    def _spool_capture(self, angle: str, stream: BinaryIO) -> str:
+        """Copy ``stream`` to a temporary file chunk by chunk (blocking); returns its path.
+        
+        The first chunk must carry a JPEG/PNG signature, and more than
+        ``profile_capture_max_bytes`` is rejected.
+        """
+        max_bytes = settings.profile_capture_max_bytes
+        chunk = stream.read(CAPTURE_CHUNK_SIZE)
+        sniff_image_type(chunk)
+        total = 0
+        with tempfile.NamedTemporaryFile(prefix=f"capture_{angle}_", delete=False) as spool:
+            try:
+                while chunk:
+                    total += len(chunk)
+                    if total > max_bytes:
+                        raise CaptureImageTooLarge(f"{angle} image exceeds {max_bytes} bytes")
+                    spool.write(chunk)
+                    chunk = stream.read(CAPTURE_CHUNK_SIZE)
+            except BaseException:
+                os.unlink(spool.name)
+                raise
+        return spool.name
+    
+    def _upload_image(self, path: str, image: NormalizedImage) -> str:
+        """Blocking GCS upload; call through the threadpool from coroutines."""
+        self.bucket.blob(path).upload_from_string(image.data, content_type=image.content_type, timeout=60)
+        return path
+    
+    async def _ingest_capture(self, uid: str, angle: str, stream: BinaryIO) -> str:
+        spooled = await run_in_threadpool(self._spool_capture, angle, stream)
+        try:
+            # Upright, downscaled and stripped once here, so generation later
+            # pulls a few hundred KB from GCS instead of the camera original
+            image = await normalize_async(spooled)
+        except (OSError, SyntaxError) as exc:  # PIL: truncated or corrupt file
+            raise InvalidCaptureImage(f"{angle} image could not be decoded") from exc
+        finally:
+            os.unlink(spooled)
+        path = self._get_storage_path(uid, f"capture_{angle}", image.extension)
+        return await run_in_threadpool(self._upload_image, path, image)
+    
+    async def upload_capture_streams(self, uid: str, streams: Dict[str, BinaryIO]) -> ProfileCaptureImages:
+        """
+        Normalize and store the 3 angle photos (``front``, ``left``, ``right``).
+        
+        Raises:
+            InvalidCaptureImage: If a photo is not JPEG/PNG, is corrupt or too large
+        """
+        # The three captures are spooled, normalized and uploaded side by side
+        paths = await asyncio.gather(*(
+            self._ingest_capture(uid, angle, stream)
+            for angle, stream in streams.items()
+        ))
+        capture_images = ProfileCaptureImages(**dict(zip(streams, paths)))
+        
+        await get_async_store().update_user_profile_images(
+            uid,
+            capture_images=capture_images,
+        )
+        logger.info("Uploaded capture images for user %s", uid)
+        
+        return capture_images
     
     async def upload_capture_images(
         self,
@@ -58,58 +151,59 @@ class ProfileService:
         Returns:
             ProfileCaptureImages with storage paths
         """
-        logger.info(f"Uploading capture images for user {uid}")
-        
-        images = {
-            'front': front_data,
-            'left': left_data,
-            'right': right_data,
-        }
-        
-        paths = {}
-        
-        for angle, data in images.items():
-            path = self._get_storage_path(uid, f"capture_{angle}")
-            blob = self.bucket.blob(path)
-            
-            # Upload with metadata
-            blob.upload_from_string(
-                data,
-                content_type='image/jpeg',
-                timeout=60,
-            )
-            
-            # Make publicly readable (optional - can use signed URLs instead)
-            # blob.make_public()
-            
-            paths[angle] = path
-            logger.info(f"Uploaded {angle} image to {path}")
+        return await self.upload_capture_streams(uid, {
+            'front': io.BytesIO(front_data),
+            'left': io.BytesIO(left_data),
+            'right': io.BytesIO(right_data),
+        })
+    
+    async def enqueue_base_image(self, uid: str) -> str:
+        """
+        Queue base image generation and return its job id right away.
         
-        capture_images = ProfileCaptureImages(
-            front=paths['front'],
-            left=paths['left'],
-            right=paths['right'],
-        )
+        The job follows the post lifecycle (``pending`` -> ``ready``/``failed``)
+        in the jobs collection, so clients follow it through ``/gen/status``
+        or ``/gen/events``.
         
-        # Update Firestore
+        Raises:
+            ValueError: If capture images don't exist
+        """
+        db = get_async_store()
+        _capture_images(await db.get_user(uid))
+        job_id = uuid.uuid4().hex
+        await db.save_job(job_id, {
+            "jobId": job_id,
+            "userId": uid,
+            "kind": "base_image",
+            "status": "pending",
+            "created_at": time.time(),
+        })
+        future = _get_base_image_executor().submit(self._run_base_image_job, job_id, uid)
+        _track_base_image_job(job_id, uid, future)
+        logger.info("Queued base image job %s for user %s", job_id, uid)
+        return job_id
+    
+    def _run_base_image_job(self, job_id: str, uid: str) -> None:
         db = get_store()
-        logger.info(f"Updating user profile images in store for user {uid}")
-        logger.info(f"Capture images data: {capture_images.model_dump()}")
-        db.update_user_profile_images(
-            uid,
-            capture_images=capture_images,
-        )
-        logger.info(f"Successfully updated profile images in store")
-        
-        # Verify the data was saved
-        user_data = db.get_user(uid)
-        logger.info(f"Verification - User data after save: {user_data}")
-        
-        return capture_images
+        job = db.get_job(job_id) or {"jobId": job_id, "userId": uid, "kind": "base_image"}
+        try:
+            with SCHEDULER.slot(uid=uid, model=BASE_IMAGE_MODEL):
+                job["baseImage"] = self.generate_base_image_sync(uid)
+        except Exception as e:
+            logger.error("Base image job %s failed: %s", job_id, e, exc_info=True)
+            _fail_base_image_job(job_id, uid, str(e))
+            return
+        job.update(status="ready", updated_at=time.time())
+        db.save_job(job_id, job)
+        JOB_EVENTS.publish(job_id, "ready")
     
     async def generate_base_image(self, uid: str) -> str:
+        """Generate the base image inline, off the event loop; see :meth:`generate_base_image_sync`."""
+        return await run_in_threadpool(self.generate_base_image_sync, uid)
+    
+    def generate_base_image_sync(self, uid: str) -> str:
         """
-        Generate base image using Imagen 4 from 3 capture photos.
+        Generate base image using Imagen 4 from 3 capture photos (blocking).
         
         Args:
             uid: User ID
@@ -124,19 +218,7 @@ class ProfileService:
         
         # Get user's capture images
         db = get_store()
-        user_data = db.get_user(uid)
-        
-        logger.info(f"User data retrieved: {user_data}")
-        
-        if not user_data or 'profileImages' not in user_data:
-            logger.error(f"No profileImages found. user_data keys: {user_data.keys() if user_data else 'None'}")
-            raise ValueError("No capture images found for user")
-        
-        profile_images = user_data['profileImages']
-        if 'captureImages' not in profile_images:
-            raise ValueError("No capture images found")
-        
-        capture = profile_images['captureImages']
+        capture = _capture_images(db.get_user(uid))
         
         # Download the front reference image
         front_path = capture['front']
@@ -147,24 +229,18 @@ class ProfileService:
         try:
             logger.info("Processing image with Imagen for background removal")
             
-            # Fix EXIF orientation before processing
+            # Captures are normalized on upload, so this passes them through
+            # untouched; it only does work for captures stored before that
             try:
-                pil_img = PILImage.open(io.BytesIO(base_image_bytes))
-                # Auto-rotate based on EXIF orientation
-                pil_img = ImageOps.exif_transpose(pil_img)
-                # Convert back to bytes
-                buffer = io.BytesIO()
-                pil_img.save(buffer, format='JPEG', quality=95)
-                base_image_bytes = buffer.getvalue()
-                logger.info("Fixed EXIF orientation")
+                base_image_bytes = normalize_in_pool(base_image_bytes).data
             except Exception as e:
-                logger.warning(f"Could not fix EXIF orientation: {e}, continuing with original")
+                logger.warning(f"Could not normalize capture image: {e}, continuing with original")
             
             # Load the image using Vertex AI SDK
             base_img = Image(image_bytes=base_image_bytes)
             
             # Use imagegeneration@006 with automatic background masking
-            model = ImageGenerationModel.from_pretrained("imagegeneration@006")
+            model = get_image_model(BASE_IMAGE_MODEL)
             
             # Edit with mask_mode="background" to automatically detect and replace background
             # Using inpainting-insert with neutral background prompt
@@ -184,13 +260,15 @@ class ProfileService:
             logger.info("Falling back to original image")
             image_bytes = base_image_bytes
         
-        # Upload to storage (whether processed or original)
+        # Upload to storage (whether processed or original). Always JPEG: the
+        # base image is sent to Veo as an image/jpeg reference.
         try:
+            base_image = normalize_in_pool(image_bytes, output_format="JPEG")
             base_image_path = self._get_storage_path(uid, "base_image")
             blob = self.bucket.blob(base_image_path)
             blob.upload_from_string(
-                image_bytes,
-                content_type='image/jpeg',
+                base_image.data,
+                content_type=base_image.content_type,
             )
             
             # Generate public URL
@@ -274,6 +352,61 @@ class ProfileService:
         )
 
 
+def _capture_images(user_data: Optional[Dict]) -> Dict:
+    if not user_data or 'captureImages' not in (user_data.get('profileImages') or {}):
+        raise ValueError("No capture images found for user")
+    return user_data['profileImages']['captureImages']
+
+
+def _fail_base_image_job(job_id: str, uid: str, error: str) -> None:
+    db = get_store()
+    job = db.get_job(job_id) or {"jobId": job_id, "userId": uid, "kind": "base_image"}
+    job.update(status="failed", error=error, updated_at=time.time())
+    db.save_job(job_id, job)
+    JOB_EVENTS.publish(job_id, "failed", error=error)
+
+
+_BASE_IMAGE_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_BASE_IMAGE_LOCK = threading.Lock()
+# Queued or running jobs by id, so shutdown can fail the ones it cancels
+_BASE_IMAGE_JOBS: Dict[str, Tuple[str, Future]] = {}
+
+
+def _track_base_image_job(job_id: str, uid: str, future: Future) -> None:
+    with _BASE_IMAGE_LOCK:
+        _BASE_IMAGE_JOBS[job_id] = (uid, future)
+    future.add_done_callback(lambda _: _BASE_IMAGE_JOBS.pop(job_id, None))
+
+
+def _get_base_image_executor() -> ThreadPoolExecutor:
+    global _BASE_IMAGE_EXECUTOR
+    if _BASE_IMAGE_EXECUTOR is None:
+        with _BASE_IMAGE_LOCK:
+            if _BASE_IMAGE_EXECUTOR is None:
+                _BASE_IMAGE_EXECUTOR = ThreadPoolExecutor(
+                    max_workers=settings.base_image_workers,
+                    thread_name_prefix="base-image",
+                )
+    return _BASE_IMAGE_EXECUTOR
+
+
+def shutdown_base_image_jobs() -> None:
+    """Stop accepting base-image jobs; those already running finish.
+
+    Jobs that never started are marked failed, so clients waiting on them get
+    a terminal status instead of ``pending`` forever.
+    """
+    global _BASE_IMAGE_EXECUTOR
+    with _BASE_IMAGE_LOCK:
+        if _BASE_IMAGE_EXECUTOR is None:
+            return
+        queued = [(job_id, uid) for job_id, (uid, future) in list(_BASE_IMAGE_JOBS.items()) if future.cancel()]
+        _BASE_IMAGE_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        _BASE_IMAGE_EXECUTOR = None
+    for job_id, uid in queued:
+        _fail_base_image_job(job_id, uid, "server shut down before the job started")
+
+
 # Singleton instance
 _profile_service: Optional[ProfileService] = None
 
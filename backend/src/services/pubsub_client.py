@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import json
 import logging
-from typing import Any, Dict
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
 
 try:  # pragma: no cover - optional dependency
     from google.cloud import pubsub_v1  # type: ignore
@@ -13,29 +15,153 @@ from ..config import get_settings
 
 logger = logging.getLogger(__name__)
 
-_publisher: Any = None
+FailureCallback = Callable[[Dict[str, Any], BaseException], None]
 
 
-def _get_publisher() -> Any:
-    if pubsub_v1 is None:
-        raise RuntimeError("google-cloud-pubsub is not installed or configured")
+def mark_job_failed(payload: Dict[str, Any], exc: BaseException) -> None:
+    """Dead-letter handler: a generate request that never reached Pub/Sub fails its job."""
+    from . import store
+    from .job_events import JOB_EVENTS
+
+    job_id = payload.get("jobId")
+    if not job_id:
+        return
+    db = store.get_store()
+    job = db.get_job(job_id) or {"jobId": job_id, "userId": payload.get("uid")}
+    error = f"publish failed: {exc}"
+    job.update(status="failed", error=error, updated_at=time.time())
+    db.save_job(job_id, job)
+    JOB_EVENTS.publish(job_id, "failed", error=error)
+
+
+class GeneratePublisher:
+    """Non-blocking publisher for generate requests.
+
+    :meth:`publish` returns once the client has buffered the message; the
+    client ships it in a batch within ``max_latency_seconds``. Failed publishes
+    are retried up to ``max_attempts`` times and then handed to ``on_failure``.
+    """
+
+    def __init__(self, *, client: Any = None, topic_path: Optional[str] = None,
+                 on_failure: Optional[FailureCallback] = mark_job_failed,
+                 max_attempts: int = 3, max_latency_seconds: float = 0.01,
+                 max_messages: int = 100, max_outstanding: int = 1000) -> None:
+        if client is None:
+            if pubsub_v1 is None:
+                raise RuntimeError("google-cloud-pubsub is not installed or configured")
+            client = pubsub_v1.PublisherClient(
+                batch_settings=pubsub_v1.types.BatchSettings(
+                    max_messages=max_messages,
+                    max_bytes=1_000_000,
+                    max_latency=max_latency_seconds,
+                ),
+                publisher_options=pubsub_v1.types.PublisherOptions(
+                    flow_control=pubsub_v1.types.PublishFlowControl(
+                        message_limit=max_outstanding,
+                        limit_exceeded_behavior=pubsub_v1.types.LimitExceededBehavior.ERROR,
+                    ),
+                ),
+            )
+        if topic_path is None:
+            settings = get_settings()
+            if not settings.vertex_project or not settings.pubsub_topic_generate:
+                raise RuntimeError("Pub/Sub topic not configured for generation tasks")
+            topic_path = client.topic_path(settings.vertex_project, settings.pubsub_topic_generate)
+        self.client = client
+        self.topic_path = topic_path
+        self.on_failure = on_failure
+        self.max_attempts = max(1, max_attempts)
+        self.published = 0
+        self.retried = 0
+        self.failed = 0
+        self._in_flight = 0
+        self._in_flight_bytes = 0
+        self._lock = threading.Lock()
+
+    def publish(self, payload: Dict[str, Any]) -> Any:
+        """Hand ``payload`` to the client's batcher and return its future without waiting."""
+        data = json.dumps(payload).encode("utf-8")
+        with self._lock:
+            self._in_flight += 1
+            self._in_flight_bytes += len(data)
+        try:
+            return self._send(payload, data, attempt=1)
+        except Exception:
+            self._settle(len(data))
+            raise
+
+    def _send(self, payload: Dict[str, Any], data: bytes, attempt: int) -> Any:
+        future = self.client.publish(self.topic_path, data)
+        future.add_done_callback(lambda done: self._on_done(done, payload, data, attempt))
+        return future
+
+    def _on_done(self, future: Any, payload: Dict[str, Any], data: bytes, attempt: int) -> None:
+        exc = future.exception()
+        if exc is None:
+            self._settle(len(data))
+            with self._lock:
+                self.published += 1
+            logger.debug("Published generate job %s to topic %s", payload.get("jobId"), self.topic_path)
+            return
+        if attempt < self.max_attempts:
+            with self._lock:
+                self.retried += 1
+            logger.warning("Publish of job %s failed (attempt %d): %s", payload.get("jobId"), attempt, exc)
+            try:
+                self._send(payload, data, attempt + 1)
+                return
+            except Exception as retry_exc:
+                exc = retry_exc
+        self._settle(len(data))
+        with self._lock:
+            self.failed += 1
+        logger.error("Giving up on publishing job %s: %s", payload.get("jobId"), exc)
+        if self.on_failure is not None:
+            try:
+                self.on_failure(payload, exc)
+            except Exception:  # pragma: no cover - never let the callback kill the client thread
+                logger.exception("Publish failure handler raised for job %s", payload.get("jobId"))
+
+    def _settle(self, size: int) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._in_flight_bytes -= size
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "inFlight": self._in_flight,
+                "inFlightBytes": self._in_flight_bytes,
+                "published": self.published,
+                "retried": self.retried,
+                "failed": self.failed,
+            }
+
+
+_publisher: Optional[GeneratePublisher] = None
+_publisher_lock = threading.Lock()
+
+
+def get_publisher() -> GeneratePublisher:
     global _publisher
     if _publisher is None:
-        _publisher = pubsub_v1.PublisherClient()
+        with _publisher_lock:
+            if _publisher is None:
+                settings = get_settings()
+                _publisher = GeneratePublisher(
+                    max_attempts=settings.pubsub_publish_attempts,
+                    max_latency_seconds=settings.pubsub_batch_max_latency_ms / 1000.0,
+                )
     return _publisher
 
 
-def publish_generate_request(payload: Dict[str, Any]) -> str:
-    settings = get_settings()
-    if not settings.vertex_project or not settings.pubsub_topic_generate:
-        raise RuntimeError("Pub/Sub topic not configured for generation tasks")
+def publish_generate_request(payload: Dict[str, Any]) -> Any:
+    """Queue a generate request; returns the publish future instead of waiting on it."""
+    return get_publisher().publish(payload)
+
 
-    topic_path = _get_publisher().topic_path(settings.vertex_project, settings.pubsub_topic_generate)
-    data = json.dumps(payload).encode("utf-8")
-    future = _get_publisher().publish(topic_path, data)
-    message_id = future.result(timeout=15)
-    logger.debug("Published generate job %s to topic %s", payload.get("jobId"), topic_path)
-    return message_id
+def publisher_stats() -> Dict[str, int]:
+    return _publisher.stats() if _publisher is not None else {}
 
 
-__all__ = ["publish_generate_request"]
+__all__ = ["GeneratePublisher", "get_publisher", "mark_job_failed", "publish_generate_request", "publisher_stats"]
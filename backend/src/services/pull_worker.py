@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import json
+import logging
+import signal
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+try:  # pragma: no cover - optional dependency
+    from google.cloud import pubsub_v1  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    pubsub_v1 = None  # type: ignore
+
+from pydantic import ValidationError
+
+from ..config import get_settings
+from ..models.schemas import GenerateTask
+from .worker import process_generate_task
+
+logger = logging.getLogger(__name__)
+
+TaskHandler = Callable[..., None]
+
+
+class PullWorker:
+    """Streaming-pull consumer of generate requests with per-media-type pools.
+
+    Flow control leases at most ``image_concurrency + video_concurrency``
+    messages at a time, so the worker never holds more work than its pools can
+    run; images and videos run on separate pools so long videos never occupy
+    image slots. A message is acked once its task completes (ready or
+    permanently failed) and nacked when the task raises, which Pub/Sub
+    redelivers with the subscription's retry policy.
+    """
+
+    def __init__(self, *, subscriber: Any = None, subscription_path: Optional[str] = None,
+                 image_concurrency: int = 8, video_concurrency: int = 2,
+                 handler: TaskHandler = process_generate_task) -> None:
+        if subscriber is None:
+            if pubsub_v1 is None:
+                raise RuntimeError("google-cloud-pubsub is not installed or configured")
+            subscriber = pubsub_v1.SubscriberClient()
+        if subscription_path is None:
+            settings = get_settings()
+            if not settings.vertex_project or not settings.pubsub_subscription_generate:
+                raise RuntimeError("Pub/Sub subscription not configured for generation tasks")
+            subscription_path = subscriber.subscription_path(
+                settings.vertex_project, settings.pubsub_subscription_generate
+            )
+        self.subscriber = subscriber
+        self.subscription_path = subscription_path
+        self.handler = handler
+        self.max_messages = image_concurrency + video_concurrency
+        self._pools = {
+            "image": ThreadPoolExecutor(max_workers=image_concurrency, thread_name_prefix="gen-image"),
+            "video": ThreadPoolExecutor(max_workers=video_concurrency, thread_name_prefix="gen-video"),
+        }
+        self._streaming_pull: Any = None
+        self._lock = threading.Lock()
+        self._active: Dict[str, int] = {"image": 0, "video": 0}
+        self.acked = 0
+        self.nacked = 0
+
+    def start(self) -> Any:
+        flow_control = (
+            pubsub_v1.types.FlowControl(max_messages=self.max_messages)
+            if pubsub_v1 is not None
+            else {"max_messages": self.max_messages}
+        )
+        self._streaming_pull = self.subscriber.subscribe(
+            self.subscription_path, callback=self._on_message, flow_control=flow_control
+        )
+        logger.info("Pulling generate tasks from %s (max %d leased)", self.subscription_path, self.max_messages)
+        return self._streaming_pull
+
+    def _on_message(self, message: Any) -> None:
+        # Runs on the subscriber's callback threads: hand off and return at once
+        try:
+            task = GenerateTask(**json.loads(message.data.decode("utf-8")))
+        except (ValueError, ValidationError) as exc:
+            # Redelivering a malformed message can never succeed
+            logger.error("Dropping malformed generate message %s: %s", getattr(message, "message_id", "?"), exc)
+            message.ack()
+            return
+        kind = "video" if task.mediaType == "video" else "image"
+        with self._lock:
+            self._active[kind] += 1
+        future = self._pools[kind].submit(self.handler, task, retry_transient=True)
+        future.add_done_callback(lambda done: self._settle(done, message, task, kind))
+
+    def _settle(self, future: "Future[None]", message: Any, task: GenerateTask, kind: str) -> None:
+        exc = future.exception()
+        with self._lock:
+            self._active[kind] -= 1
+            if exc is None:
+                self.acked += 1
+            else:
+                self.nacked += 1
+        if exc is None:
+            message.ack()
+        else:
+            logger.warning("Generation job %s will be redelivered: %s", task.jobId, exc)
+            message.nack()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop pulling, let running tasks finish, and close the subscriber."""
+        if self._streaming_pull is not None:
+            self._streaming_pull.cancel()
+            try:
+                self._streaming_pull.result(timeout=timeout)
+            except Exception:  # cancelled futures raise on result()
+                pass
+        for pool in self._pools.values():
+            pool.shutdown(wait=True)
+        close = getattr(self.subscriber, "close", None)
+        if close is not None:
+            close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "activeImage": self._active["image"],
+                "activeVideo": self._active["video"],
+                "acked": self.acked,
+                "nacked": self.nacked,
+            }
+
+
+def main() -> None:  # pragma: no cover - process entry point
+    logging.basicConfig(level=logging.INFO)
+    settings = get_settings()
+    worker = PullWorker(
+        image_concurrency=settings.worker_image_concurrency,
+        video_concurrency=settings.worker_video_concurrency,
+    )
+    streaming_pull = worker.start()
+    stopping = threading.Event()
+
+    def _shutdown(*_: Any) -> None:
+        stopping.set()
+        streaming_pull.cancel()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+    try:
+        streaming_pull.result()
+    except Exception as exc:
+        if not stopping.is_set():
+            logger.exception("Streaming pull stopped: %s", exc)
+            raise
+    finally:
+        worker.stop()
+
+
+__all__ = ["PullWorker", "main"]
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
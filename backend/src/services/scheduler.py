@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Mapping, Optional
+
+from ..config import get_settings
+from .metrics import HistogramSet
+
+# Highest priority first: composer requests, then "more like this", then feed fills.
+PRIORITY_CLASSES = ("interactive", "variation", "background")
+_RANK = {name: rank for rank, name in enumerate(PRIORITY_CLASSES)}
+
+# Queue waits run from milliseconds (idle) to minutes (a busy Veo cap).
+_WAIT_BUCKETS_MS = (1, 10, 100, 500, 1000, 5000, 15000, 30000, 60000, 300000)
+
+
+class SchedulerBusy(RuntimeError):
+    """No generation slot became free within the caller's wait limit."""
+
+
+class Grant:
+    __slots__ = ("uid", "model", "priority", "seq", "enqueued_at", "granted")
+
+    def __init__(self, uid: str, model: str, priority: str, seq: int, enqueued_at: float) -> None:
+        self.uid = uid
+        self.model = model
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = enqueued_at
+        self.granted = False
+
+
+class GenerationScheduler:
+    """Admission control for model calls: priority classes, per-user fairness, per-model caps.
+
+    Each model runs at most its configured number of generations at once. When
+    a slot frees up it goes to the highest priority class waiting for that
+    model; within a class, users take turns (the user served least recently
+    goes first), so one user's burst of variations queues behind everyone
+    else's single request instead of in front of it.
+    """
+
+    def __init__(self, model_limits: Optional[Mapping[str, int]] = None, default_limit: int = 4,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.model_limits = dict(model_limits or {})
+        self.default_limit = default_limit
+        self.clock = clock
+        self.queue_wait = HistogramSet(_WAIT_BUCKETS_MS)
+        self._cond = threading.Condition()
+        self._waiting: List[Grant] = []
+        self._running: Dict[str, int] = {}
+        self._running_by_user: Dict[str, int] = {}
+        self._last_served: Dict[str, int] = {}
+        self._held: Dict[str, Grant] = {}
+        self._seq = itertools.count(1)
+        self._turn = itertools.count(1)
+
+    def limit(self, model: str) -> int:
+        return self.model_limits.get(model, self.default_limit)
+
+    def acquire(self, *, uid: str, model: str, priority: str = "interactive",
+                timeout: Optional[float] = None) -> Grant:
+        """Block until a slot for ``model`` is granted; raises :class:`SchedulerBusy` on timeout."""
+        if priority not in _RANK:
+            raise ValueError(f"Unknown priority class {priority!r}")
+        with self._cond:
+            grant = Grant(uid, model, priority, next(self._seq), self.clock())
+            self._waiting.append(grant)
+            self._dispatch()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not grant.granted:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiting.remove(grant)
+                    self._forget_user(uid)
+                    raise SchedulerBusy(f"No {model} capacity after {timeout:.0f}s")
+                self._cond.wait(remaining)
+        self.queue_wait.observe(priority, (self.clock() - grant.enqueued_at) * 1000)
+        return grant
+
+    def release(self, grant: Grant) -> None:
+        with self._cond:
+            self._running[grant.model] -= 1
+            self._running_by_user[grant.uid] -= 1
+            if not self._running_by_user[grant.uid]:
+                del self._running_by_user[grant.uid]
+            self._forget_user(grant.uid)
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, *, uid: str, model: str, priority: str = "interactive",
+             timeout: Optional[float] = None) -> Iterator[Grant]:
+        grant = self.acquire(uid=uid, model=model, priority=priority, timeout=timeout)
+        try:
+            yield grant
+        finally:
+            self.release(grant)
+
+    # --- Slots that outlive the call (submitted Veo operations) -------------------
+    def hold(self, job_id: str, grant: Grant) -> None:
+        """Keep ``grant`` until :meth:`release_job` is called for ``job_id``."""
+        with self._cond:
+            self._held[job_id] = grant
+
+    def release_job(self, job_id: str) -> None:
+        with self._cond:
+            grant = self._held.pop(job_id, None)
+        if grant is not None:
+            self.release(grant)
+
+    # --- Internals (caller holds the condition) -----------------------------------
+    def _dispatch(self) -> None:
+        granted = False
+        while True:
+            ready = [g for g in self._waiting if self._running.get(g.model, 0) < self.limit(g.model)]
+            if not ready:
+                break
+            grant = min(ready, key=lambda g: (_RANK[g.priority], self._last_served.get(g.uid, 0), g.seq))
+            self._waiting.remove(grant)
+            self._running[grant.model] = self._running.get(grant.model, 0) + 1
+            self._running_by_user[grant.uid] = self._running_by_user.get(grant.uid, 0) + 1
+            self._last_served[grant.uid] = next(self._turn)
+            grant.granted = True
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _forget_user(self, uid: str) -> None:
+        # Idle users drop out of the rotation (and go first when they come back)
+        if uid not in self._running_by_user and not any(g.uid == uid for g in self._waiting):
+            self._last_served.pop(uid, None)
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            waiting = {name: 0 for name in PRIORITY_CLASSES}
+            for grant in self._waiting:
+                waiting[grant.priority] += 1
+            running = {model: count for model, count in self._running.items() if count}
+            held = len(self._held)
+        return {
+            "running": running,
+            "waiting": waiting,
+            "held": held,
+            "queueWaitMs": self.queue_wait.snapshot(),
+        }
+
+
+def _build_scheduler() -> GenerationScheduler:
+    settings = get_settings()
+    return GenerationScheduler(dict(settings.model_concurrency), default_limit=settings.model_concurrency_default)
+
+
+SCHEDULER = _build_scheduler()
+
+
+__all__ = ["PRIORITY_CLASSES", "SCHEDULER", "Grant", "GenerationScheduler", "SchedulerBusy"]
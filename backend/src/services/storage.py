@@ -37,19 +37,35 @@ class UploadResult:
     public_url: str | None
 
 
-def upload_media_bytes(*, post_id: str, media_type: str, data: bytes, content_type: str, extension: str) -> UploadResult:
+def media_object_name(post_id: str, media_type: str, suffix: str) -> str:
+    """``<prefix>/<images|videos>/<post_id><suffix>``; the suffix carries the extension."""
     prefix = get_settings().cloud_storage_media_prefix.rstrip("/")
     folder = "images" if media_type == "image" else "videos"
-    object_name = f"{prefix}/{folder}/{post_id}.{extension}"
+    return f"{prefix}/{folder}/{post_id}{suffix}"
+
+
+def upload_object(object_name: str, data: bytes, content_type: str) -> UploadResult:
     bucket = _get_bucket()
     blob = bucket.blob(object_name)
     blob.upload_from_string(data, content_type=content_type)
-    logger.info(f"Uploaded media for {post_id} to gs://{bucket.name}/{object_name}")
+    logger.info(f"Uploaded gs://{bucket.name}/{object_name}")
     
     # Use public URL since bucket is publicly accessible
-    public_url = blob.public_url
-    logger.info(f"Public URL: {public_url}")
-    return UploadResult(storage_path=object_name, public_url=public_url)
+    return UploadResult(storage_path=object_name, public_url=blob.public_url)
+
+
+def upload_media_bytes(*, post_id: str, media_type: str, data: bytes, content_type: str, extension: str) -> UploadResult:
+    return upload_object(media_object_name(post_id, media_type, f".{extension}"), data, content_type)
+
+
+def download_bytes(storage_path: str) -> bytes:
+    """Read an object by bucket path or ``gs://bucket/path`` URI."""
+    if storage_path.startswith("gs://"):
+        bucket_name, _, object_name = storage_path[len("gs://"):].partition("/")
+        bucket = _get_client().bucket(bucket_name)
+    else:
+        bucket, object_name = _get_bucket(), storage_path
+    return bucket.blob(object_name).download_as_bytes()
 
 
-__all__ = ["upload_media_bytes", "UploadResult"]
+__all__ = ["download_bytes", "media_object_name", "upload_media_bytes", "upload_object", "UploadResult"]
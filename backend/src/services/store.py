@@ -2,12 +2,27 @@
 from __future__ import annotations
 
 import logging
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
 from collections import defaultdict, deque
-from dataclasses import dataclass
-from typing import Deque, Dict, List, Optional, Union
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate, islice
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Tuple, Union
 
 from ..config import get_settings
-from ..models.schemas import FeedItem, Post
+from ..models.schemas import FeedItem, Post, SafetyInfo
+from .job_state import PROMOTING, job_claimable
+from .pagination import (
+    decode_cursor,
+    decode_random_cursor,
+    encode_cursor,
+    encode_random_cursor,
+    new_random_seed,
+    random_key,
+    random_pivot,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -15,88 +30,349 @@ logger = logging.getLogger(__name__)
 DEFAULT_SESSION_BUDGET = {"images": 3, "videos": 1}
 
 
-@dataclass
-class FeedEntry:
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _to_micros(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(micros: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=micros)
+
+
+def _recency_key(created_at: datetime, post_id: str) -> Tuple[int, str]:
+    """Ascending sort key that orders newest first (createdAt DESC)."""
+    return (-_to_micros(created_at), post_id)
+
+
+# Feed reasons and safety blocks come from a tiny vocabulary; share one tuple
+# per distinct value instead of a list per entry.
+_INTERNED: Dict[tuple, tuple] = {}
+
+
+def _intern_tuple(value: tuple) -> tuple:
+    return _INTERNED.setdefault(value, value)
+
+
+class FeedEntry(NamedTuple):
+    """One attached post in a user's feed, ordered newest first by sortKey."""
+
+    sortKey: int  # -createdAt in microseconds
     postId: str
     score: float
-    reason: List[str]
+    reason: Tuple[str, ...]
+
+    @property
+    def key(self) -> Tuple[int, str]:
+        return (self.sortKey, self.postId)
+
+    @property
+    def createdAt(self) -> datetime:
+        return _from_micros(-self.sortKey)
+
+
+_POST_FIELDS = tuple(Post.model_fields)
+_POST_DATETIME_FIELDS = frozenset(
+    name for name, info in Post.model_fields.items() if info.annotation is datetime
+)
+_POST_INTERNED_FIELDS = frozenset({"type", "status", "aspect", "model", "authorUid"})
+
+
+class PostRecord:
+    """Slotted, compact copy of a Post; the pydantic model is rebuilt on read.
+
+    Timestamps are kept as integer microseconds, enum-like strings are
+    interned and the safety block is shared between identical posts.
+    """
+
+    __slots__ = _POST_FIELDS
+
+    @classmethod
+    def from_post(cls, post: Post) -> "PostRecord":
+        record = cls.__new__(cls)
+        for name in _POST_FIELDS:
+            value = getattr(post, name)
+            if name in _POST_DATETIME_FIELDS and value is not None:
+                value = _to_micros(value)
+            elif name in _POST_INTERNED_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            elif isinstance(value, SafetyInfo):
+                value = _intern_tuple((value.blocked, tuple(sorted(value.scores.items()))))
+            setattr(record, name, value)
+        return record
+
+    def to_post(self) -> Post:
+        values = {}
+        for name in _POST_FIELDS:
+            value = getattr(self, name)
+            if name in _POST_DATETIME_FIELDS and value is not None:
+                value = _from_micros(value)
+            elif name == "safety":
+                value = SafetyInfo.model_construct(blocked=value[0], scores=dict(value[1]))
+            values[name] = value
+        return Post.model_construct(**values)
+
+
+class SortedIndex:
+    """Ascending sort keys paged by position: a bisect plus a slice.
+
+    Keys live in bounded sorted chunks so inserts stay cheap at millions of
+    entries; chunk offsets are recomputed lazily after writes. Keys must be
+    unique (they end with the post id).
+    """
+
+    __slots__ = ("_chunks", "_maxes", "_offsets", "_len")
+
+    CHUNK_SIZE = 1024
+
+    def __init__(self) -> None:
+        self._chunks: List[List[tuple]] = []
+        self._maxes: List[tuple] = []
+        self._offsets: Optional[List[int]] = None
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, key: tuple) -> None:
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            self._offsets = None
+            return
+        i = min(bisect_left(self._maxes, key), len(self._maxes) - 1)
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        if j < len(chunk) and chunk[j] == key:
+            return
+        chunk.insert(j, key)
+        self._maxes[i] = chunk[-1]
+        self._len += 1
+        self._offsets = None
+        if len(chunk) > 2 * self.CHUNK_SIZE:
+            half = self.CHUNK_SIZE
+            self._chunks[i:i + 1] = [chunk[:half], chunk[half:]]
+            self._maxes[i:i + 1] = [chunk[half - 1], chunk[-1]]
+
+    def discard(self, key: tuple) -> None:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        if j == len(chunk) or chunk[j] != key:
+            return
+        del chunk[j]
+        self._len -= 1
+        self._offsets = None
+        if chunk:
+            self._maxes[i] = chunk[-1]
+        else:
+            del self._chunks[i]
+            del self._maxes[i]
+
+    def _chunk_offsets(self) -> List[int]:
+        if self._offsets is None:
+            self._offsets = [0, *accumulate(len(chunk) for chunk in self._chunks)]
+        return self._offsets
+
+    def bisect_left(self, key: tuple) -> int:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+        return self._chunk_offsets()[i] + bisect_left(self._chunks[i], key)
+
+    def bisect_right(self, key: tuple) -> int:
+        i = bisect_right(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+        return self._chunk_offsets()[i] + bisect_right(self._chunks[i], key)
+
+    def slice(self, start: int, stop: int) -> List[tuple]:
+        stop = min(stop, self._len)
+        if start >= stop:
+            return []
+        offsets = self._chunk_offsets()
+        i = bisect_right(offsets, start) - 1
+        keys: List[tuple] = []
+        while len(keys) < stop - start:
+            chunk = self._chunks[i]
+            keys.extend(chunk[max(start - offsets[i], 0):stop - offsets[i]])
+            i += 1
+        return keys
 
 
 class InMemoryStore:
     """A simple in-memory implementation that mimics Firestore collections."""
 
+    # Hot/interests/random read one global index, identical for every user.
+    shared_public_feed = True
+
     def __init__(self) -> None:
-        self.posts: Dict[str, Post] = {}
+        self.posts: Dict[str, PostRecord] = {}
         self.jobs: Dict[str, Dict] = {}
-        self.user_feeds: Dict[str, Deque[FeedEntry]] = defaultdict(deque)
+        self.generations: Dict[str, Dict] = {}
+        # Per-user feed entries in attach order, with a sorted index of their
+        # keys (Your Feed); public feeds use the global indexes below.
+        self.user_feeds: Dict[str, Dict[str, FeedEntry]] = defaultdict(dict)
+        self._user_index: Dict[str, SortedIndex] = defaultdict(SortedIndex)
+        # Ready public posts by createdAt DESC (hot/interests) and by random key.
+        self._public = SortedIndex()
+        self._public_ring = SortedIndex()
         self.user_views: Dict[str, int] = defaultdict(int)
         self.session_budgets: Dict[str, Dict[str, int]] = defaultdict(
             lambda: DEFAULT_SESSION_BUDGET.copy()
         )
         self.trending_buffer: Deque[str] = deque()
         self.users: Dict[str, Dict] = {}  # User data including profile images
+        self._public_post_listeners: List[Callable[[Post], None]] = []
+        self._claim_lock = threading.Lock()
 
     # --- Posts ---
     def save_post(self, post: Union[Post, Dict]) -> Post:
         if not isinstance(post, Post):
             post = Post.model_validate(post)
-        self.posts[post.id] = post
+        previous = self.posts.get(post.id)
+        was_public = previous is not None and previous.status == "ready" and not previous.isPrivate
+        if was_public:
+            self._public.discard((-previous.createdAt, previous.id))
+            self._public_ring.discard((random_key(previous.id), previous.id))
+        record = PostRecord.from_post(post)
+        self.posts[post.id] = record
         if post.status == "ready":
             self.trending_buffer.appendleft(post.id)
             # Keep trending buffer manageable
             while len(self.trending_buffer) > 50:
                 self.trending_buffer.pop()
+            if not post.isPrivate:
+                self._public.add((-record.createdAt, post.id))
+                self._public_ring.add((random_key(post.id), post.id))
+        if was_public or (post.status == "ready" and not post.isPrivate):
+            for callback in self._public_post_listeners:
+                callback(post)
         return post
 
+    def on_public_post(self, callback: Callable[[Post], None]) -> None:
+        """Register a callback fired whenever a save adds a post to, or removes one from, the public feeds."""
+        self._public_post_listeners.append(callback)
+
     def get_post(self, post_id: str) -> Optional[Post]:
-        return self.posts.get(post_id)
+        record = self.posts.get(post_id)
+        return record.to_post() if record is not None else None
+
+    def get_posts(self, post_ids: List[str]) -> Dict[str, Post]:
+        return {pid: self.posts[pid].to_post() for pid in post_ids if pid in self.posts}
 
     def list_ready_posts(self, limit: int = 12) -> List[Post]:
-        return [p for p in self.posts.values() if p.status == "ready"][:limit]
+        ready = (record for record in self.posts.values() if record.status == "ready")
+        return [record.to_post() for record in islice(ready, limit)]
 
     # --- Feed ---
+    MAX_USER_FEED = 100
+
     def attach_to_feed(self, uid: str, post: Post, score: float, reason: List[str]) -> None:
         feed = self.user_feeds[uid]
-        feed.appendleft(FeedEntry(postId=post.id, score=score, reason=reason))
-        while len(feed) > 100:
-            feed.pop()
-
-    def get_feed_ready(self, uid: str, limit: int, feed_type: Optional[str] = "hot", page: int = 0) -> tuple[List[FeedItem], bool]:
-        import random
-        feed = self.user_feeds.get(uid, deque())
-        skip_count = page * limit
+        index = self._user_index[uid]
+        # Re-attaching refreshes the entry, like the merge write in FirestoreStore
+        previous = feed.pop(post.id, None)
+        if previous is not None:
+            index.discard(previous.key)
+        entry = FeedEntry(
+            sortKey=-_to_micros(datetime.utcnow()),
+            postId=post.id,
+            score=score,
+            reason=_intern_tuple(tuple(reason)),
+        )
+        feed[post.id] = entry
+        index.add(entry.key)
+        while len(feed) > self.MAX_USER_FEED:
+            oldest = feed.pop(next(iter(feed)))
+            index.discard(oldest.key)
+
+    def get_feed_ready(self, uid: str, limit: int, feed_type: Optional[str] = "hot", page: int = 0,
+                       cursor: Optional[str] = None,
+                       seed: Optional[int] = None) -> tuple[List[FeedItem], bool, Optional[str]]:
+        if feed_type == "random":
+            keys, has_more, next_cursor = self._ring_page(self._public_ring, limit, cursor, seed)
+            items = [FeedItem(slot="READY", post=self.posts[key[-1]].to_post(), reason=[]) for key in keys]
+            return items, has_more, next_cursor
+
+        # Public feeds read the global posts index (like the posts query in
+        # FirestoreStore); "private" is "Your Feed" - ALL of the user's content
+        # (public + private) in attach order, skipping posts that are not ready.
+        public = feed_type in ["hot", "interests"]
+        index = self._public if public else self._user_index.get(uid, SortedIndex())
+        if cursor:
+            start = index.bisect_right(_recency_key(*decode_cursor(cursor)))
+        else:
+            start = page * limit
+        if not public:
+            return self._ready_user_page(uid, index, start, limit)
+        keys = index.slice(start, start + limit + 1)
+        has_more = len(keys) > limit
+        keys = keys[:limit]
+        next_cursor = None
+        if has_more:
+            next_cursor = encode_cursor(_from_micros(-keys[-1][0]), keys[-1][1])
+        items = [FeedItem(slot="READY", post=self.posts[key[-1]].to_post(), reason=[]) for key in keys]
+        return items, has_more, next_cursor
+
+    def _ready_user_page(self, uid: str, index: SortedIndex, start: int,
+                         limit: int) -> tuple[List[FeedItem], bool, Optional[str]]:
+        # The user index also holds pending/failed posts: keep scanning past them
+        # until the page is full, and resume after the last key examined.
+        feed = self.user_feeds[uid]
         items: List[FeedItem] = []
-        skipped = 0
-        has_more = False
-        
-        for entry in list(feed):
-            post = self.posts.get(entry.postId)
-            if not post or post.status != "ready":
-                continue
-            
-            # Filter by feed type
-            # "private" feed type is now "Your Feed" - shows ALL user's content (public + private)
-            # Other feeds (hot, interests, random) skip private posts
-            if feed_type in ["hot", "interests", "random"] and post.isPrivate:
-                continue  # Public feeds skip private posts
-            
-            # Skip items for pagination
-            if skipped < skip_count:
-                skipped += 1
-                continue
-            
-            # Check if we have more items beyond the limit
-            if len(items) >= limit:
-                has_more = True
+        position = start
+        last_key: Optional[tuple] = None
+        while len(items) < limit:
+            keys = index.slice(position, position + limit)
+            if not keys:
                 break
-            
-            items.append(FeedItem(slot="READY", post=post, reason=entry.reason))
-        
-        # Randomize order for random feed (only the current page)
-        if feed_type == "random" and items:
-            random.shuffle(items)
-        
-        return items, has_more
+            for key in keys:
+                position += 1
+                last_key = key
+                record = self.posts.get(key[1])
+                if record is not None and record.status == "ready":
+                    items.append(FeedItem(slot="READY", post=record.to_post(), reason=list(feed[key[1]].reason)))
+                    if len(items) == limit:
+                        break
+        has_more = position < len(index)
+        next_cursor = None
+        if has_more and last_key is not None:
+            next_cursor = encode_cursor(_from_micros(-last_key[0]), last_key[1])
+        return items, has_more, next_cursor
+
+    @staticmethod
+    def _ring_page(ring: SortedIndex, limit: int, cursor: Optional[str],
+                   seed: Optional[int]) -> Tuple[List[tuple], bool, Optional[str]]:
+        # Same ring walk as FirestoreStore: keys >= pivot, then wrap to keys < pivot.
+        # Positions are linearised as ring[pivot:] + ring[:pivot].
+        if cursor:
+            seed, wrapped, last_key, last_id = decode_random_cursor(cursor)
+        else:
+            seed = seed if seed is not None else new_random_seed()
+        pivot_pos = ring.bisect_left((random_pivot(seed), ""))
+        head = len(ring) - pivot_pos
+        offset = 0
+        if cursor:
+            pos = ring.bisect_right((last_key, last_id))
+            offset = head + min(pos, pivot_pos) if wrapped else max(pos - pivot_pos, 0)
+        stop = offset + limit + 1
+        window = ring.slice(pivot_pos + offset, pivot_pos + min(stop, head))
+        if stop > head:
+            window += ring.slice(max(offset - head, 0), min(stop - head, pivot_pos))
+        has_more = len(window) > limit
+        keys = window[:limit]
+        next_cursor = None
+        if has_more:
+            last_key, last_id = keys[-1]
+            next_cursor = encode_random_cursor(seed, offset + limit > head, last_key, last_id)
+        return keys, has_more, next_cursor
 
     def add_fallback(self, post: Post) -> None:
         # Ensure fallback content exists by saving ready post with a low score.
@@ -105,9 +381,9 @@ class InMemoryStore:
     def pick_fallback(self) -> Optional[Post]:
         while self.trending_buffer:
             pid = self.trending_buffer[0]
-            post = self.posts.get(pid)
-            if post and post.status == "ready":
-                return post
+            record = self.posts.get(pid)
+            if record and record.status == "ready":
+                return record.to_post()
             self.trending_buffer.popleft()
         return None
 
@@ -118,6 +394,36 @@ class InMemoryStore:
     def get_job(self, job_id: str) -> Optional[Dict]:
         return self.jobs.get(job_id)
 
+    def save_jobs(self, jobs: Dict[str, Dict]) -> None:
+        self.jobs.update(jobs)
+
+    def get_jobs(self, job_ids: List[str]) -> Dict[str, Dict]:
+        return {jid: self.jobs[jid] for jid in job_ids if jid in self.jobs}
+
+    def list_operation_jobs(self, page_size: int = 300) -> List[Dict]:
+        """Every unfinished job waiting on a Vertex operation (for the video poller)."""
+        return [
+            job for job in self.jobs.values()
+            if job.get("operation") and job.get("status") in ("pending", PROMOTING)
+        ]
+
+    def claim_job(self, job_id: str, lease_seconds: float) -> Optional[Dict]:
+        """Atomically move a pending job to "promoting"; None if someone else holds it."""
+        with self._claim_lock:
+            job = self.jobs.get(job_id)
+            if job is None or not job_claimable(job, lease_seconds):
+                return None
+            job["status"] = PROMOTING
+            job["promotingAt"] = time.time()
+            return dict(job)
+
+    # --- Generation cache ---
+    def save_generation(self, key: str, payload: Dict) -> None:
+        self.generations[key] = payload
+
+    def get_generation(self, key: str) -> Optional[Dict]:
+        return self.generations.get(key)
+
     # --- Budgets & gating ---
     def get_view_count(self, uid: str) -> int:
         return self.user_views[uid]
@@ -200,3 +506,50 @@ def reset_store() -> InMemoryStore:
     global STORE
     STORE = InMemoryStore()
     return STORE
+
+
+class AsyncInMemoryStore:
+    """Awaitable facade over :class:`InMemoryStore` matching ``AsyncFirestoreStore``.
+
+    In-memory operations never block, so each call runs inline on the event loop.
+    """
+
+    def __init__(self, inner: InMemoryStore) -> None:
+        self.inner = inner
+        self.shared_public_feed = inner.shared_public_feed
+
+    def on_public_post(self, callback: Callable[[Post], None]) -> None:
+        self.inner.on_public_post(callback)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.inner, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        async def call(*args, **kwargs):
+            return attr(*args, **kwargs)
+
+        return call
+
+
+_ASYNC_STORE: Optional[Tuple[object, object]] = None
+
+
+def get_async_store() -> Union[AsyncInMemoryStore, "AsyncFirestoreStore"]:  # type: ignore
+    """Awaitable twin of :func:`get_store` for ``async def`` handlers."""
+    global _ASYNC_STORE
+    sync_store = STORE
+    if _ASYNC_STORE is not None and _ASYNC_STORE[0] is sync_store:
+        return _ASYNC_STORE[1]  # type: ignore[return-value]
+    if isinstance(sync_store, InMemoryStore):
+        async_store: object = AsyncInMemoryStore(sync_store)
+    else:  # pragma: no cover - requires Firestore credentials
+        from .store_firestore_async import AsyncFirestoreStore
+
+        async_store = AsyncFirestoreStore(
+            default_budget=DEFAULT_SESSION_BUDGET,
+            project=sync_store.client.project,
+            public_post_listeners=sync_store._public_post_listeners,
+        )
+    _ASYNC_STORE = (sync_store, async_store)
+    return async_store  # type: ignore[return-value]
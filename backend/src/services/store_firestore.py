@@ -1,60 +1,362 @@
 from __future__ import annotations
 
 import logging
+import time
 from datetime import datetime
-from typing import Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from google.cloud import firestore  # type: ignore
 from google.cloud.firestore_v1 import Increment, Transaction  # type: ignore
 
 from ..config import get_settings
 from ..models.schemas import FeedItem, Post
+from .job_state import PROMOTING, job_claimable
+from .pagination import (
+    decode_cursor,
+    decode_random_cursor,
+    encode_cursor,
+    encode_random_cursor,
+    new_random_seed,
+    random_key,
+    random_pivot,
+)
 
 logger = logging.getLogger(__name__)
 
+FeedPage = Tuple[List[FeedItem], bool, Optional[str]]
 
-class FirestoreStore:
+
+def _resolve_project(project: Optional[str]) -> str:
+    project_id = project or get_settings().vertex_project
+    if not project_id:
+        raise ValueError("GCP_PROJECT_ID must be set in environment or config")
+    return project_id
+
+
+class FirestoreBase:
+    """Collection handles plus query/payload helpers shared by the sync and async stores.
+
+    Subclasses only differ in how they execute the queries built here.
+    """
+
+    # Hot/interests feeds query the global posts collection, identical for every user.
+    shared_public_feed = True
+    # Firestore rejects a batched write with more operations than this
+    MAX_BATCH_WRITES = 500
+
+    def _bind_client(self, client: Any, default_budget: Optional[Dict[str, int]],
+                     public_post_listeners: Optional[List[Callable[[Post], None]]] = None) -> None:
+        self.client = client
+        self._posts = client.collection("posts")
+        self._feeds = client.collection("feeds")
+        self._jobs = client.collection("feed_jobs")
+        self._users = client.collection("users")
+        self._trending = client.collection("trending")
+        self._generations = client.collection("generation_cache")
+        self._default_budget = dict(default_budget or {"images": 3, "videos": 1})
+        self._public_post_listeners: List[Callable[[Post], None]] = (
+            public_post_listeners if public_post_listeners is not None else []
+        )
+
+    def on_public_post(self, callback: Callable[[Post], None]) -> None:
+        """Register a callback fired whenever a save may change the public feeds."""
+        self._public_post_listeners.append(callback)
+
+    def _notify_public_post(self, post: Post) -> None:
+        # save_post overwrites without reading the old document, so it cannot
+        # tell whether a private or non-ready post was public before: notify on
+        # every save rather than leave a withdrawn post in cached pages
+        for callback in self._public_post_listeners:
+            callback(post)
+
+    # --- Payloads ----------------------------------------------------------------
+    @staticmethod
+    def _post_payload(post: Post) -> Dict[str, Any]:
+        payload = post.model_dump()
+        created_at = payload.get("createdAt") or datetime.utcnow()
+        payload["createdAt"] = created_at
+        payload["updatedAt"] = datetime.utcnow()
+        payload["randomKey"] = random_key(post.id)
+        return payload
+
+    @staticmethod
+    def _parse_post(doc: Any, lenient: bool = True) -> Optional[Post]:
+        if not doc.exists:
+            return None
+        data = doc.to_dict() or {}
+        data.setdefault("id", doc.id)
+        try:
+            return Post.model_validate(data)
+        except Exception as exc:  # pragma: no cover - defensive path
+            if not lenient:
+                raise
+            logger.warning("Failed to parse post %s: %s", doc.id, exc)
+            return None
+
+    @staticmethod
+    def _feed_entry_payload(post: Post, score: float, reason: List[str]) -> Dict[str, Any]:
+        return {
+            "postId": post.id,
+            "score": score,
+            "reason": reason,
+            "createdAt": datetime.utcnow(),
+        }
+
+    @staticmethod
+    def _trending_payload(post_id: str, score: float) -> Dict[str, Any]:
+        return {
+            "postId": post_id,
+            "score": score,
+            "createdAt": datetime.utcnow(),
+        }
+
+    @staticmethod
+    def _job_payload(payload: Dict) -> Dict:
+        data = dict(payload)
+        now = datetime.utcnow()
+        data.setdefault("createdAt", now)
+        data["updatedAt"] = now
+        return data
+
+    def _job_batches(self, jobs: Dict[str, Dict]) -> List[Any]:
+        # One batch per MAX_BATCH_WRITES jobs; each is committed on its own
+        items = list(jobs.items())
+        batches = []
+        for start in range(0, len(items), self.MAX_BATCH_WRITES):
+            batch = self.client.batch()
+            for job_id, payload in items[start:start + self.MAX_BATCH_WRITES]:
+                batch.set(self._jobs.document(job_id), self._job_payload(payload), merge=True)
+            batches.append(batch)
+        return batches
+
+    def _operation_jobs_query(self, page_size: int, after: Any = None) -> Any:
+        # Unfinished jobs backed by a Vertex operation, paged by document so a
+        # restart recovers all of them, not just the first page
+        query = (
+            self._jobs
+            .where("status", "in", ["pending", PROMOTING])
+            .where("operation", "!=", None)
+            .order_by("operation")
+            .order_by("__name__")
+            .limit(page_size)
+        )
+        return query.start_after(after) if after is not None else query
+
+    @staticmethod
+    def _parse_job(doc: Any) -> Optional[Dict]:
+        if not doc.exists:
+            return None
+        data = doc.to_dict() or {}
+        data.setdefault("jobId", doc.id)
+        return data
+
+    @staticmethod
+    def _profile_images_payload(
+        capture_images=None,
+        base_image=None,
+        base_image_public_url=None,
+        base_image_approved=None,
+        base_image_created_at=None,
+    ) -> Dict[str, Any]:
+        # Build nested structure properly
+        profile_images: Dict[str, Any] = {}
+        if capture_images is not None:
+            profile_images["captureImages"] = {
+                "front": capture_images.front,
+                "left": capture_images.left,
+                "right": capture_images.right,
+            }
+        if base_image is not None:
+            profile_images["baseImage"] = base_image
+        if base_image_public_url is not None:
+            profile_images["baseImagePublicUrl"] = base_image_public_url
+        if base_image_approved is not None:
+            profile_images["baseImageApproved"] = base_image_approved
+        if base_image_created_at is not None:
+            profile_images["baseImageCreatedAt"] = base_image_created_at
+        return profile_images
+
+    def _budget_from(self, snapshot: Any) -> Dict[str, int]:
+        budget = dict(self._default_budget)
+        if snapshot.exists:
+            data = snapshot.to_dict() or {}
+            budget.update(data.get("sessionBudget", {}))
+        return budget
+
+    # --- Feed queries --------------------------------------------------------------
+    def _feed_query(self, uid: str, limit: int, feed_type: Optional[str], page: int,
+                    cursor: Optional[str]) -> Any:
+        # Keyset pagination: order by (createdAt, __name__) DESC and resume after the
+        # cursor so every page reads exactly limit + 1 documents regardless of depth.
+        # Public feeds query the global posts collection, the private feed ("Your Feed")
+        # queries the user's personal feed items.
+        if feed_type in ["hot", "interests"]:
+            query = (
+                self._posts
+                .where("status", "==", "ready")
+                .where("isPrivate", "==", False)
+            )
+        else:
+            query = self._feeds.document(uid).collection("items")
+        query = (
+            query.order_by("createdAt", direction=firestore.Query.DESCENDING)
+            .order_by("__name__", direction=firestore.Query.DESCENDING)
+        )
+        if cursor:
+            created_at, doc_id = decode_cursor(cursor)
+            query = query.start_after({"createdAt": created_at, "__name__": doc_id})
+        elif page > 0:
+            # Legacy page-number clients; offset is resolved server-side.
+            query = query.offset(page * limit)
+        return query.limit(limit + 1)
+
+    @staticmethod
+    def _split_feed_page(docs: List[Any], limit: int) -> Tuple[List[Tuple[Any, Dict]], bool, Optional[str]]:
+        has_more = len(docs) > limit
+        rows = [(doc, doc.to_dict() or {}) for doc in docs[:limit]]
+        next_cursor = None
+        if has_more:
+            last, data = rows[-1]
+            next_cursor = encode_cursor(data["createdAt"], last.id)
+        return rows, has_more, next_cursor
+
+    @staticmethod
+    def _feed_items(feed_type: Optional[str], rows: List[Tuple[Any, Dict]],
+                    hydrated: Dict[str, Post]) -> Tuple[List[FeedItem], int]:
+        # For public feeds, doc IS the post; for private feed, doc contains a postId
+        # reference, resolved for the whole page with one batched read.
+        items: List[FeedItem] = []
+        filtered_docs = 0
+        for doc, data in rows:
+            if feed_type in ["hot", "interests"]:
+                post = Post(**data)
+                post.id = doc.id
+            else:
+                post_id = data.get("postId")
+                if not post_id:
+                    continue
+                post = hydrated.get(post_id)
+                if not post or post.status != "ready":
+                    filtered_docs += 1
+                    continue
+            items.append(
+                FeedItem(
+                    slot="READY",
+                    post=post,
+                    reason=list(data.get("reason", [])),
+                )
+            )
+        return items, filtered_docs
+
+    def _take_private_rows(self, rows: List[Tuple[Any, Dict]], hydrated: Dict[str, Post],
+                           items: List[FeedItem], limit: int) -> Tuple[int, int]:
+        # Your Feed also indexes pending/failed posts: append the ready ones until
+        # the page is full. Returns (rows examined, rows filtered out).
+        examined = filtered_docs = 0
+        for row in rows:
+            examined += 1
+            row_items, row_filtered = self._feed_items(None, [row], hydrated)
+            items.extend(row_items)
+            filtered_docs += row_filtered
+            if len(items) == limit:
+                break
+        return examined, filtered_docs
+
+    # Walk the randomKey ring from the session pivot: keys >= pivot first, then
+    # wrap to keys < pivot. Each page reads at most limit + 1 documents.
+    @staticmethod
+    def _random_start(cursor: Optional[str], seed: Optional[int]) -> Tuple[int, bool, Optional[float], Optional[str]]:
+        if cursor:
+            return decode_random_cursor(cursor)
+        return (seed if seed is not None else new_random_seed()), False, None, None
+
+    def _random_queries(self, seed: int, wrapped: bool, last_key: Optional[float],
+                        last_id: Optional[str]) -> List[Tuple[bool, Any]]:
+        pivot = random_pivot(seed)
+        base = (
+            self._posts
+            .where("status", "==", "ready")
+            .where("isPrivate", "==", False)
+        )
+        phases = [(True, "<")] if wrapped else [(False, ">="), (True, "<")]
+        queries = []
+        for phase_wrapped, op in phases:
+            query = (
+                base.where("randomKey", op, pivot)
+                .order_by("randomKey")
+                .order_by("__name__")
+            )
+            if last_key is not None and phase_wrapped == wrapped:
+                query = query.start_after({"randomKey": last_key, "__name__": last_id})
+            queries.append((phase_wrapped, query))
+        return queries
+
+    @staticmethod
+    def _random_page(seed: int, docs: List[Tuple[bool, Any]], limit: int) -> FeedPage:
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        items: List[FeedItem] = []
+        for _, doc in docs:
+            data = doc.to_dict() or {}
+            post = Post(**data)
+            post.id = doc.id
+            items.append(
+                FeedItem(
+                    slot="READY",
+                    post=post,
+                    reason=list(data.get("reason", [])),
+                )
+            )
+        next_cursor = None
+        if has_more:
+            last_wrapped, last = docs[-1]
+            next_cursor = encode_random_cursor(seed, last_wrapped, random_key(last.id), last.id)
+        logger.debug("Random feed (seed=%s): returned=%d, has_more=%s", seed, len(items), has_more)
+        return items, has_more, next_cursor
+
+    def _trending_query(self) -> Any:
+        return (
+            self._trending.order_by("createdAt", direction=firestore.Query.DESCENDING)
+            .limit(20)
+        )
+
+
+class FirestoreStore(FirestoreBase):
     """Firestore-backed store for production deployments."""
 
     def __init__(self, *, default_budget: Optional[Dict[str, int]] = None,
                  client: Optional[firestore.Client] = None,
                  project: Optional[str] = None) -> None:
         if client is None:
-            settings = get_settings()
-            project_id = project or settings.vertex_project
-            if not project_id:
-                raise ValueError("GCP_PROJECT_ID must be set in environment or config")
+            project_id = _resolve_project(project)
             logger.info(f"Initializing Firestore with project: {project_id}, database: (default)")
             # Must specify database='(default)' to connect to the correct Firestore instance
-            self.client = firestore.Client(project=project_id, database='(default)')
-        else:
-            self.client = client
-        self._posts = self.client.collection("posts")
-        self._feeds = self.client.collection("feeds")
-        self._jobs = self.client.collection("feed_jobs")
-        self._users = self.client.collection("users")
-        self._trending = self.client.collection("trending")
-        self._default_budget = dict(default_budget or {"images": 3, "videos": 1})
+            client = firestore.Client(project=project_id, database='(default)')
+        self._bind_client(client, default_budget)
 
     # --- Posts -----------------------------------------------------------------
     def save_post(self, post: Union[Post, Dict]) -> Post:
         if not isinstance(post, Post):
             post = Post.model_validate(post)
-        payload = post.model_dump()
-        created_at = payload.get("createdAt") or datetime.utcnow()
-        payload["createdAt"] = created_at
-        payload["updatedAt"] = datetime.utcnow()
-        self._posts.document(post.id).set(payload)
+        self._posts.document(post.id).set(self._post_payload(post))
         logger.debug("Saved post %s", post.id)
+        self._notify_public_post(post)
         return post
 
     def get_post(self, post_id: str) -> Optional[Post]:
-        doc = self._posts.document(post_id).get()
-        if not doc.exists:
-            return None
-        data = doc.to_dict() or {}
-        data.setdefault("id", doc.id)
-        return Post.model_validate(data)
+        return self._parse_post(self._posts.document(post_id).get(), lenient=False)
+
+    def get_posts(self, post_ids: List[str]) -> Dict[str, Post]:
+        """Fetch many posts in a single batched read, keyed by post id."""
+        refs = [self._posts.document(pid) for pid in dict.fromkeys(post_ids)]
+        posts: Dict[str, Post] = {}
+        if not refs:
+            return posts
+        for doc in self.client.get_all(refs):
+            post = self._parse_post(doc)
+            if post is not None:
+                posts[doc.id] = post
+        return posts
 
     def list_ready_posts(self, limit: int = 12) -> List[Post]:
         query = (
@@ -62,15 +364,8 @@ class FirestoreStore:
             .order_by("createdAt", direction=firestore.Query.DESCENDING)
             .limit(limit)
         )
-        posts: List[Post] = []
-        for doc in query.stream():
-            data = doc.to_dict() or {}
-            data.setdefault("id", doc.id)
-            try:
-                posts.append(Post.model_validate(data))
-            except Exception as exc:  # pragma: no cover - defensive path
-                logger.warning("Failed to parse post %s: %s", doc.id, exc)
-        return posts
+        posts = (self._parse_post(doc) for doc in query.stream())
+        return [post for post in posts if post is not None]
 
     # --- Feed ------------------------------------------------------------------
     def attach_to_feed(self, uid: str, post: Post, score: float, reason: List[str]) -> None:
@@ -79,161 +374,71 @@ class FirestoreStore:
             .collection("items")
             .document(post.id)
         )
-        feed_doc.set(
-            {
-                "postId": post.id,
-                "score": score,
-                "reason": reason,
-                "createdAt": datetime.utcnow(),
-            },
-            merge=True,
-        )
+        feed_doc.set(self._feed_entry_payload(post, score, reason), merge=True)
         logger.debug("Attached post %s to feed %s", post.id, uid)
         # Mirror in trending collection for fallback use
         if post.status == "ready":
-            self._trending.document(post.id).set(
-                {
-                    "postId": post.id,
-                    "score": score,
-                    "createdAt": datetime.utcnow(),
-                },
-                merge=True,
-            )
+            self._trending.document(post.id).set(self._trending_payload(post.id, score), merge=True)
 
-    def get_feed_ready(self, uid: str, limit: int, feed_type: Optional[str] = "hot", page: int = 0) -> tuple[List[FeedItem], bool]:
-        import random
-        # Order by createdAt DESC to show newest posts first
-        # (score was always 1.0 for all posts, making order unpredictable)
-        
-        # Calculate how many items we need to fetch:
-        # - Skip items from previous pages: page * limit
-        # - Items for current page: limit
-        # - Extra to check if more pages exist: 1
-        # - Multiply by 2 to account for privacy filtering
-        skip_count = page * limit
-        fetch_count = (skip_count + limit + 1) * 2
-        
-        # For random feed, we'll fetch ALL posts and shuffle them
+    def get_feed_ready(self, uid: str, limit: int, feed_type: Optional[str] = "hot", page: int = 0,
+                       cursor: Optional[str] = None,
+                       seed: Optional[int] = None) -> FeedPage:
         if feed_type == "random":
-            # Fetch ALL ready posts (no limit) for true randomness
-            fetch_count = 1000  # Large number to get all posts
-        
-        # Public feeds query global posts collection, private feed queries user's personal feed
-        if feed_type in ["hot", "interests", "random"]:
-            query_base = (
-                self._posts
-                .where("status", "==", "ready")
-                .where("isPrivate", "==", False)
-            )
-            
-            # For random feed, don't order by anything - just get all posts
-            if feed_type == "random":
-                query = query_base.limit(fetch_count)
-            else:
-                query = query_base.order_by("createdAt", direction=firestore.Query.DESCENDING).limit(fetch_count)
-        else:  # private/your feed
-            query = (
-                self._feeds.document(uid)
-                .collection("items")
-                .order_by("createdAt", direction=firestore.Query.DESCENDING)
-                .limit(fetch_count)
-            )
-        
+            return self._get_random_feed(limit, cursor, seed)
+
+        if feed_type not in ["hot", "interests"]:
+            return self._get_private_feed(uid, limit, page, cursor)
+
+        docs = list(self._feed_query(uid, limit, feed_type, page, cursor).stream())
+        rows, has_more, next_cursor = self._split_feed_page(docs, limit)
+        items, filtered_docs = self._feed_items(feed_type, rows, {})
+
+        logger.debug(
+            "Feed %s for %s: read=%d, filtered=%d, returned=%d, has_more=%s",
+            feed_type, uid, len(docs), filtered_docs, len(items), has_more,
+        )
+        return items, has_more, next_cursor
+
+    def _get_private_feed(self, uid: str, limit: int, page: int, cursor: Optional[str]) -> FeedPage:
+        # Keep reading past filtered rows until the page is full or the feed runs
+        # out, resuming each batch after the last document examined.
         items: List[FeedItem] = []
-        skipped = 0
-        has_more = False
-        total_docs = 0
-        filtered_docs = 0
-        logger.warning(f"FEED DEBUG: Fetching feed for user {uid} (feed_type={feed_type}, page={page}, limit={limit}, skip_count={skip_count}, fetch_count={fetch_count})")
-        
-        # For random feed, collect ALL posts first, then shuffle, then paginate
-        if feed_type == "random":
-            all_items = []
-            for doc in query.stream():
-                total_docs += 1
-                data = doc.to_dict() or {}
-                post = Post(**data)
-                post.id = doc.id
-                logger.warning(f"RANDOM FEED POST: doc.id={doc.id}, post.id={post.id}, data.id={data.get('id', 'MISSING')}, prompt={post.prompt[:30]}")
-                all_items.append(
-                    FeedItem(
-                        slot="READY",
-                        post=post,
-                        reason=list(data.get("reason", [])),
-                    )
-                )
-            
-            # Shuffle ALL items with a time-based seed for true randomness on each request
-            import time
-            random.seed(time.time())
-            random.shuffle(all_items)
-            
-            # Apply pagination AFTER shuffle
-            start_idx = skip_count
-            end_idx = skip_count + limit
-            items = all_items[start_idx:end_idx]
-            has_more = end_idx < len(all_items)
-            
-            logger.warning(f"RANDOM FEED: Total posts={len(all_items)}, after pagination={len(items)}, has_more={has_more}, seed={time.time()}")
-        else:
-            # For other feeds, use original pagination logic
-            for doc in query.stream():
-                total_docs += 1
-                data = doc.to_dict() or {}
-                
-                # For public feeds, doc IS the post; for private feed, doc contains postId reference
-                if feed_type in ["hot", "interests"]:
-                    post = Post(**data)
-                    post.id = doc.id
-                else:
-                    post_id = data.get("postId")
-                    if not post_id:
-                        continue
-                    post = self.get_post(post_id)
-                    if not post or post.status != "ready":
-                        filtered_docs += 1
-                        continue
-                
-                # Skip items for pagination
-                if skipped < skip_count:
-                    skipped += 1
-                    continue
-                
-                # Check if we have more items beyond the limit
-                if len(items) >= limit:
-                    has_more = True
-                    break
-                
-                is_private = getattr(post, "isPrivate", False)
-                logger.info(f"Adding post {post.id} to {feed_type} feed (private={is_private}, prompt: {post.prompt[:50]}...)")
-                items.append(
-                    FeedItem(
-                        slot="READY",
-                        post=post,
-                        reason=list(data.get("reason", [])),
-                    )
-                )
-        
-        logger.warning(f"FEED DEBUG: Pagination summary for {feed_type}: total_docs={total_docs}, filtered={filtered_docs}, skipped={skipped}, returned={len(items)}, has_more={has_more}")
-        return items, has_more
+        read = filtered_docs = 0
+        while True:
+            docs = list(self._feed_query(uid, limit, None, page, cursor).stream())
+            read += len(docs)
+            rows = [(doc, doc.to_dict() or {}) for doc in docs[:limit]]
+            hydrated = self.get_posts([data["postId"] for _, data in rows if data.get("postId")])
+            examined, filtered = self._take_private_rows(rows, hydrated, items, limit)
+            filtered_docs += filtered
+            has_more = examined < len(docs)
+            if rows:
+                last, data = rows[examined - 1]
+                cursor = encode_cursor(data["createdAt"], last.id)
+            if len(items) == limit or not has_more:
+                break
+
+        logger.debug(
+            "Feed private for %s: read=%d, filtered=%d, returned=%d, has_more=%s",
+            uid, read, filtered_docs, len(items), has_more,
+        )
+        return items, has_more, cursor if has_more else None
+
+    def _get_random_feed(self, limit: int, cursor: Optional[str], seed: Optional[int]) -> FeedPage:
+        seed, wrapped, last_key, last_id = self._random_start(cursor, seed)
+        docs: List[Tuple[bool, Any]] = []
+        for phase_wrapped, query in self._random_queries(seed, wrapped, last_key, last_id):
+            docs.extend((phase_wrapped, doc) for doc in query.limit(limit + 1 - len(docs)).stream())
+            if len(docs) > limit:
+                break
+        return self._random_page(seed, docs, limit)
 
     def add_fallback(self, post: Post) -> None:
         saved = self.save_post(post)
-        self._trending.document(saved.id).set(
-            {
-                "postId": saved.id,
-                "score": 1.0,
-                "createdAt": datetime.utcnow(),
-            },
-            merge=True,
-        )
+        self._trending.document(saved.id).set(self._trending_payload(saved.id, 1.0), merge=True)
 
     def pick_fallback(self) -> Optional[Post]:
-        query = (
-            self._trending.order_by("createdAt", direction=firestore.Query.DESCENDING)
-            .limit(20)
-        )
-        for doc in query.stream():
+        for doc in self._trending_query().stream():
             data = doc.to_dict() or {}
             post_id = data.get("postId")
             if not post_id:
@@ -245,20 +450,65 @@ class FirestoreStore:
 
     # --- Jobs ------------------------------------------------------------------
     def save_job(self, job_id: str, payload: Dict) -> None:
-        data = dict(payload)
-        now = datetime.utcnow()
-        data.setdefault("createdAt", now)
-        data["updatedAt"] = now
-        self._jobs.document(job_id).set(data, merge=True)
+        self._jobs.document(job_id).set(self._job_payload(payload), merge=True)
         logger.debug("Saved job %s", job_id)
 
+    def save_jobs(self, jobs: Dict[str, Dict]) -> None:
+        """Write many jobs in batched commits of at most MAX_BATCH_WRITES each."""
+        for batch in self._job_batches(jobs):
+            batch.commit()
+        logger.debug("Saved %d jobs", len(jobs))
+
     def get_job(self, job_id: str) -> Optional[Dict]:
-        doc = self._jobs.document(job_id).get()
-        if not doc.exists:
-            return None
-        data = doc.to_dict() or {}
-        data.setdefault("jobId", doc.id)
-        return data
+        return self._parse_job(self._jobs.document(job_id).get())
+
+    def get_jobs(self, job_ids: List[str]) -> Dict[str, Dict]:
+        """Fetch many jobs in a single batched read, keyed by job id."""
+        refs = [self._jobs.document(jid) for jid in dict.fromkeys(job_ids)]
+        jobs: Dict[str, Dict] = {}
+        if not refs:
+            return jobs
+        for doc in self.client.get_all(refs):
+            job = self._parse_job(doc)
+            if job is not None:
+                jobs[doc.id] = job
+        return jobs
+
+    def list_operation_jobs(self, page_size: int = 300) -> List[Dict]:
+        """Every unfinished job waiting on a Vertex operation (for the video poller)."""
+        jobs: List[Dict] = []
+        last = None
+        while True:
+            docs = list(self._operation_jobs_query(page_size, last).stream())
+            jobs.extend(job for job in map(self._parse_job, docs) if job is not None)
+            if len(docs) < page_size:
+                return jobs
+            last = docs[-1]
+
+    def claim_job(self, job_id: str, lease_seconds: float) -> Optional[Dict]:
+        """Atomically move a pending job to "promoting"; None if someone else holds it."""
+        ref = self._jobs.document(job_id)
+
+        @firestore.transactional
+        def _txn(transaction: Transaction) -> Optional[Dict]:
+            job = self._parse_job(ref.get(transaction=transaction))
+            if job is None or not job_claimable(job, lease_seconds):
+                return None
+            claim = {"status": PROMOTING, "promotingAt": time.time()}
+            transaction.update(ref, claim)
+            job.update(claim)
+            return job
+
+        transaction: Transaction = self.client.transaction()
+        return _txn(transaction)
+
+    # --- Generation cache --------------------------------------------------------
+    def save_generation(self, key: str, payload: Dict) -> None:
+        self._generations.document(key).set(payload)
+
+    def get_generation(self, key: str) -> Optional[Dict]:
+        doc = self._generations.document(key).get()
+        return doc.to_dict() if doc.exists else None
 
     # --- Budgets & gating ------------------------------------------------------
     def get_view_count(self, uid: str) -> int:
@@ -283,23 +533,14 @@ class FirestoreStore:
         return _txn(transaction)
 
     def get_budget(self, uid: str) -> Dict[str, int]:
-        doc = self._users.document(uid).get()
-        budget = dict(self._default_budget)
-        if doc.exists:
-            data = doc.to_dict() or {}
-            budget.update(data.get("sessionBudget", {}))
-        return budget
+        return self._budget_from(self._users.document(uid).get())
 
     def consume_budget(self, uid: str, media_type: str) -> bool:
         ref = self._users.document(uid)
 
         @firestore.transactional
         def _txn(transaction: Transaction) -> bool:
-            snapshot = ref.get(transaction=transaction)
-            budget = dict(self._default_budget)
-            if snapshot.exists:
-                data = snapshot.to_dict() or {}
-                budget.update(data.get("sessionBudget", {}))
+            budget = self._budget_from(ref.get(transaction=transaction))
             remaining = int(budget.get(media_type, 0))
             if remaining <= 0:
                 return False
@@ -309,7 +550,7 @@ class FirestoreStore:
 
         transaction: Transaction = self.client.transaction()
         return _txn(transaction)
-    
+
     # --- User Profile ----------------------------------------------------------
     def get_user(self, uid: str) -> Optional[Dict]:
         """Get user data including profile images"""
@@ -317,10 +558,10 @@ class FirestoreStore:
         if not doc.exists:
             return None
         return doc.to_dict()
-    
+
     def update_user_profile_images(
-        self, 
-        uid: str, 
+        self,
+        uid: str,
         capture_images=None,
         base_image=None,
         base_image_public_url=None,
@@ -328,30 +569,13 @@ class FirestoreStore:
         base_image_created_at=None,
     ) -> None:
         """Update user's profile images"""
-        ref = self._users.document(uid)
-        
-        # Build nested structure properly
-        profile_images = {}
-        
-        if capture_images is not None:
-            profile_images["captureImages"] = {
-                "front": capture_images.front,
-                "left": capture_images.left,
-                "right": capture_images.right,
-            }
-        if base_image is not None:
-            profile_images["baseImage"] = base_image
-        if base_image_public_url is not None:
-            profile_images["baseImagePublicUrl"] = base_image_public_url
-        if base_image_approved is not None:
-            profile_images["baseImageApproved"] = base_image_approved
-        if base_image_created_at is not None:
-            profile_images["baseImageCreatedAt"] = base_image_created_at
-        
+        profile_images = self._profile_images_payload(
+            capture_images, base_image, base_image_public_url, base_image_approved, base_image_created_at,
+        )
         if profile_images:
             # Use nested structure with merge to preserve existing fields
-            ref.set({"profileImages": profile_images}, merge=True)
+            self._users.document(uid).set({"profileImages": profile_images}, merge=True)
             logger.debug("Updated profile images for user %s: %s", uid, profile_images)
 
 
-__all__ = ["FirestoreStore"]
+__all__ = ["FirestoreBase", "FirestoreStore"]
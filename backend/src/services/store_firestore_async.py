@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from google.cloud import firestore  # type: ignore
+from google.cloud.firestore_v1 import AsyncTransaction, Increment  # type: ignore
+
+from ..models.schemas import FeedItem, Post
+from .job_state import PROMOTING, job_claimable
+from .pagination import encode_cursor
+from .store_firestore import FeedPage, FirestoreBase, _resolve_project
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncFirestoreStore(FirestoreBase):
+    """Firestore store on ``AsyncClient`` for handlers running on the event loop.
+
+    Mirrors :class:`FirestoreStore` method for method; every call is awaitable
+    so a slow Firestore round-trip never blocks a threadpool worker.
+    """
+
+    def __init__(self, *, default_budget: Optional[Dict[str, int]] = None,
+                 client: Optional[firestore.AsyncClient] = None,
+                 project: Optional[str] = None,
+                 public_post_listeners: Optional[List[Callable[[Post], None]]] = None) -> None:
+        if client is None:
+            project_id = _resolve_project(project)
+            logger.info(f"Initializing async Firestore with project: {project_id}, database: (default)")
+            client = firestore.AsyncClient(project=project_id, database='(default)')
+        # Sharing the listener list with the sync store keeps the public feed
+        # cache invalidated no matter which client wrote the post.
+        self._bind_client(client, default_budget, public_post_listeners)
+
+    # --- Posts -----------------------------------------------------------------
+    async def save_post(self, post: Union[Post, Dict]) -> Post:
+        if not isinstance(post, Post):
+            post = Post.model_validate(post)
+        await self._posts.document(post.id).set(self._post_payload(post))
+        logger.debug("Saved post %s", post.id)
+        self._notify_public_post(post)
+        return post
+
+    async def get_post(self, post_id: str) -> Optional[Post]:
+        return self._parse_post(await self._posts.document(post_id).get(), lenient=False)
+
+    async def get_posts(self, post_ids: List[str]) -> Dict[str, Post]:
+        """Fetch many posts in a single batched read, keyed by post id."""
+        refs = [self._posts.document(pid) for pid in dict.fromkeys(post_ids)]
+        posts: Dict[str, Post] = {}
+        if not refs:
+            return posts
+        async for doc in self.client.get_all(refs):
+            post = self._parse_post(doc)
+            if post is not None:
+                posts[doc.id] = post
+        return posts
+
+    async def list_ready_posts(self, limit: int = 12) -> List[Post]:
+        query = (
+            self._posts.where("status", "==", "ready")
+            .order_by("createdAt", direction=firestore.Query.DESCENDING)
+            .limit(limit)
+        )
+        posts = [self._parse_post(doc) async for doc in query.stream()]
+        return [post for post in posts if post is not None]
+
+    # --- Feed ------------------------------------------------------------------
+    async def attach_to_feed(self, uid: str, post: Post, score: float, reason: List[str]) -> None:
+        feed_doc = (
+            self._feeds.document(uid)
+            .collection("items")
+            .document(post.id)
+        )
+        await feed_doc.set(self._feed_entry_payload(post, score, reason), merge=True)
+        logger.debug("Attached post %s to feed %s", post.id, uid)
+        # Mirror in trending collection for fallback use
+        if post.status == "ready":
+            await self._trending.document(post.id).set(self._trending_payload(post.id, score), merge=True)
+
+    async def get_feed_ready(self, uid: str, limit: int, feed_type: Optional[str] = "hot", page: int = 0,
+                             cursor: Optional[str] = None,
+                             seed: Optional[int] = None) -> FeedPage:
+        if feed_type == "random":
+            return await self._get_random_feed(limit, cursor, seed)
+
+        if feed_type not in ["hot", "interests"]:
+            return await self._get_private_feed(uid, limit, page, cursor)
+
+        docs = [doc async for doc in self._feed_query(uid, limit, feed_type, page, cursor).stream()]
+        rows, has_more, next_cursor = self._split_feed_page(docs, limit)
+        items, filtered_docs = self._feed_items(feed_type, rows, {})
+
+        logger.debug(
+            "Feed %s for %s: read=%d, filtered=%d, returned=%d, has_more=%s",
+            feed_type, uid, len(docs), filtered_docs, len(items), has_more,
+        )
+        return items, has_more, next_cursor
+
+    async def _get_private_feed(self, uid: str, limit: int, page: int, cursor: Optional[str]) -> FeedPage:
+        # Same scan as FirestoreStore._get_private_feed, with awaited reads
+        items: List[FeedItem] = []
+        read = filtered_docs = 0
+        while True:
+            docs = [doc async for doc in self._feed_query(uid, limit, None, page, cursor).stream()]
+            read += len(docs)
+            rows = [(doc, doc.to_dict() or {}) for doc in docs[:limit]]
+            hydrated = await self.get_posts([data["postId"] for _, data in rows if data.get("postId")])
+            examined, filtered = self._take_private_rows(rows, hydrated, items, limit)
+            filtered_docs += filtered
+            has_more = examined < len(docs)
+            if rows:
+                last, data = rows[examined - 1]
+                cursor = encode_cursor(data["createdAt"], last.id)
+            if len(items) == limit or not has_more:
+                break
+
+        logger.debug(
+            "Feed private for %s: read=%d, filtered=%d, returned=%d, has_more=%s",
+            uid, read, filtered_docs, len(items), has_more,
+        )
+        return items, has_more, cursor if has_more else None
+
+    async def _get_random_feed(self, limit: int, cursor: Optional[str], seed: Optional[int]) -> FeedPage:
+        seed, wrapped, last_key, last_id = self._random_start(cursor, seed)
+        docs: List[Tuple[bool, Any]] = []
+        for phase_wrapped, query in self._random_queries(seed, wrapped, last_key, last_id):
+            async for doc in query.limit(limit + 1 - len(docs)).stream():
+                docs.append((phase_wrapped, doc))
+            if len(docs) > limit:
+                break
+        return self._random_page(seed, docs, limit)
+
+    async def add_fallback(self, post: Post) -> None:
+        saved = await self.save_post(post)
+        await self._trending.document(saved.id).set(self._trending_payload(saved.id, 1.0), merge=True)
+
+    async def pick_fallback(self) -> Optional[Post]:
+        async for doc in self._trending_query().stream():
+            data = doc.to_dict() or {}
+            post_id = data.get("postId")
+            if not post_id:
+                continue
+            post = await self.get_post(post_id)
+            if post and post.status == "ready":
+                return post
+        return None
+
+    # --- Jobs ------------------------------------------------------------------
+    async def save_job(self, job_id: str, payload: Dict) -> None:
+        await self._jobs.document(job_id).set(self._job_payload(payload), merge=True)
+        logger.debug("Saved job %s", job_id)
+
+    async def save_jobs(self, jobs: Dict[str, Dict]) -> None:
+        """Write many jobs in batched commits of at most MAX_BATCH_WRITES each."""
+        for batch in self._job_batches(jobs):
+            await batch.commit()
+        logger.debug("Saved %d jobs", len(jobs))
+
+    async def get_job(self, job_id: str) -> Optional[Dict]:
+        return self._parse_job(await self._jobs.document(job_id).get())
+
+    async def get_jobs(self, job_ids: List[str]) -> Dict[str, Dict]:
+        """Fetch many jobs in a single batched read, keyed by job id."""
+        refs = [self._jobs.document(jid) for jid in dict.fromkeys(job_ids)]
+        jobs: Dict[str, Dict] = {}
+        if not refs:
+            return jobs
+        async for doc in self.client.get_all(refs):
+            job = self._parse_job(doc)
+            if job is not None:
+                jobs[doc.id] = job
+        return jobs
+
+    async def list_operation_jobs(self, page_size: int = 300) -> List[Dict]:
+        """Every unfinished job waiting on a Vertex operation (for the video poller)."""
+        jobs: List[Dict] = []
+        last = None
+        while True:
+            docs = [doc async for doc in self._operation_jobs_query(page_size, last).stream()]
+            jobs.extend(job for job in map(self._parse_job, docs) if job is not None)
+            if len(docs) < page_size:
+                return jobs
+            last = docs[-1]
+
+    async def claim_job(self, job_id: str, lease_seconds: float) -> Optional[Dict]:
+        """Atomically move a pending job to "promoting"; None if someone else holds it."""
+        ref = self._jobs.document(job_id)
+
+        @firestore.async_transactional
+        async def _txn(transaction: AsyncTransaction) -> Optional[Dict]:
+            job = self._parse_job(await ref.get(transaction=transaction))
+            if job is None or not job_claimable(job, lease_seconds):
+                return None
+            claim = {"status": PROMOTING, "promotingAt": time.time()}
+            transaction.update(ref, claim)
+            job.update(claim)
+            return job
+
+        return await _txn(self.client.transaction())
+
+    # --- Generation cache --------------------------------------------------------
+    async def save_generation(self, key: str, payload: Dict) -> None:
+        await self._generations.document(key).set(payload)
+
+    async def get_generation(self, key: str) -> Optional[Dict]:
+        doc = await self._generations.document(key).get()
+        return doc.to_dict() if doc.exists else None
+
+    # --- Budgets & gating ------------------------------------------------------
+    async def get_view_count(self, uid: str) -> int:
+        doc = await self._users.document(uid).get()
+        if not doc.exists:
+            return 0
+        return int((doc.to_dict() or {}).get("viewCount", 0))
+
+    async def increment_view(self, uid: str) -> int:
+        ref = self._users.document(uid)
+
+        @firestore.async_transactional
+        async def _txn(transaction: AsyncTransaction) -> int:
+            snapshot = await ref.get(transaction=transaction)
+            current = 0
+            if snapshot.exists:
+                current = int((snapshot.to_dict() or {}).get("viewCount", 0))
+            transaction.set(ref, {"viewCount": Increment(1)}, merge=True)
+            return current + 1
+
+        return await _txn(self.client.transaction())
+
+    async def get_budget(self, uid: str) -> Dict[str, int]:
+        return self._budget_from(await self._users.document(uid).get())
+
+    async def consume_budget(self, uid: str, media_type: str) -> bool:
+        ref = self._users.document(uid)
+
+        @firestore.async_transactional
+        async def _txn(transaction: AsyncTransaction) -> bool:
+            budget = self._budget_from(await ref.get(transaction=transaction))
+            remaining = int(budget.get(media_type, 0))
+            if remaining <= 0:
+                return False
+            budget[media_type] = remaining - 1
+            transaction.set(ref, {"sessionBudget": budget}, merge=True)
+            return True
+
+        return await _txn(self.client.transaction())
+
+    # --- User Profile ----------------------------------------------------------
+    async def get_user(self, uid: str) -> Optional[Dict]:
+        """Get user data including profile images"""
+        doc = await self._users.document(uid).get()
+        if not doc.exists:
+            return None
+        return doc.to_dict()
+
+    async def update_user_profile_images(
+        self,
+        uid: str,
+        capture_images=None,
+        base_image=None,
+        base_image_public_url=None,
+        base_image_approved=None,
+        base_image_created_at=None,
+    ) -> None:
+        """Update user's profile images"""
+        profile_images = self._profile_images_payload(
+            capture_images, base_image, base_image_public_url, base_image_approved, base_image_created_at,
+        )
+        if profile_images:
+            # Use nested structure with merge to preserve existing fields
+            await self._users.document(uid).set({"profileImages": profile_images}, merge=True)
+            logger.debug("Updated profile images for user %s: %s", uid, profile_images)
+
+
+__all__ = ["AsyncFirestoreStore"]
@@ -1,10 +1,16 @@
 from __future__ import annotations
 
 import logging
+import threading
+import time
 from dataclasses import dataclass
-from typing import Dict, Optional
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
 
+import requests
 from google.cloud import aiplatform  # type: ignore
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 try:  # pragma: no cover - optional import depending on SDK version
     from google.cloud.aiplatform import generation  # type: ignore
@@ -12,24 +18,73 @@ except Exception:  # pragma: no cover - optional import
     generation = None
 
 from ..config import get_settings
+from .metrics import HistogramSet
 
 logger = logging.getLogger(__name__)
 
-_IMAGE_MODEL = "imagen-3.0-generate-img"
-_VIDEO_MODEL = "long-form-video@001"
+# Models behind generate_image/generate_video (the Pub/Sub worker path)
+IMAGE_MODEL = "imagen-3.0-generate-img"
+VIDEO_MODEL = "long-form-video@001"
+
+# Imagen model behind /gen/image; the one worth warming at startup.
+IMAGEN_FAST_MODEL = "imagen-4.0-fast-generate-001"
 
 _INITIALIZED = False
+_INIT_LOCK = threading.Lock()
 
 
-def _ensure_init() -> None:
+def ensure_init() -> None:
+    """Run ``aiplatform.init`` once per process."""
     global _INITIALIZED
     if _INITIALIZED:
         return
-    settings = get_settings()
-    if not settings.vertex_project or not settings.vertex_region:
-        raise RuntimeError("Vertex AI project/region not configured")
-    aiplatform.init(project=settings.vertex_project, location=settings.vertex_region)
-    _INITIALIZED = True
+    with _INIT_LOCK:
+        if _INITIALIZED:
+            return
+        settings = get_settings()
+        if not settings.vertex_project or not settings.vertex_region:
+            raise RuntimeError("Vertex AI project/region not configured")
+        aiplatform.init(project=settings.vertex_project, location=settings.vertex_region)
+        _INITIALIZED = True
+
+
+# --- Model registry --------------------------------------------------------------
+# ``from_pretrained`` resolves the publisher model over the network; handles are
+# safe to share, so each (class, model id) pair is loaded once per process.
+_MODELS: Dict[Tuple[str, str], Any] = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def get_model(model_cls: Any, model_id: str) -> Any:
+    """Memoized ``model_cls.from_pretrained(model_id)``."""
+    key = (f"{model_cls.__module__}.{model_cls.__qualname__}", model_id)
+    model = _MODELS.get(key)
+    if model is not None:
+        return model
+    with _MODELS_LOCK:
+        model = _MODELS.get(key)
+        if model is None:
+            ensure_init()
+            started = time.perf_counter()
+            model = model_cls.from_pretrained(model_id)
+            _MODELS[key] = model
+            logger.info("Loaded Vertex model %s in %.0f ms", model_id, (time.perf_counter() - started) * 1000)
+    return model
+
+
+def get_image_model(model_id: str = IMAGEN_FAST_MODEL) -> Any:
+    from vertexai.preview.vision_models import ImageGenerationModel
+
+    return get_model(ImageGenerationModel, model_id)
+
+
+def warm_up(image_model_ids: Iterable[str] = (IMAGEN_FAST_MODEL,)) -> None:
+    """Initialize the SDK and preload model handles so the first request skips it."""
+    for model_id in image_model_ids:
+        try:
+            get_image_model(model_id)
+        except Exception as exc:  # pragma: no cover - best effort at startup
+            logger.warning("Could not warm up Vertex model %s: %s", model_id, exc)
 
 
 @dataclass
@@ -43,10 +98,9 @@ class VertexGenerationResult:
 
 
 def generate_image(*, prompt: str, aspect: str, seed: Optional[int]) -> VertexGenerationResult:
-    _ensure_init()
     if generation is None:
         raise RuntimeError("Vertex AI generation SDK not available")
-    model = generation.ImageGenerationModel.from_pretrained(_IMAGE_MODEL)
+    model = get_model(generation.ImageGenerationModel, IMAGE_MODEL)
     response = model.generate_images(
         prompt=prompt,
         number_of_images=1,
@@ -59,7 +113,7 @@ def generate_image(*, prompt: str, aspect: str, seed: Optional[int]) -> VertexGe
     return VertexGenerationResult(
         bytes_payload=image.bytes,
         duration=None,
-        model=_IMAGE_MODEL,
+        model=IMAGE_MODEL,
         mime_type="image/jpeg",
         extension="jpg",
         safety={k: float(v) for k, v in metadata.items()},
@@ -67,10 +121,9 @@ def generate_image(*, prompt: str, aspect: str, seed: Optional[int]) -> VertexGe
 
 
 def generate_video(*, prompt: str, aspect: str, seed: Optional[int]) -> VertexGenerationResult:
-    _ensure_init()
     if generation is None:
         raise RuntimeError("Vertex AI generation SDK not available")
-    video_model = generation.VideoGenerationModel.from_pretrained(_VIDEO_MODEL)
+    video_model = get_model(generation.VideoGenerationModel, VIDEO_MODEL)
     response = video_model.generate_videos(
         prompt=prompt,
         aspect_ratio=aspect,
@@ -82,11 +135,176 @@ def generate_video(*, prompt: str, aspect: str, seed: Optional[int]) -> VertexGe
     return VertexGenerationResult(
         bytes_payload=video.bytes,
         duration=float(video.metadata.get("durationSeconds", 7.0)) if video.metadata else 7.0,
-        model=_VIDEO_MODEL,
+        model=VIDEO_MODEL,
         mime_type="video/mp4",
         extension="mp4",
         safety={k: float(v) for k, v in metadata.items()},
     )
 
 
-__all__ = ["generate_image", "generate_video", "VertexGenerationResult"]
+class VertexRestClient:
+    """Keep-alive REST client for Vertex AI publisher-model endpoints.
+
+    One pooled ``requests.Session`` serves every call, the OAuth token is reused
+    until shortly before it expires, and each call is timed into a per-method
+    latency histogram (see :meth:`stats`). Every call retries connection failures
+    and 429/503, which Vertex returns before doing any work. Gateway errors
+    (502/504) may arrive after a submit was accepted, so only idempotent methods
+    such as ``fetchPredictOperation`` retry those: resubmitting
+    ``predictLongRunning`` could start a second billed job.
+    """
+
+    SCOPES = ("https://www.googleapis.com/auth/cloud-platform",)
+    # Refresh this long before the reported expiry to avoid racing it
+    TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+    # Safe to repeat after an ambiguous gateway error
+    IDEMPOTENT_METHODS = frozenset({"fetchPredictOperation"})
+
+    def __init__(self, *, base_url: Optional[str] = None,
+                 token_provider: Optional[Callable[[], str]] = None,
+                 timeout_seconds: float = 30.0, connect_timeout_seconds: float = 5.0,
+                 retries: int = 3, pool_size: int = 16) -> None:
+        self.base_url = base_url
+        self.token_provider = token_provider
+        self.timeout = (connect_timeout_seconds, timeout_seconds)
+        self.session = self._session(retries, pool_size, status_forcelist=(429, 503))
+        self.idempotent_session = self._session(retries, pool_size, status_forcelist=(429, 502, 503, 504))
+        self.latency = HistogramSet()
+        self._credentials: Any = None
+        self._token_lock = threading.Lock()
+
+    @staticmethod
+    def _session(retries: int, pool_size: int, *, status_forcelist: Tuple[int, ...]) -> requests.Session:
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            status_forcelist=status_forcelist,
+            allowed_methods=frozenset({"POST"}),
+            backoff_factor=0.5,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    # --- Auth ------------------------------------------------------------------
+    def _token(self) -> str:
+        if self.token_provider is not None:
+            return self.token_provider()
+        with self._token_lock:
+            credentials = self._credentials
+            if credentials is None:  # pragma: no cover - requires GCP credentials
+                from google.auth import default
+
+                credentials, _ = default(scopes=list(self.SCOPES))
+                self._credentials = credentials
+            if self._token_stale(credentials):  # pragma: no cover - requires GCP credentials
+                from google.auth.transport.requests import Request as AuthRequest
+
+                credentials.refresh(AuthRequest(session=self.session))
+            token = getattr(credentials, "token", None)
+        if not token:
+            raise RuntimeError("Could not obtain authentication token")
+        return token
+
+    def _token_stale(self, credentials: Any) -> bool:
+        if not getattr(credentials, "token", None):
+            return True
+        expiry = getattr(credentials, "expiry", None)
+        if expiry is None:
+            return False
+        # google-auth reports expiry as naive UTC
+        return datetime.utcnow() >= expiry - self.TOKEN_REFRESH_MARGIN
+
+    def invalidate_token(self) -> None:
+        with self._token_lock:
+            if self._credentials is not None:
+                self._credentials.token = None
+
+    # --- Calls -------------------------------------------------------------------
+    def _model_url(self, model_id: str, method: str) -> str:
+        base_url = self.base_url
+        if base_url is None:
+            settings = get_settings()
+            base_url = (
+                f"https://{settings.vertex_region}-aiplatform.googleapis.com/v1/"
+                f"projects/{settings.vertex_project}/locations/{settings.vertex_region}/"
+                f"publishers/google/models"
+            )
+        return f"{base_url}/{model_id}:{method}"
+
+    def call(self, model_id: str, method: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST ``payload`` to ``{model}:{method}`` and return the JSON body."""
+        session = self.idempotent_session if method in self.IDEMPOTENT_METHODS else self.session
+        started = time.perf_counter()
+        try:
+            response = session.post(
+                self._model_url(model_id, method),
+                json=payload,
+                headers={"Authorization": f"Bearer {self._token()}"},
+                timeout=self.timeout,
+            )
+        finally:
+            self.latency.observe(method, (time.perf_counter() - started) * 1000)
+        if response.status_code == 401:
+            self.invalidate_token()
+        if response.status_code >= 400:
+            logger.error("Vertex %s error %d: %s", method, response.status_code, response.text[:500])
+        response.raise_for_status()
+        return response.json()
+
+    def predict_long_running(self, model_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return self.call(model_id, "predictLongRunning", payload)
+
+    def fetch_predict_operation(self, model_id: str, operation_name: str) -> Dict[str, Any]:
+        # POST with operationName in the body, NOT a GET on the operation path.
+        # Must use the same model_id as the initial predictLongRunning request.
+        return self.call(model_id, "fetchPredictOperation", {"operationName": operation_name})
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        return self.latency.snapshot()
+
+
+_REST_CLIENT: Optional[VertexRestClient] = None
+_REST_CLIENT_LOCK = threading.Lock()
+
+
+def get_rest_client() -> VertexRestClient:
+    """Process-wide :class:`VertexRestClient`, built from settings on first use."""
+    global _REST_CLIENT
+    if _REST_CLIENT is None:
+        with _REST_CLIENT_LOCK:
+            if _REST_CLIENT is None:
+                settings = get_settings()
+                _REST_CLIENT = VertexRestClient(
+                    timeout_seconds=settings.vertex_http_timeout_seconds,
+                    retries=settings.vertex_http_retries,
+                    pool_size=settings.vertex_http_pool_size,
+                )
+    return _REST_CLIENT
+
+
+def rest_client_stats() -> Dict[str, Dict[str, object]]:
+    return _REST_CLIENT.stats() if _REST_CLIENT is not None else {}
+
+
+__all__ = [
+    "IMAGE_MODEL",
+    "IMAGEN_FAST_MODEL",
+    "VIDEO_MODEL",
+    "ensure_init",
+    "generate_image",
+    "generate_video",
+    "get_image_model",
+    "get_model",
+    "get_rest_client",
+    "rest_client_stats",
+    "VertexGenerationResult",
+    "VertexRestClient",
+    "warm_up",
+]
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from ..config import get_settings
+from . import derivatives, generation, store
+from .job_events import JOB_EVENTS
+from .job_state import PROMOTING
+from .scheduler import SCHEDULER
+from .vertex import get_rest_client
+
+logger = logging.getLogger(__name__)
+
+FetchOperation = Callable[[str, str], Dict[str, Any]]
+# (post_id, storage_path) -> Post field updates for the finished video
+DeriveMedia = Callable[[str, str], Dict[str, Any]]
+
+
+def _derive_video(post_id: str, storage_path: str) -> Dict[str, Any]:
+    return derivatives.derive_stored_media(post_id=post_id, media_type="video", storage_path=storage_path)
+
+
+@dataclass
+class TrackedOperation:
+    job_id: str
+    name: str
+    model: str
+    submitted_at: float = field(default_factory=time.time)
+    next_poll_at: float = 0.0
+    polls: int = 0
+
+
+class VideoOperationPoller:
+    """Central tracker for in-flight Veo operations, polled off the request path.
+
+    ``/gen/video`` returns as soon as the operation is submitted; this poller
+    runs as a background asyncio task and promotes finished operations to
+    ready posts in the user's feed.
+
+    Each operation is first checked ``initial_delay_seconds`` after submission
+    (Veo rarely finishes sooner), then every ``base_interval_seconds`` growing
+    by ``backoff_factor`` up to ``max_interval_seconds``. Intervals are also
+    stretched so the whole tracker stays under ``max_polls_per_second``: poll
+    volume flattens out instead of growing with every job in flight. At most
+    ``max_concurrency`` fetches run at once. Finished videos get their poster
+    and preview (``derive``) before the post is published.
+    """
+
+    def __init__(self, fetch: Optional[FetchOperation] = None, *, derive: DeriveMedia = _derive_video,
+                 initial_delay_seconds: float = 20.0, base_interval_seconds: float = 5.0,
+                 backoff_factor: float = 1.5, max_interval_seconds: float = 20.0,
+                 max_polls_per_second: float = 4.0, max_concurrency: int = 8,
+                 tick_seconds: float = 1.0, timeout_seconds: float = 600.0,
+                 claim_lease_seconds: float = 180.0,
+                 clock: Callable[[], float] = time.time) -> None:
+        self.fetch = fetch
+        self.derive = derive
+        self.initial_delay_seconds = initial_delay_seconds
+        self.base_interval_seconds = base_interval_seconds
+        self.backoff_factor = backoff_factor
+        self.max_interval_seconds = max_interval_seconds
+        self.max_polls_per_second = max_polls_per_second
+        self.max_concurrency = max_concurrency
+        self.tick_seconds = tick_seconds
+        self.timeout_seconds = timeout_seconds
+        # Covers the download and ffmpeg derivative work done while claimed
+        self.claim_lease_seconds = claim_lease_seconds
+        self.clock = clock
+        self.polls = 0
+        self._ops: Dict[str, TrackedOperation] = {}
+        # track() is called from threadpool handlers as well as the loop
+        self._lock = threading.Lock()
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def _fetch(self, model_id: str, operation_name: str) -> Dict[str, Any]:
+        if self.fetch is None:
+            self.fetch = get_rest_client().fetch_predict_operation
+        return self.fetch(model_id, operation_name)
+
+    def track(self, job_id: str, operation_name: str, model_id: str,
+              submitted_at: Optional[float] = None) -> None:
+        submitted_at = self.clock() if submitted_at is None else submitted_at
+        op = TrackedOperation(
+            job_id, operation_name, model_id,
+            submitted_at=submitted_at,
+            next_poll_at=submitted_at + self.initial_delay_seconds,
+        )
+        with self._lock:
+            self._ops[job_id] = op
+
+    def pending(self) -> List[TrackedOperation]:
+        with self._lock:
+            return list(self._ops.values())
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"inFlight": len(self._ops), "polls": self.polls}
+
+    def _interval(self, op: TrackedOperation) -> float:
+        backoff = min(
+            self.max_interval_seconds,
+            self.base_interval_seconds * self.backoff_factor ** (op.polls - 1),
+        )
+        with self._lock:
+            in_flight = len(self._ops)
+        return max(backoff, in_flight / self.max_polls_per_second)
+
+    async def recover(self) -> int:
+        """Re-track every unfinished operation-backed job in the store (e.g. after a restart)."""
+        jobs = await store.get_async_store().list_operation_jobs()
+        for job in jobs:
+            operation = job["operation"]
+            self.track(job["jobId"], operation["name"], operation["model"], job.get("submitted_at"))
+        recovered = len(jobs)
+        if recovered:
+            logger.info("Recovered %d in-flight video operation(s)", recovered)
+        return recovered
+
+    async def poll_once(self) -> int:
+        """Check the operations that are due; returns how many were resolved."""
+        now = self.clock()
+        due = [op for op in self.pending() if op.next_poll_at <= now]
+        if not due:
+            return 0
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded(op: TrackedOperation) -> bool:
+            async with semaphore:
+                return await self._advance(op)
+
+        results = await asyncio.gather(*(bounded(op) for op in due), return_exceptions=True)
+        for op, result in zip(due, results):
+            if isinstance(result, Exception):
+                logger.warning("Polling video operation for job %s failed: %s", op.job_id, result)
+        return sum(1 for result in results if result is True)
+
+    async def _claim(self, op: TrackedOperation) -> Optional[Dict]:
+        """Claim the job before promoting or failing it, so one replica writes the outcome.
+
+        Every replica tracks every recovered operation; the store's compare-and-set
+        lets exactly one of them through. If another replica holds the claim the
+        operation stays tracked here, in case that replica dies before finishing.
+        """
+        db = store.get_async_store()
+        job = await db.claim_job(op.job_id, self.claim_lease_seconds)
+        if job is not None:
+            return job
+        current = await db.get_job(op.job_id)
+        if current is None or current.get("status") not in ("pending", PROMOTING):
+            self._forget(op)  # finished elsewhere (or gone)
+        return None
+
+    async def _advance(self, op: TrackedOperation) -> bool:
+        if self.clock() - op.submitted_at > self.timeout_seconds:
+            if await self._claim(op) is None:
+                return op.job_id not in self._ops
+            await self._finish(op, error=f"Video generation timed out after {self.timeout_seconds:.0f}s")
+            return True
+        op.polls += 1
+        with self._lock:
+            self.polls += 1
+        # Schedule the next check up front so a failed fetch also backs off
+        op.next_poll_at = self.clock() + self._interval(op)
+        status = await run_in_threadpool(self._fetch, op.model, op.name)
+        if not status.get("done"):
+            return False
+        job = await self._claim(op)
+        if job is None:
+            return op.job_id not in self._ops
+        db = store.get_async_store()
+        try:
+            post_payload = generation.video_post_from_operation(job["post"], status)
+        except RuntimeError as exc:
+            await self._finish(op, error=str(exc))
+            return True
+        try:
+            post_payload.update(await run_in_threadpool(self.derive, post_payload["id"], post_payload["storagePath"]))
+            saved_post = await db.save_post(post_payload)
+            await db.attach_to_feed(job.get("userId", "system"), saved_post, score=1.0, reason=job.get("reasons", ["generated"]))
+        except Exception:
+            # Hand the job back so the next poll (here or on another replica) retries
+            job["status"] = "pending"
+            await db.save_job(op.job_id, job)
+            raise
+        job.update(status="ready", postId=saved_post.id, updated_at=time.time())
+        await db.save_job(op.job_id, job)
+        self._forget(op)
+        JOB_EVENTS.publish(op.job_id, "ready", saved_post.id)
+        logger.info("Video job %s ready after %.0fs (%d polls)", op.job_id, self.clock() - op.submitted_at, op.polls)
+        return True
+
+    async def _finish(self, op: TrackedOperation, error: str) -> None:
+        logger.warning("Video job %s failed: %s", op.job_id, error)
+        db = store.get_async_store()
+        job = await db.get_job(op.job_id) or {"jobId": op.job_id}
+        job.update(status="failed", error=error, updated_at=time.time())
+        await db.save_job(op.job_id, job)
+        self._forget(op)
+        JOB_EVENTS.publish(op.job_id, "failed", error=error)
+
+    def _forget(self, op: TrackedOperation) -> None:
+        with self._lock:
+            self._ops.pop(op.job_id, None)
+        # Frees the Veo slot taken at submit time (no-op for recovered operations)
+        SCHEDULER.release_job(op.job_id)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.poll_once()
+            except Exception:  # pragma: no cover - keep the loop alive
+                logger.exception("Video poller iteration failed")
+            await asyncio.sleep(self.tick_seconds)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_settings = get_settings()
+VIDEO_POLLER = VideoOperationPoller(
+    initial_delay_seconds=_settings.video_poll_initial_delay_seconds,
+    max_interval_seconds=_settings.video_poll_max_interval_seconds,
+    max_polls_per_second=_settings.video_poll_max_rate,
+    max_concurrency=_settings.video_poll_concurrency,
+    timeout_seconds=_settings.video_operation_timeout_seconds,
+)
+
+
+__all__ = ["TrackedOperation", "VideoOperationPoller", "VIDEO_POLLER"]
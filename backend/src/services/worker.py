@@ -3,23 +3,72 @@ from __future__ import annotations
 import logging
 import time
 
+import requests
+
+try:  # pragma: no cover - optional dependency
+    from google.api_core import exceptions as api_exceptions  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    api_exceptions = None  # type: ignore
+
 from ..models.schemas import GenerateTask, Post, SafetyInfo
 from . import store
+from .derivatives import derive_media
+from .job_events import JOB_EVENTS
+from .scheduler import SCHEDULER
 from .storage import upload_media_bytes
-from .vertex import generate_image, generate_video
+from .vertex import IMAGE_MODEL, VIDEO_MODEL, generate_image, generate_video
 
 logger = logging.getLogger(__name__)
 
 
-def process_generate_task(task: GenerateTask) -> None:
+class TransientGenerationError(RuntimeError):
+    """A generation attempt failed for a reason worth retrying (throttling, outage, timeout)."""
+
+
+def is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, (TransientGenerationError, requests.ConnectionError, requests.Timeout, TimeoutError)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code in (429, 500, 502, 503, 504)
+    if api_exceptions is not None:
+        return isinstance(exc, (
+            api_exceptions.TooManyRequests,
+            api_exceptions.ServiceUnavailable,
+            api_exceptions.DeadlineExceeded,
+            api_exceptions.InternalServerError,
+        ))
+    return False
+
+
+def _already_generated(db, job) -> bool:
+    # A ready status alone isn't proof: only a post with stored media is
+    if not job or not job.get("postId"):
+        return False
+    post = db.get_post(job["postId"])
+    return post is not None and bool(post.storagePath)
+
+
+def process_generate_task(task: GenerateTask, *, retry_transient: bool = False) -> None:
+    """Generate, upload and publish the post for ``task``.
+
+    Pub/Sub delivers at least once, so a job whose media this worker already
+    wrote is skipped. With ``retry_transient`` a transient failure is raised (the caller nacks and
+    the message is redelivered) instead of failing the job.
+    """
     db = store.get_store()
+    if _already_generated(db, db.get_job(task.jobId)):
+        logger.info("Generation job %s already completed; skipping redelivery", task.jobId)
+        return
     logger.info("Processing generation job %s for user %s", task.jobId, task.uid)
 
     try:
+        # Fair, per-model admission: another user's burst doesn't run ahead of this task
         if task.mediaType == "image":
-            result = generate_image(prompt=task.prompt, aspect=task.aspect, seed=task.seed)
+            with SCHEDULER.slot(uid=task.uid, model=IMAGE_MODEL, priority=task.priority):
+                result = generate_image(prompt=task.prompt, aspect=task.aspect, seed=task.seed)
         else:
-            result = generate_video(prompt=task.prompt, aspect=task.aspect, seed=task.seed)
+            with SCHEDULER.slot(uid=task.uid, model=VIDEO_MODEL, priority=task.priority):
+                result = generate_video(prompt=task.prompt, aspect=task.aspect, seed=task.seed)
 
         upload = upload_media_bytes(
             post_id=task.jobId,
@@ -28,6 +77,7 @@ def process_generate_task(task: GenerateTask) -> None:
             content_type=result.mime_type,
             extension=result.extension,
         )
+        derived = derive_media(post_id=task.jobId, media_type=task.mediaType, data=result.bytes_payload)
 
         post_payload = Post(
             id=task.jobId,
@@ -41,6 +91,7 @@ def process_generate_task(task: GenerateTask) -> None:
             seed=task.seed,
             safety=SafetyInfo(blocked=False, scores=result.safety),
             authorUid=task.uid,
+            **derived,
         )
         saved = db.save_post(post_payload)
         db.attach_to_feed(task.uid, saved, score=1.0, reason=["generated"])
@@ -54,8 +105,12 @@ def process_generate_task(task: GenerateTask) -> None:
                 "updated_at": time.time(),
             },
         )
+        JOB_EVENTS.publish(task.jobId, "ready", saved.id)
         logger.info("Completed generation job %s", task.jobId)
     except Exception as exc:  # pragma: no cover - production path
+        if retry_transient and is_transient(exc):
+            logger.warning("Generation job %s hit a transient error, will retry: %s", task.jobId, exc)
+            raise
         logger.exception("Generation job %s failed: %s", task.jobId, exc)
         db.save_job(
             task.jobId,
@@ -67,6 +122,7 @@ def process_generate_task(task: GenerateTask) -> None:
                 "error": str(exc),
             },
         )
+        JOB_EVENTS.publish(task.jobId, "failed", error=str(exc))
 
 
-__all__ = ["process_generate_task"]
+__all__ = ["TransientGenerationError", "is_transient", "process_generate_task"]
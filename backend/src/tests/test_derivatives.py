@@ -0,0 +1,98 @@
+import io
+import shutil
+import subprocess
+
+import pytest
+from PIL import Image
+
+from src.services import derivatives, storage
+from src.services.storage import UploadResult
+
+
+def _png(size=(1000, 500)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (20, 120, 200)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+    uploaded = {}
+
+    def upload_object(object_name, data, content_type):
+        uploaded[object_name] = (data, content_type)
+        return UploadResult(storage_path=object_name, public_url=f"https://cdn.test/{object_name}")
+
+    monkeypatch.setattr(storage, "upload_object", upload_object)
+    return uploaded
+
+
+def test_thumbnails_are_webp_at_each_width_without_upscaling():
+    renditions = derivatives.webp_thumbnails(_png(), [320, 160, 640, 2000])
+
+    assert [(width, height) for width, height, _ in renditions] == [(160, 80), (320, 160), (640, 320), (1000, 500)]
+    for width, height, data in renditions:
+        decoded = Image.open(io.BytesIO(data))
+        assert decoded.format == "WEBP" and decoded.size == (width, height)
+
+
+def test_image_derivatives_are_uploaded_next_to_the_media(uploads):
+    derived = derivatives.derive_media(post_id="p1", media_type="image", data=_png())
+
+    assert [t["width"] for t in derived["thumbnails"]] == [160, 320, 640]
+    assert derived["thumbnails"][0] == {
+        "storagePath": "media/images/p1_w160.webp",
+        "publicUrl": "https://cdn.test/media/images/p1_w160.webp",
+        "width": 160,
+    }
+    assert uploads["media/images/p1_w640.webp"][1] == "image/webp"
+
+
+def test_video_poster_and_preview_with_a_fake_ffmpeg(uploads):
+    commands = []
+
+    def fake_ffmpeg(args):
+        commands.append(args)
+        output = args[-1]
+        if output.endswith(".jpg"):
+            Image.new("RGB", (720, 1280)).save(output, format="JPEG")
+        else:
+            with open(output, "wb") as handle:
+                handle.write(b"preview")
+
+    derived = derivatives.derive_media(post_id="v1", media_type="video", data=b"mp4", runner=fake_ffmpeg)
+
+    assert derived["poster"] == {
+        "storagePath": "media/videos/v1_poster.jpg",
+        "publicUrl": "https://cdn.test/media/videos/v1_poster.jpg",
+        "width": 720,
+    }
+    assert derived["preview"]["storagePath"] == "media/videos/v1_preview.mp4"
+    assert uploads["media/videos/v1_preview.mp4"] == (b"preview", "video/mp4")
+    poster_cmd, preview_cmd = commands
+    assert "thumbnail" in poster_cmd and "-frames:v" in poster_cmd
+    assert "scale=-2:360" in preview_cmd and "400k" in preview_cmd and "-an" in preview_cmd
+
+
+def test_derivative_failures_never_fail_the_post(uploads):
+    def broken_ffmpeg(args):
+        raise subprocess.CalledProcessError(1, args)
+
+    assert derivatives.derive_media(post_id="v1", media_type="video", data=b"mp4", runner=broken_ffmpeg) == {}
+    assert derivatives.derive_media(post_id="p1", media_type="image", data=b"not an image") == {}
+    assert uploads == {}
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_video_stills_with_real_ffmpeg(tmp_path):
+    source = tmp_path / "source.mp4"
+    subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-f", "lavfi", "-i", "testsrc=size=1280x720:rate=24:duration=2",
+         "-pix_fmt", "yuv420p", str(source)],
+        check=True,
+    )
+
+    poster, preview = derivatives.video_stills(str(source), str(tmp_path), ffmpeg="ffmpeg", preview_height=360, bitrate_kbps=200)
+
+    assert Image.open(poster).size == (1280, 720)
+    assert preview.endswith(".mp4") and (tmp_path / "preview.mp4").stat().st_size > 0
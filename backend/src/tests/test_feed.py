@@ -1,7 +1,10 @@
+import asyncio
+
 from fastapi.testclient import TestClient
 
 from src.main import app
 from src.services import store
+from src.services.feed import PublicFeedCache
 from src.services.mocks import generate_mock_post
 
 
@@ -44,3 +47,387 @@ def test_job_status_flips_to_ready():
         payload = status.json()
         assert payload["status"] == "ready"
         assert payload["postId"] is not None
+
+
+def test_feed_cursor_pages_do_not_overlap():
+    db = store.get_store()
+    for i in range(5):
+        post = generate_mock_post(f"topic {i}", "image")
+        saved = db.save_post(post)
+        db.attach_to_feed("tester", saved, score=1.0, reason=["composer"])
+
+    seen = []
+    cursor = None
+    while True:
+        items, has_more, cursor = db.get_feed_ready("tester", 2, feed_type="private", cursor=cursor)
+        seen.extend(item.post.id for item in items)
+        if not has_more:
+            assert cursor is None
+            break
+        assert cursor is not None
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+
+
+def test_your_feed_pages_fill_up_past_pending_posts():
+    db = store.get_store()
+    ready_ids = []
+    for i in range(9):
+        post = generate_mock_post(f"topic {i}", "image")
+        # Newest first: the first page's worth of keys is all pending
+        post["status"] = "ready" if i < 4 else "pending"
+        saved = db.save_post(post)
+        db.attach_to_feed("tester", saved, score=1.0, reason=["composer"])
+        if i < 4:
+            ready_ids.append(saved.id)
+
+    first, has_more, cursor = db.get_feed_ready("tester", 3, feed_type="private")
+    assert [item.post.id for item in first] == ready_ids[::-1][:3]
+    assert has_more and cursor is not None
+    rest, has_more, cursor = db.get_feed_ready("tester", 3, feed_type="private", cursor=cursor)
+    assert [item.post.id for item in rest] == ready_ids[:1]
+    assert not has_more and cursor is None
+
+
+def test_feed_rejects_invalid_cursor():
+    with TestClient(app) as client:
+        response = client.post("/feed", json={"uid": "tester", "cursor": "not-a-cursor"})
+        assert response.status_code == 400
+
+
+def test_random_feed_is_stable_per_seed_without_duplicates():
+    db = store.get_store()
+    for i in range(7):
+        post = generate_mock_post(f"random {i}", "image")
+        saved = db.save_post(post)
+        db.attach_to_feed("tester", saved, score=1.0, reason=["composer"])
+
+    def walk(seed):
+        seen, cursor = [], None
+        while True:
+            items, has_more, cursor = db.get_feed_ready(
+                "tester", 3, feed_type="random", cursor=cursor, seed=seed
+            )
+            seen.extend(item.post.id for item in items)
+            if not has_more:
+                return seen
+
+    first = walk(42)
+    assert len(first) == 7
+    assert len(set(first)) == 7
+    assert walk(42) == first
+
+
+def test_public_feed_cache_hits_and_invalidates_on_new_post():
+    with TestClient(app) as client:
+        db = store.get_store()
+        saved = db.save_post(generate_mock_post("cached", "image"))
+        db.attach_to_feed("tester", saved, score=1.0, reason=["composer"])
+
+        before = client.get("/health").json()["feed_cache"]
+        first = client.post("/feed", json={"uid": "tester", "feedType": "hot"}).json()
+        second = client.post("/feed", json={"uid": "tester", "feedType": "hot"}).json()
+        after = client.get("/health").json()["feed_cache"]
+        assert first == second
+        assert after["misses"] == before["misses"] + 1
+        assert after["hits"] == before["hits"] + 1
+
+        fresh = db.save_post(generate_mock_post("fresh", "image"))
+        db.attach_to_feed("tester", fresh, score=1.0, reason=["composer"])
+        third = client.post("/feed", json={"uid": "tester", "feedType": "hot"}).json()
+        assert fresh.id in [item["post"]["id"] for item in third["items"]]
+
+
+def test_public_feed_cache_drops_a_post_made_private():
+    with TestClient(app) as client:
+        db = store.get_store()
+        post = generate_mock_post("withdrawn", "image")
+        saved = db.save_post(post)
+        first = client.post("/feed", json={"uid": "tester", "feedType": "hot"}).json()
+        assert saved.id in [item["post"]["id"] for item in first["items"]]
+
+        post["isPrivate"] = True
+        db.save_post(post)
+        second = client.post("/feed", json={"uid": "tester", "feedType": "hot"}).json()
+        assert saved.id not in [item["post"]["id"] for item in second["items"]]
+
+
+def test_feed_index_tracks_posts_that_become_ready():
+    db = store.get_store()
+    post = generate_mock_post("later", "image")
+    post["status"] = "pending"
+    pending = db.save_post(post)
+    db.attach_to_feed("tester", pending, score=1.0, reason=["composer"])
+    assert db.get_feed_ready("tester", 10, feed_type="private")[0] == []
+
+    post["status"] = "ready"
+    db.save_post(post)
+    items, has_more, _ = db.get_feed_ready("tester", 10, feed_type="private")
+    assert [item.post.id for item in items] == [pending.id]
+    assert not has_more
+
+
+def test_public_feeds_are_shared_without_attach():
+    db = store.get_store()
+    public = db.save_post(generate_mock_post("shared", "image"))
+    private_post = generate_mock_post("mine", "image")
+    private_post["isPrivate"] = True
+    db.save_post(private_post)
+
+    for feed_type in ("hot", "interests", "random"):
+        items, _, _ = db.get_feed_ready("someone-else", 10, feed_type=feed_type)
+        assert [item.post.id for item in items] == [public.id]
+
+
+def test_compact_post_records_round_trip():
+    db = store.get_store()
+    saved = db.save_post(generate_mock_post("compact", "video"))
+    assert db.get_post(saved.id) == saved
+
+
+def test_async_store_tracks_the_active_store():
+    async_db = store.get_async_store()
+    saved = asyncio.run(async_db.save_post(generate_mock_post("async", "image")))
+    assert store.get_store().get_post(saved.id) is not None
+    assert asyncio.run(async_db.get_post(saved.id)).id == saved.id
+
+    store.reset_store()
+    assert store.get_async_store() is not async_db
+
+
+def test_async_public_cache_single_flights_concurrent_misses():
+    cache = PublicFeedCache(ttl_seconds=60, max_entries=4)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return [], False, None
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load_async("k", load) for _ in range(5)))
+
+    pages = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(page == ([], False, None) for page in pages)
+    assert cache.stats()["misses"] == 1
+
+
+def test_async_public_cache_waiter_takes_over_a_cancelled_load():
+    cache = PublicFeedCache(ttl_seconds=60, max_entries=4)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return [], False, len(calls)
+
+    async def run():
+        leader = asyncio.create_task(cache.get_or_load_async("k", load))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load_async("k", load))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return leader, await waiter
+
+    leader, page = asyncio.run(run())
+    assert leader.cancelled()
+    assert page == ([], False, 2)  # the waiter ran its own load instead of being cancelled
+
+
+def test_concurrent_status_polls_promote_once(monkeypatch):
+    from src.services.jobs import JobPromoter
+
+    db = store.get_store()
+    post = generate_mock_post("race", "image")
+    db.save_job("job-1", {"jobId": "job-1", "userId": "tester", "status": "pending", "post": post, "ready_at": 0})
+    attaches = []
+    original_attach = db.attach_to_feed
+    monkeypatch.setattr(db, "attach_to_feed", lambda *args, **kwargs: attaches.append(args) or original_attach(*args, **kwargs))
+
+    promoter = JobPromoter()
+
+    class SlowWrites(store.AsyncInMemoryStore):
+        async def save_post(self, payload):
+            await asyncio.sleep(0.01)  # yield like a real Firestore write
+            return self.inner.save_post(payload)
+
+    async def poll_many():
+        async_db = SlowWrites(db)
+        return await asyncio.gather(*(promoter.promote(async_db, "job-1") for _ in range(5)))
+
+    jobs = asyncio.run(poll_many())
+    assert len(attaches) == 1
+    assert all(job["status"] == "ready" and job["postId"] == post["id"] for job in jobs)
+    assert promoter.stats()["coalesced"] == 4
+    assert promoter.stats()["promotions"] == 1
+    # Another instance arriving later loses the claim and just reads the result
+    assert db.claim_job("job-1", lease_seconds=30) is None
+
+
+def test_job_events_stream_pushes_promotion_and_ends():
+    import json
+    import time
+
+    with TestClient(app) as client:
+        created = client.post(
+            "/gen/image",
+            json={"uid": "tester", "prompt": "harbour at dusk", "type": "image"},
+        )
+        job_id = created.json()["jobId"]
+        db = store.get_store()
+        job = db.get_job(job_id)
+        job["ready_at"] = time.time() + 0.2
+        db.save_job(job_id, job)
+
+        with client.stream("GET", "/gen/events", params={"jobIds": [job_id, "nope"]}) as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            body = "".join(response.iter_text())
+
+    events = [
+        (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+        for block in body.strip().split("\n\n")
+        if block.startswith("event:")
+    ]
+    assert events[0] == ("job", {"jobId": job_id, "status": "pending", "postId": None})
+    assert events[1] == ("job", {"jobId": "nope", "status": "missing", "postId": None})
+    name, ready = events[2]
+    assert name == "job" and ready["status"] == "ready" and ready["postId"] == db.get_job(job_id)["postId"]
+    assert events[-1] == ("end", {"pending": []})
+
+
+def test_job_events_stream_picks_up_completions_from_other_processes():
+    import json
+
+    from src.services.jobs import job_event_stream
+
+    db = store.get_store()
+    # A Pub/Sub-queued job: finished by the worker process, which this hub never hears from
+    db.save_job("job-1", {"jobId": "job-1", "userId": "tester", "status": "pending", "queued": True, "post": {}})
+
+    async def collect():
+        async def finish_elsewhere():
+            await asyncio.sleep(0.1)
+            db.save_job("job-1", {"jobId": "job-1", "status": "ready", "postId": "post-1"})
+
+        finisher = asyncio.create_task(finish_elsewhere())
+        chunks = [chunk async for chunk in job_event_stream(
+            store.get_async_store(), ["job-1"], timeout_seconds=5, heartbeat_seconds=0.05)]
+        await finisher
+        return chunks
+
+    chunks = asyncio.run(collect())
+    events = [json.loads(chunk.split("\n")[1][len("data: "):]) for chunk in chunks if chunk.startswith("event:")]
+    assert events[0]["status"] == "pending"
+    assert events[1] == {"jobId": "job-1", "status": "ready", "postId": "post-1", "error": None}
+    assert events[-1] == {"pending": []}
+    assert ": keep-alive\n\n" in chunks  # heartbeats while nothing changed
+
+
+def test_job_event_hub_delivers_across_threads():
+    import threading
+
+    from src.services.job_events import JobEventHub
+
+    hub = JobEventHub()
+
+    async def listen():
+        subscription = hub.subscribe(["job-1"])
+        worker = threading.Thread(target=lambda: (hub.publish("job-2", "ready", "p2"),
+                                                  hub.publish("job-1", "failed", error="boom")))
+        worker.start()
+        event = await asyncio.wait_for(subscription.queue.get(), timeout=1)
+        worker.join()
+        hub.unsubscribe(subscription)
+        return event
+
+    assert asyncio.run(listen()) == {"jobId": "job-1", "status": "failed", "postId": None, "error": "boom"}
+    assert hub.stats() == {"subscribers": 0, "published": 2}
+
+
+def test_bulk_job_status_reads_once_and_promotes_due_jobs(monkeypatch):
+    with TestClient(app) as client:
+        job_ids = [
+            client.post("/gen/image", json={"uid": "tester", "prompt": f"lighthouse {i}", "type": "image"}).json()["jobId"]
+            for i in range(3)
+        ]
+        db = store.get_store()
+        for job_id in job_ids[:2]:
+            db.get_job(job_id)["ready_at"] = 0
+        db.get_job(job_ids[2])["ready_at"] = 10**12
+
+        reads = []
+        original_get_jobs = db.get_jobs
+        monkeypatch.setattr(db, "get_jobs", lambda ids: reads.append(ids) or original_get_jobs(ids))
+        monkeypatch.setattr(db, "get_job", lambda job_id: (_ for _ in ()).throw(AssertionError("per-job read")))
+
+        response = client.post("/gen/status", json={"jobIds": job_ids + ["nope", job_ids[0]]})
+
+    assert response.status_code == 200
+    payload = response.json()
+    assert len(reads) == 1
+    assert payload["missing"] == ["nope"]
+    assert [payload["jobs"][job_id]["status"] for job_id in job_ids] == ["ready", "ready", "pending"]
+    assert payload["jobs"][job_ids[0]]["postId"] is not None
+
+
+def test_more_like_this_fans_out_and_writes_jobs_once(monkeypatch):
+    import time
+
+    from src.services import generation
+
+    def slow_enqueue(uid, prompt, media_type, **kwargs):
+        time.sleep(0.2)  # a blocking Vertex/Pub/Sub round trip
+        post = generate_mock_post(prompt, media_type)
+        return post["id"], post, 1000
+
+    monkeypatch.setattr(generation, "enqueue_generation", slow_enqueue)
+    with TestClient(app) as client:
+        db = store.get_store()
+        base = generate_mock_post("mountain lake", "image")
+        base["status"] = "ready"
+        db.save_post(base)
+        batches = []
+        original_save_jobs = db.save_jobs
+        monkeypatch.setattr(db, "save_jobs", lambda jobs: batches.append(list(jobs)) or original_save_jobs(jobs))
+
+        started = time.perf_counter()
+        response = client.post("/more-like-this", json={"uid": "tester", "postId": base["id"], "count": 5})
+        elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    job_ids = response.json()["jobs"]
+    assert len(job_ids) == 5 and batches == [job_ids]
+    assert elapsed < 0.6  # sequential would take >= 1s
+    assert all(db.get_job(job_id)["reasons"] == ["variation"] for job_id in job_ids)
+
+
+def test_more_like_this_keeps_submitted_variations_when_one_fails(monkeypatch):
+    from src import main
+    from src.services import generation
+
+    calls = []
+
+    def flaky_enqueue(uid, prompt, media_type, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("Vertex rejected the request")
+        post = generate_mock_post(prompt, media_type)
+        post["operation"] = {"name": f"ops/{post['id']}", "model": "veo"}
+        return post["id"], post, 60_000
+
+    tracked = []
+    monkeypatch.setattr(generation, "enqueue_generation", flaky_enqueue)
+    monkeypatch.setattr(main.VIDEO_POLLER, "track", lambda job_id, *args: tracked.append(job_id))
+    db = store.get_store()
+    base = generate_mock_post("drone over dunes", "video")
+    base["status"] = "ready"
+    db.save_post(base)
+    with TestClient(app) as client:
+        response = client.post("/more-like-this", json={"uid": "tester", "postId": base["id"], "count": 3})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["jobs"]) == 2 and body["errors"] == ["Vertex rejected the request"]
+    assert sorted(tracked) == sorted(body["jobs"])  # their Veo slots get released by the poller
+    assert all(db.get_job(job_id)["operation"]["model"] == "veo" for job_id in body["jobs"])
@@ -0,0 +1,103 @@
+import dataclasses
+import threading
+import time
+
+from src.services import generation, store
+from src.services.generation_cache import GenerationCache, cache_key, post_for_request
+from src.services.mocks import generate_mock_post
+
+
+def setup_function() -> None:
+    store.reset_store()
+
+
+def _fake_generate(calls, delay=0.0):
+    def generate():
+        calls.append(1)
+        time.sleep(delay)
+        post = generate_mock_post("neon city", "image")
+        post.update(status="ready", authorUid="alice", isPrivate=False)
+        return post["id"], post, 0
+
+    return generate
+
+
+def test_cache_key_normalizes_prompt_whitespace_and_case():
+    assert cache_key("Neon  City ", "image", "9:16", 7) == cache_key("neon city", "image", "9:16", 7)
+    assert cache_key("neon city", "image", "9:16", 7) != cache_key("neon city", "image", "9:16", 8)
+    assert cache_key("neon city", "image", "9:16", 7) != cache_key("neon city", "image", "9:16", 7, ["gs://b/me.jpg"])
+
+
+def test_a_users_repeat_is_reused_within_the_window_from_memory_and_store():
+    calls = []
+    now = [1000.0]
+    cache = GenerationCache(max_entries=4, reuse_ttl_seconds=60, clock=lambda: now[0])
+    key = cache_key("neon city", "image", "9:16", None)
+    first = cache.get_or_generate(key, _fake_generate(calls), uid="alice")
+    assert cache.get_or_generate(key, _fake_generate(calls), uid="alice") == first
+
+    # A retry landing on a fresh process (empty LRU) still finds it in the store
+    restarted = GenerationCache(max_entries=4, reuse_ttl_seconds=60, clock=lambda: now[0])
+    assert restarted.get_or_generate(key, _fake_generate(calls), uid="alice")["id"] == first["id"]
+    assert len(calls) == 1
+
+    # Someone else's identical prompt, or alice after the window, is a new image
+    cache.get_or_generate(key, _fake_generate(calls), uid="bob")
+    now[0] += 61
+    cache.get_or_generate(key, _fake_generate(calls), uid="alice")
+    assert len(calls) == 3
+
+
+def test_concurrent_duplicates_share_one_generation():
+    calls = []
+    cache = GenerationCache()
+    key = cache_key("neon city", "image", "9:16", None)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_generate(key, _fake_generate(calls, 0.05))))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len({post["id"] for post in results}) == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_other_users_get_their_own_post_for_shared_media():
+    post = generate_mock_post("neon city", "image")
+    post.update(status="ready", authorUid="alice", isPrivate=False, thumbnails=[
+        {"storagePath": "media/images/p_w160.webp", "publicUrl": None, "width": 160},
+    ])
+
+    same_id, same, _ = post_for_request(post, uid="alice", prompt="neon city", title="Neon", is_private=False)
+    assert same_id == post["id"]
+
+    other_id, other, _ = post_for_request(post, uid="bob", prompt="Neon city", title="Neon", is_private=True)
+    assert other_id != post["id"]
+    assert other["storagePath"] == post["storagePath"]
+    assert other["thumbnails"] == post["thumbnails"]  # grids keep using the small renditions
+    assert other["authorUid"] == "bob" and other["isPrivate"] is True
+
+
+def test_image_requests_reuse_only_the_same_users_recent_result(monkeypatch):
+    settings = dataclasses.replace(generation.get_settings(), enable_mocks=False, pubsub_topic_generate=None)
+    monkeypatch.setattr(generation, "get_settings", lambda: settings)
+    monkeypatch.setattr(generation, "aiplatform", object())
+    monkeypatch.setattr(generation, "enhance_prompt_for_social", lambda prompt, media_type: prompt)
+    calls = []
+
+    def fake_vertex_image(uid, enhanced_prompt, prompt, title, aspect, seed, *args):
+        calls.append(uid)
+        return _fake_generate([])()
+
+    monkeypatch.setattr(generation, "_vertex_image", fake_vertex_image)
+    monkeypatch.setattr(generation, "GENERATION_CACHE", GenerationCache())
+    first, _, _ = generation.enqueue_generation("alice", "neon city", "image", aspect="1:1")
+    double_tap, _, _ = generation.enqueue_generation("alice", "neon city", "image", aspect="1:1")
+    generation.enqueue_generation("bob", "neon city", "image", aspect="1:1")
+
+    assert double_tap == first
+    assert calls == ["alice", "bob"]
@@ -0,0 +1,55 @@
+import io
+
+from PIL import Image
+
+from src.services.image_processing import normalize_image
+
+
+def _photo(size=(4000, 3000), orientation=6, fmt="JPEG", mode="RGB") -> bytes:
+    image = Image.new(mode, size, (200, 30, 30, 128) if mode == "RGBA" else (200, 30, 30))
+    image.paste((30, 30, 200) if mode == "RGB" else (30, 30, 200, 255), (0, 0, size[0] // 2, size[1] // 2))
+    buffer = io.BytesIO()
+    if fmt == "JPEG":
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        exif[0x010F] = "PhoneMaker"  # camera make: must not survive
+        image.save(buffer, format="JPEG", quality=95, exif=exif)
+    else:
+        image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_normalize_rotates_downscales_and_strips_metadata():
+    original = _photo()
+    result = normalize_image(original, max_side=1536)
+
+    decoded = Image.open(io.BytesIO(result.data))
+    assert (result.width, result.height) == decoded.size == (1152, 1536)  # portrait after rotation
+    assert decoded.format == "JPEG" and result.content_type == "image/jpeg"
+    assert not decoded.getexif()
+    assert len(result.data) < len(original) / 4
+
+
+def test_normalized_jpeg_passes_through_unchanged():
+    once = normalize_image(_photo(), max_side=1536)
+    twice = normalize_image(once.data, max_side=1536)
+    assert twice.data == once.data
+
+
+def test_jpeg_with_other_metadata_is_re_encoded():
+    small = Image.new("RGB", (64, 48), (200, 30, 30))
+    for metadata in ({"comment": b"shot on PhoneMaker"}, {"icc_profile": b"\0" * 128}, {"xmp": b"<x:xmpmeta/>"}):
+        buffer = io.BytesIO()
+        small.save(buffer, format="JPEG", **metadata)
+        result = normalize_image(buffer.getvalue())
+        assert result.data != buffer.getvalue()
+        decoded = Image.open(io.BytesIO(result.data))
+        assert not any(decoded.info.get(key) for key in ("comment", "icc_profile", "xmp"))
+
+
+def test_png_with_alpha_becomes_jpeg_or_webp():
+    png = _photo(size=(800, 600), fmt="PNG", mode="RGBA")
+    jpeg = normalize_image(png)
+    assert Image.open(io.BytesIO(jpeg.data)).mode == "RGB"
+    webp = normalize_image(png, output_format="WEBP")
+    assert webp.extension == "webp" and Image.open(io.BytesIO(webp.data)).format == "WEBP"
@@ -0,0 +1,186 @@
+import asyncio
+import dataclasses
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from src.main import app
+from src.services import profile, store
+from src.services.profile import CAPTURE_CHUNK_SIZE, CaptureImageTooLarge, InvalidCaptureImage, ProfileService
+
+
+def _image(fmt="JPEG", size=(3000, 2000)) -> bytes:
+    buffer = io.BytesIO()
+    Image.effect_noise(size, 40).convert("RGB").save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+class FakeBlob:
+    def __init__(self, bucket, path) -> None:
+        self.bucket, self.path = bucket, path
+
+    def upload_from_string(self, data, content_type=None, timeout=None):
+        with self.bucket.lock:
+            self.bucket.active += 1
+            self.bucket.peak = max(self.bucket.peak, self.bucket.active)
+            self.bucket.threads.add(threading.get_ident())
+        time.sleep(0.2)  # a blocking GCS round trip
+        with self.bucket.lock:
+            self.bucket.active -= 1
+            self.bucket.objects[self.path] = (data, content_type)
+
+
+class FakeBucket:
+    def __init__(self) -> None:
+        self.objects = {}
+        self.threads = set()
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def blob(self, path):
+        return FakeBlob(self, path)
+
+
+def _service() -> ProfileService:
+    service = ProfileService.__new__(ProfileService)  # skip the real GCS client
+    service.bucket = FakeBucket()
+    return service
+
+
+def setup_function() -> None:
+    store.reset_store()
+
+
+def test_captures_are_normalized_and_uploaded_concurrently_off_the_loop():
+    service = _service()
+    photo = _image()
+
+    async def capture():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        result = await service.upload_capture_streams("tester", {
+            "front": io.BytesIO(photo),
+            "left": io.BytesIO(photo),
+            "right": io.BytesIO(_image("PNG", (1200, 900))),
+        })
+        tick_task.cancel()
+        return result, ticks
+
+    capture_images, ticks = asyncio.run(capture())
+
+    assert service.bucket.peak >= 2  # uploads overlapped
+    assert ticks >= 10  # the loop kept running throughout
+    assert threading.get_ident() not in service.bucket.threads
+    data, content_type = service.bucket.objects["profiles/tester/capture_front.jpg"]
+    assert content_type == "image/jpeg" and max(Image.open(io.BytesIO(data)).size) == 1536
+    assert len(data) < len(photo)
+    assert capture_images.right == "profiles/tester/capture_right.jpg"  # PNG re-encoded
+    saved = store.get_store().get_user("tester")["profileImages"]["captureImages"]
+    assert saved["left"] == "profiles/tester/capture_left.jpg"
+
+
+def test_capture_rejects_non_images_and_oversized_files(monkeypatch):
+    service = _service()
+    with pytest.raises(InvalidCaptureImage):
+        service._spool_capture("front", io.BytesIO(b"GIF89a..."))
+
+    monkeypatch.setattr(profile, "settings", dataclasses.replace(profile.settings, profile_capture_max_bytes=2 * CAPTURE_CHUNK_SIZE))
+    with pytest.raises(CaptureImageTooLarge):
+        service._spool_capture("front", io.BytesIO(b"\xff\xd8\xff" + b"x" * 3 * CAPTURE_CHUNK_SIZE))
+
+
+def test_capture_endpoint_maps_bad_uploads_to_client_errors(monkeypatch):
+    service = _service()
+    monkeypatch.setattr(profile, "_profile_service", service)
+    photo = _image(size=(640, 480))
+    with TestClient(app) as client:
+        ok = client.post("/profile/capture-images", data={"uid": "tester"}, files={
+            "front": ("front.jpg", photo), "left": ("left.jpg", photo), "right": ("right.jpg", photo),
+        })
+        not_image = client.post("/profile/capture-images", data={"uid": "tester"}, files={
+            "front": ("front.txt", b"hello"), "left": ("left.jpg", photo), "right": ("right.jpg", photo),
+        })
+        corrupt = client.post("/profile/capture-images", data={"uid": "tester"}, files={
+            "front": ("front.jpg", b"\xff\xd8\xff" + b"\x00" * 64), "left": ("left.jpg", photo), "right": ("right.jpg", photo),
+        })
+    assert ok.status_code == 200
+    assert ok.json()["profileImages"]["captureImages"]["front"] == "profiles/tester/capture_front.jpg"
+    assert not_image.status_code == 400
+    assert corrupt.status_code == 400
+
+
+def test_generate_base_returns_a_job_that_becomes_ready(monkeypatch):
+    service = _service()
+    monkeypatch.setattr(profile, "_profile_service", service)
+    release = threading.Event()
+
+    def slow_generation(uid):
+        release.wait(5)
+        return f"profiles/{uid}/base_image.jpg"
+
+    monkeypatch.setattr(service, "generate_base_image_sync", slow_generation)
+    store.get_store().update_user_profile_images("tester", capture_images=profile.ProfileCaptureImages(
+        front="profiles/tester/capture_front.jpg",
+        left="profiles/tester/capture_left.jpg",
+        right="profiles/tester/capture_right.jpg",
+    ))
+    with TestClient(app) as client:
+        missing = client.post("/profile/generate-base", json={"uid": "nobody"})
+        queued = client.post("/profile/generate-base", json={"uid": "tester"})
+        job_id = queued.json()["jobId"]
+        pending = client.get("/gen/status", params={"jobId": job_id}).json()
+        release.set()
+        deadline = time.time() + 5
+        while client.get("/gen/status", params={"jobId": job_id}).json()["status"] == "pending":
+            assert time.time() < deadline
+            time.sleep(0.02)
+    assert missing.status_code == 400
+    assert queued.status_code == 200 and job_id
+    assert pending == {"status": "pending", "postId": None}
+    job = store.get_store().get_job(job_id)
+    assert job["status"] == "ready" and job["baseImage"] == "profiles/tester/base_image.jpg"
+
+
+def test_shutdown_fails_base_image_jobs_that_never_started(monkeypatch):
+    service = _service()
+    monkeypatch.setattr(profile, "_profile_service", service)
+    monkeypatch.setattr(profile, "_BASE_IMAGE_EXECUTOR", ThreadPoolExecutor(max_workers=1))
+    started, release = threading.Event(), threading.Event()
+
+    def slow_generation(uid):
+        started.set()
+        release.wait(5)
+        return f"profiles/{uid}/base_image.jpg"
+
+    monkeypatch.setattr(service, "generate_base_image_sync", slow_generation)
+    store.get_store().update_user_profile_images("tester", capture_images=profile.ProfileCaptureImages(
+        front="profiles/tester/capture_front.jpg",
+        left="profiles/tester/capture_left.jpg",
+        right="profiles/tester/capture_right.jpg",
+    ))
+    running = asyncio.run(service.enqueue_base_image("tester"))
+    assert started.wait(5)
+    waiting = asyncio.run(service.enqueue_base_image("tester"))
+    profile.shutdown_base_image_jobs()
+    release.set()
+
+    job = store.get_store().get_job(waiting)
+    assert job["status"] == "failed" and "shut down" in job["error"]
+    deadline = time.time() + 5
+    while store.get_store().get_job(running)["status"] == "pending":
+        assert time.time() < deadline
+        time.sleep(0.02)
+    assert store.get_store().get_job(running)["status"] == "ready"
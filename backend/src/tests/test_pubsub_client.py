@@ -0,0 +1,52 @@
+from concurrent.futures import Future
+
+from src.services import store
+from src.services.pubsub_client import GeneratePublisher, mark_job_failed
+
+
+class FakePublisherClient:
+    """Stands in for ``pubsub_v1.PublisherClient``: futures resolve when the test says so."""
+
+    def __init__(self) -> None:
+        self.futures = []
+
+    def publish(self, topic, data):
+        future = Future()
+        self.futures.append((topic, data, future))
+        return future
+
+
+def setup_function() -> None:
+    store.reset_store()
+
+
+def test_publish_returns_before_ack_and_tracks_in_flight():
+    client = FakePublisherClient()
+    publisher = GeneratePublisher(client=client, topic_path="projects/p/topics/gen", on_failure=None)
+
+    future = publisher.publish({"jobId": "job-1", "prompt": "sunrise"})
+    assert not future.done()
+    assert publisher.stats()["inFlight"] == 1
+    assert publisher.stats()["inFlightBytes"] == len(client.futures[0][1])
+
+    future.set_result("msg-1")
+    assert publisher.stats() == {"inFlight": 0, "inFlightBytes": 0, "published": 1, "retried": 0, "failed": 0}
+
+
+def test_failed_publish_is_retried_then_marks_job_failed():
+    db = store.get_store()
+    db.save_job("job-1", {"jobId": "job-1", "userId": "tester", "status": "pending"})
+    client = FakePublisherClient()
+    publisher = GeneratePublisher(client=client, topic_path="projects/p/topics/gen",
+                                  on_failure=mark_job_failed, max_attempts=2)
+
+    publisher.publish({"jobId": "job-1", "prompt": "sunrise"})
+    client.futures[0][2].set_exception(RuntimeError("unavailable"))
+    assert len(client.futures) == 2  # republished the same bytes
+    assert client.futures[1][1] == client.futures[0][1]
+    assert db.get_job("job-1")["status"] == "pending"
+
+    client.futures[1][2].set_exception(RuntimeError("unavailable"))
+    job = db.get_job("job-1")
+    assert job["status"] == "failed" and "unavailable" in job["error"]
+    assert publisher.stats() == {"inFlight": 0, "inFlightBytes": 0, "published": 0, "retried": 1, "failed": 1}
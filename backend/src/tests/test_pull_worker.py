@@ -0,0 +1,162 @@
+import dataclasses
+import json
+import threading
+import time
+
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+from src import main
+from src.models.schemas import GenerateTask
+from src.services import generation, pubsub_client, store, worker
+from src.services.storage import UploadResult
+from src.services.vertex import VertexGenerationResult
+from src.services.mocks import generate_mock_post
+from src.services.pull_worker import PullWorker
+
+
+class FakeMessage:
+    def __init__(self, payload) -> None:
+        self.data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        self.message_id = "m"
+        self.settled = threading.Event()
+        self.outcome = None
+
+    def ack(self) -> None:
+        self.outcome = "ack"
+        self.settled.set()
+
+    def nack(self) -> None:
+        self.outcome = "nack"
+        self.settled.set()
+
+
+class FakeStreamingPull:
+    def cancel(self) -> None:
+        pass
+
+    def result(self, timeout=None) -> None:
+        return None
+
+
+class FakeSubscriber:
+    """Local stand-in for ``SubscriberClient.subscribe``: the test delivers messages itself."""
+
+    def subscribe(self, path, callback, flow_control):
+        self.path, self.callback, self.flow_control = path, callback, flow_control
+        return FakeStreamingPull()
+
+
+def _task(job_id, media_type):
+    return {"jobId": job_id, "uid": "tester", "prompt": "p", "mediaType": media_type, "aspect": "9:16"}
+
+
+def setup_function() -> None:
+    store.reset_store()
+
+
+def test_pull_worker_bounds_each_pool_and_acks_or_nacks():
+    peak = {"image": 0, "video": 0}
+    running = {"image": 0, "video": 0}
+    lock = threading.Lock()
+
+    def handler(task, *, retry_transient):
+        assert retry_transient
+        with lock:
+            running[task.mediaType] += 1
+            peak[task.mediaType] = max(peak[task.mediaType], running[task.mediaType])
+        time.sleep(0.05)
+        with lock:
+            running[task.mediaType] -= 1
+        if task.jobId == "flaky":
+            raise requests.ConnectionError("reset")
+
+    subscriber = FakeSubscriber()
+    pull = PullWorker(subscriber=subscriber, subscription_path="projects/p/subscriptions/gen",
+                      image_concurrency=3, video_concurrency=1, handler=handler)
+    pull.start()
+    assert subscriber.flow_control.max_messages == 4
+
+    messages = [FakeMessage(_task(f"img-{i}", "image")) for i in range(6)]
+    messages += [FakeMessage(_task(f"vid-{i}", "video")) for i in range(2)]
+    messages += [FakeMessage(_task("flaky", "image")), FakeMessage(b"not json")]
+    for message in messages:
+        subscriber.callback(message)  # returns immediately; work runs on the pools
+    for message in messages:
+        assert message.settled.wait(2)
+    pull.stop()
+
+    assert peak == {"image": 3, "video": 1}
+    assert [m.outcome for m in messages[:8]] == ["ack"] * 8
+    assert messages[8].outcome == "nack"
+    assert messages[9].outcome == "ack"  # malformed: dropped, not redelivered forever
+    assert pull.stats() == {"activeImage": 0, "activeVideo": 0, "acked": 8, "nacked": 1}
+
+
+def test_generate_task_raises_transient_errors_and_skips_redelivered_jobs(monkeypatch):
+    db = store.get_store()
+    task = GenerateTask(**_task("job-1", "image"))
+
+    def unavailable(**kwargs):
+        raise requests.ConnectionError("connection reset")
+
+    monkeypatch.setattr(worker, "generate_image", unavailable)
+    with pytest.raises(requests.ConnectionError):
+        worker.process_generate_task(task, retry_transient=True)
+    assert db.get_job("job-1") is None  # left for the redelivery
+
+    post = generate_mock_post("p", "image")
+    post.update(id="post-1", storagePath="media/images/post-1.png")
+    db.save_post(post)
+    db.save_job("job-1", {"jobId": "job-1", "status": "ready", "postId": "post-1"})
+    worker.process_generate_task(task, retry_transient=True)  # no generate call, no error
+    assert db.get_job("job-1")["postId"] == "post-1"
+
+
+def test_queued_job_waits_for_the_worker_even_after_its_eta(monkeypatch):
+    settings = dataclasses.replace(generation.get_settings(), enable_mocks=False, pubsub_topic_generate="generate")
+    monkeypatch.setattr(generation, "get_settings", lambda: settings)
+    monkeypatch.setattr(generation, "aiplatform", object())
+    db = store.get_store()
+
+    job_id, post_payload, delay_ms = generation.enqueue_generation("tester", "a red fox", "image", aspect="9:16")
+    request = post_payload.pop("generateRequest")
+    job = main._pending_job("tester", job_id, post_payload, delay_ms, "composer")
+    job["ready_at"] = time.time() - 1  # the placeholder ETA has passed
+    db.save_job(job_id, job)
+    with TestClient(main.app) as client:
+        single = client.get("/gen/status", params={"jobId": job_id}).json()
+        bulk = client.post("/gen/status", json={"jobIds": [job_id]}).json()
+    assert single["status"] == bulk["jobs"][job_id]["status"] == "pending"
+    assert db.get_post(job_id) is None  # the empty placeholder was not published
+
+    monkeypatch.setattr(worker, "generate_image", lambda **kwargs: VertexGenerationResult(
+        b"png", None, "imagen", "image/png", "png", {}))
+    monkeypatch.setattr(worker, "upload_media_bytes", lambda **kwargs: UploadResult(
+        storage_path=f"media/images/{kwargs['post_id']}.png", public_url=None))
+    monkeypatch.setattr(worker, "derive_media", lambda **kwargs: {})
+    worker.process_generate_task(GenerateTask(**request), retry_transient=True)
+
+    assert db.get_job(job_id)["status"] == "ready"
+    assert db.get_post(job_id).storagePath == f"media/images/{job_id}.png"
+
+
+def test_fast_publish_failure_is_not_overwritten_by_the_pending_job(monkeypatch):
+    settings = dataclasses.replace(generation.get_settings(), enable_mocks=False, pubsub_topic_generate="generate")
+    monkeypatch.setattr(generation, "get_settings", lambda: settings)
+    monkeypatch.setattr(generation, "aiplatform", object())
+    db = store.get_store()
+    saved_first = []
+
+    def fail_at_once(request):
+        # The dead-letter handler can run before the request handler returns
+        saved_first.append(db.get_job(request["jobId"]) is not None)
+        pubsub_client.mark_job_failed(request, RuntimeError("topic not found"))
+
+    monkeypatch.setattr(main, "publish_generate_request", fail_at_once)
+    with TestClient(main.app) as client:
+        job_id = client.post("/gen/image", json={"uid": "tester", "prompt": "a red fox", "type": "image"}).json()["jobId"]
+
+    assert saved_first == [True]
+    assert db.get_job(job_id)["status"] == "failed"
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+from src.services.scheduler import GenerationScheduler, SchedulerBusy
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_priority_then_round_robin_across_users():
+    scheduler = GenerationScheduler({"veo": 1})
+    blocker = scheduler.acquire(uid="warmup", model="veo")
+    order = []
+
+    def run(uid, priority):
+        with scheduler.slot(uid=uid, model="veo", priority=priority):
+            order.append(uid if priority != "interactive" else f"{uid}!")
+
+    threads = [threading.Thread(target=run, args=("alice", "variation")) for _ in range(3)]
+    threads.append(threading.Thread(target=run, args=("bob", "variation")))
+    threads.append(threading.Thread(target=run, args=("carol", "interactive")))
+    threads.append(threading.Thread(target=run, args=("dave", "background")))
+    for thread in threads:
+        thread.start()
+        # Deterministic arrival order
+        _wait_for(lambda n=threads.index(thread) + 1: sum(scheduler.stats()["waiting"].values()) == n)
+
+    scheduler.release(blocker)
+    for thread in threads:
+        thread.join(2)
+
+    # Interactive first; alice's burst alternates with bob; background last
+    assert order == ["carol!", "alice", "bob", "alice", "alice", "dave"]
+    waits = scheduler.stats()["queueWaitMs"]
+    assert set(waits) == {"interactive", "variation", "background"}
+    assert waits["variation"]["count"] == 4
+
+
+def test_per_model_caps_are_independent_and_busy_times_out():
+    scheduler = GenerationScheduler({"imagen": 2, "veo": 1})
+    held = [scheduler.acquire(uid="u1", model="imagen"), scheduler.acquire(uid="u2", model="imagen")]
+    video = scheduler.acquire(uid="u3", model="veo")  # a different model is not blocked
+    assert scheduler.stats()["running"] == {"imagen": 2, "veo": 1}
+
+    with pytest.raises(SchedulerBusy):
+        scheduler.acquire(uid="u4", model="imagen", timeout=0.05)
+    assert scheduler.stats()["waiting"]["interactive"] == 0
+
+    scheduler.hold("job-1", video)
+    scheduler.release_job("job-1")
+    scheduler.release_job("job-1")  # idempotent
+    for grant in held:
+        scheduler.release(grant)
+    assert scheduler.stats()["running"] == {}
+    assert scheduler.stats()["held"] == 0
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+from src.services.metrics import LatencyHistogram
+from src.services.vertex import VertexRestClient
+
+
+class _FakeCredentials:
+    def __init__(self, expires_in: timedelta) -> None:
+        self.token = "t0"
+        self.expiry = datetime.utcnow() + expires_in
+        self.refreshes = 0
+
+    def refresh(self, request) -> None:
+        self.refreshes += 1
+        self.token = f"t{self.refreshes}"
+        self.expiry = datetime.utcnow() + timedelta(hours=1)
+
+
+def test_token_is_cached_until_close_to_expiry():
+    client = VertexRestClient()
+    client._credentials = _FakeCredentials(expires_in=timedelta(minutes=30))
+    assert [client._token() for _ in range(3)] == ["t0", "t0", "t0"]
+    assert client._credentials.refreshes == 0
+
+    client._credentials.expiry = datetime.utcnow() + timedelta(minutes=2)
+    assert client._token() == "t1"
+    assert client._token() == "t1"
+    assert client._credentials.refreshes == 1
+
+    client.invalidate_token()
+    assert client._token() == "t2"
+
+
+def test_latency_histogram_is_cumulative():
+    histogram = LatencyHistogram(buckets_ms=(10, 100))
+    for value in (1, 50, 60, 500):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 4
+    assert snapshot["buckets"] == {"le_10": 1, "le_100": 3, "le_inf": 4}
+
+
+def test_model_registry_loads_each_model_once(monkeypatch):
+    from src.services import vertex
+
+    class FakeModel:
+        loads = []
+
+        @classmethod
+        def from_pretrained(cls, model_id):
+            cls.loads.append(model_id)
+            return object()
+
+    inits = []
+    monkeypatch.setattr(vertex, "_MODELS", {})
+    monkeypatch.setattr(vertex, "_INITIALIZED", False)
+    monkeypatch.setattr(vertex.aiplatform, "init", lambda **kwargs: inits.append(kwargs))
+    monkeypatch.setattr(vertex, "get_settings", lambda: type("S", (), {"vertex_project": "p", "vertex_region": "r"})())
+
+    first = vertex.get_model(FakeModel, "imagen-a")
+    assert vertex.get_model(FakeModel, "imagen-a") is first
+    vertex.get_model(FakeModel, "imagen-b")
+    assert FakeModel.loads == ["imagen-a", "imagen-b"]
+    assert inits == [{"project": "p", "location": "r"}]
+
+
+def test_only_idempotent_calls_retry_gateway_errors():
+    client = VertexRestClient(retries=2)
+
+    def forcelist(session):
+        return set(session.get_adapter("https://example.com").max_retries.status_forcelist)
+
+    # A 502/504 can follow an accepted submit; retrying it would start a second job
+    assert forcelist(client.session) == {429, 503}
+    assert forcelist(client.idempotent_session) == {429, 502, 503, 504}
+    assert "fetchPredictOperation" in client.IDEMPOTENT_METHODS
+    assert "predictLongRunning" not in client.IDEMPOTENT_METHODS
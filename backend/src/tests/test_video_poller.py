@@ -0,0 +1,187 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.services import store
+from src.services.mocks import generate_mock_post
+from src.services.vertex import VertexRestClient
+from src.services.video_poller import VideoOperationPoller
+
+
+def setup_function() -> None:
+    store.reset_store()
+
+
+def _pending_video_job(job_id: str) -> dict:
+    post = generate_mock_post("drone shot", "video")
+    post.update(id=job_id, status="pending", storagePath="")
+    job = {
+        "jobId": job_id,
+        "userId": "tester",
+        "status": "pending",
+        "post": post,
+        "reasons": ["composer"],
+        "operation": {"name": f"ops/{job_id}", "model": "veo"},
+        "submitted_at": time.time(),
+    }
+    store.get_store().save_job(job_id, job)
+    return job
+
+
+def test_poller_promotes_finished_operations():
+    responses = {"ops/a": {"done": False}, "ops/b": {"done": True, "response": {"videos": [{"gcsUri": "gs://bucket/media/videos/b.mp4"}]}}}
+    poster = {"storagePath": "media/videos/b_poster.jpg", "publicUrl": None, "width": 720}
+    poller = VideoOperationPoller(
+        fetch=lambda model, name: responses[name],
+        derive=lambda post_id, path: {"poster": poster} if post_id == "b" else {},
+        initial_delay_seconds=0,
+    )
+    for job_id in ("a", "b"):
+        _pending_video_job(job_id)
+    assert asyncio.run(poller.recover()) == 2
+
+    assert asyncio.run(poller.poll_once()) == 1
+    db = store.get_store()
+    assert db.get_job("a")["status"] == "pending"
+    assert db.get_job("b")["status"] == "ready"
+    post = db.get_post(db.get_job("b")["postId"])
+    assert post.status == "ready"
+    assert post.publicUrl == "https://storage.googleapis.com/bucket/media/videos/b.mp4"
+    assert post.poster.storagePath == "media/videos/b_poster.jpg"
+    items, _, _ = db.get_feed_ready("tester", 10, feed_type="private")
+    assert [item.post.id for item in items] == ["b"]
+    assert [op.job_id for op in poller.pending()] == ["a"]
+
+
+def test_poller_fails_errored_and_timed_out_operations():
+    poller = VideoOperationPoller(
+        fetch=lambda model, name: {"done": True, "error": {"message": "blocked"}},
+        initial_delay_seconds=0,
+        timeout_seconds=60,
+    )
+    _pending_video_job("err")
+    poller.track("err", "ops/err", "veo")
+    _pending_video_job("old")
+    poller.track("old", "ops/old", "veo", submitted_at=time.time() - 120)
+
+    assert asyncio.run(poller.poll_once()) == 2
+    db = store.get_store()
+    assert db.get_job("err")["status"] == "failed"
+    assert "blocked" in db.get_job("err")["error"]
+    assert "timed out" in db.get_job("old")["error"]
+    assert poller.pending() == []
+
+
+class _FakeVertex(BaseHTTPRequestHandler):
+    """fetchPredictOperation stand-in: each operation finishes after `done_after` polls."""
+
+    calls: dict = {}
+    done_after = 4
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        name = body["operationName"]
+        assert self.path.endswith("/veo:fetchPredictOperation")
+        assert self.headers["Authorization"] == "Bearer test-token"
+        self.calls[name] = self.calls.get(name, 0) + 1
+        payload = {"name": name, "done": self.calls[name] >= self.done_after}
+        if payload["done"]:
+            payload["response"] = {"videos": [{"gcsUri": f"gs://bucket/{name}.mp4"}]}
+        raw = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_poller_backs_off_against_fake_endpoint():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeVertex)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _FakeVertex.calls = {}
+    now = [1000.0]
+    try:
+        client = VertexRestClient(
+            base_url=f"http://127.0.0.1:{server.server_port}/models",
+            token_provider=lambda: "test-token",
+        )
+        poller = VideoOperationPoller(
+            fetch=client.fetch_predict_operation, clock=lambda: now[0], initial_delay_seconds=20,
+            base_interval_seconds=5, max_interval_seconds=20, max_polls_per_second=1000,
+        )
+        for i in range(12):
+            _pending_video_job(f"job{i}")
+            poller.track(f"job{i}", f"ops/job{i}", "veo", submitted_at=now[0])
+
+        ticks = 0
+        while poller.pending():
+            asyncio.run(poller.poll_once())
+            now[0] += 1
+            ticks += 1
+        # Polls land at +20s, +25s, +32.5s and +43.75s: four calls per job
+        # across ~45 one-second ticks.
+        assert ticks >= 44
+        assert all(count == _FakeVertex.done_after for count in _FakeVertex.calls.values())
+        assert poller.stats() == {"inFlight": 0, "polls": 12 * _FakeVertex.done_after}
+        assert store.get_store().get_job("job3")["status"] == "ready"
+        latency = client.stats()["fetchPredictOperation"]
+        assert latency["count"] == 12 * _FakeVertex.done_after
+        assert latency["buckets"]["le_inf"] == latency["count"]
+    finally:
+        server.shutdown()
+
+
+def test_poll_rate_cap_stretches_intervals():
+    poller = VideoOperationPoller(fetch=lambda model, name: {}, base_interval_seconds=1, max_polls_per_second=2)
+    for i in range(40):
+        poller.track(f"j{i}", f"ops/j{i}", "veo")
+    op = poller.pending()[0]
+    op.polls = 1
+    assert poller._interval(op) == 20
+
+
+def test_replicas_promote_a_finished_operation_once():
+    done = {"done": True, "response": {"videos": [{"gcsUri": "gs://bucket/media/videos/v.mp4"}]}}
+    replicas = [
+        VideoOperationPoller(fetch=lambda model, name: done, derive=lambda post_id, path: {}, initial_delay_seconds=0)
+        for _ in range(2)
+    ]
+    _pending_video_job("v")
+    db = store.get_store()
+    saved = []
+    original_save_post = db.save_post
+    db.save_post = lambda post: saved.append(post["id"]) or original_save_post(post)
+
+    async def both_poll():
+        for poller in replicas:
+            await poller.recover()
+        first = await asyncio.gather(*(poller.poll_once() for poller in replicas))
+        for poller in replicas:  # the loser sees the finished job on its next check
+            for op in poller.pending():
+                op.next_poll_at = 0
+        second = await asyncio.gather(*(poller.poll_once() for poller in replicas))
+        return first, second
+
+    first, second = asyncio.run(both_poll())
+    assert saved == ["v"]
+    assert sum(first) + sum(second) == 2  # each replica resolves it exactly once
+    assert db.get_job("v")["status"] == "ready"
+    assert all(not poller.pending() for poller in replicas)
+
+
+def test_recover_tracks_every_operation_job_past_other_pending_jobs():
+    db = store.get_store()
+    for i in range(150):
+        db.save_job(f"composer-{i}", {"jobId": f"composer-{i}", "status": "pending", "post": {}})
+    for i in range(120):
+        _pending_video_job(f"video-{i}")
+    db.save_job("done", {"jobId": "done", "status": "ready", "operation": {"name": "ops/done", "model": "veo"}})
+
+    poller = VideoOperationPoller(fetch=lambda model, name: {"done": False}, initial_delay_seconds=0)
+    assert asyncio.run(poller.recover()) == 120
+    assert all(op.job_id.startswith("video-") for op in poller.pending())